@@ -0,0 +1,83 @@
+import asyncio
+from concurrent.futures import Executor
+from typing import Callable, Dict, Optional
+
+import numpy as np
+
+
+class EmbeddingBatcher:
+    """Coalesces concurrent single-text embedding requests into batched encodes.
+
+    Requests are grouped by key, the extra positional arguments of embed()
+    (e.g. model name and backend), which are passed on as encode_fn(texts, *key).
+    The first request for a key opens a batch and starts a max_wait_ms timer;
+    requests arriving before it fires join the same batch, which is flushed
+    early once it holds max_batch_size texts. Each batch is encoded with one
+    encode_fn call on the executor, so the event loop keeps accepting
+    requests while the model runs. All bookkeeping happens on the event loop
+    thread, so no locking is needed.
+    """
+
+    def __init__(self, encode_fn: Callable[..., np.ndarray],
+                 max_batch_size: int = 32, max_wait_ms: float = 5.0, executor: Optional[Executor] = None):
+        self.encode_fn = encode_fn
+        # None runs encodes on the event loop's default executor
+        self.executor = executor
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max_wait_ms / 1000
+        self.batches = 0
+        self.texts = 0
+        self.largest_batch = 0
+        self._pending = {}
+        self._timers = {}
+
+    async def embed(self, text: str, *key) -> np.ndarray:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+
+        batch = self._pending.setdefault(key, [])
+        batch.append((text, future))
+        if len(batch) >= self.max_batch_size:
+            self._flush(key)
+        elif len(batch) == 1:
+            self._timers[key] = loop.call_later(self.max_wait, self._flush, key)
+
+        return await future
+
+    def _flush(self, key: tuple):
+        timer = self._timers.pop(key, None)
+        if timer is not None:
+            timer.cancel()
+
+        batch = self._pending.pop(key, None)
+        if batch:
+            asyncio.get_running_loop().create_task(self._run(key, batch))
+
+    async def _run(self, key: tuple, batch: list):
+        self.batches += 1
+        self.texts += len(batch)
+        self.largest_batch = max(self.largest_batch, len(batch))
+
+        texts = [text for text, _ in batch]
+        try:
+            vectors = await asyncio.get_running_loop().run_in_executor(self.executor, self.encode_fn, texts, *key)
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, future), vector in zip(batch, vectors):
+            # Callers that gave up (client disconnect, timeout) just miss their result
+            if not future.done():
+                future.set_result(vector)
+
+    def stats(self) -> Dict:
+        return {
+            "batches": self.batches,
+            "texts": self.texts,
+            "mean_batch_size": self.texts / self.batches if self.batches else 0.0,
+            "largest_batch": self.largest_batch,
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000
+        }
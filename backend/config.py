@@ -1,21 +1,30 @@
+import os
+
 EMBEDDING_MODELS = {
     "all-MiniLM-L6-v2": {
         "name": "all-MiniLM-L6-v2",
         "dimensions": 384,
+        "batch_size": 64,
         "description": "Fast and efficient model for general purpose embedding"
     },
     "all-mpnet-base-v2": {
         "name": "all-mpnet-base-v2", 
         "dimensions": 768,
+        "batch_size": 16,
         "description": "Higher quality model with better performance but slower"
     },
     "multi-qa-MiniLM-L6-cos-v1": {
         "name": "multi-qa-MiniLM-L6-cos-v1",
         "dimensions": 384,
+        "batch_size": 64,
         "description": "Optimized for question answering tasks"
     }
 }
 
+# Batch size for models without a tuned "batch_size" above. Batch sizes are
+# for max-length texts; shorter texts are batched more widely.
+DEFAULT_EMBEDDING_BATCH_SIZE = int(os.environ.get("DEFAULT_EMBEDDING_BATCH_SIZE", 32))
+
 CHUNKING_METHODS = {
     "fixed_size": {
         "name": "Fixed Size Chunks",
@@ -32,5 +41,124 @@ CHUNKING_METHODS = {
     "recursive_character": {
         "name": "Recursive Character Text Splitter",
         "description": "Recursively split text using different separators"
+    },
+    "token_aware": {
+        "name": "Token Aware Chunks",
+        "description": "Split text by the embedding model's tokenizer so chunks fill its max sequence length (sizes are in tokens)"
+    }
+}
+
+# Uploads are streamed to disk in blocks of this many bytes
+UPLOAD_CHUNK_SIZE = int(os.environ.get("UPLOAD_CHUNK_SIZE", 1024 * 1024))
+
+# Largest accepted upload in bytes (0 disables the limit)
+MAX_UPLOAD_SIZE = int(os.environ.get("MAX_UPLOAD_SIZE", 500 * 1024 * 1024))
+
+# Background ingestion: worker threads and how many jobs may wait before
+# /ingest starts rejecting uploads
+INGEST_WORKERS = int(os.environ.get("INGEST_WORKERS", 1))
+INGEST_QUEUE_SIZE = int(os.environ.get("INGEST_QUEUE_SIZE", 8))
+
+# Batch ingestion may read server-side directories only below this root, and
+# extracts PDFs with up to this many processes
+BATCH_INGEST_ROOT = os.environ.get("BATCH_INGEST_ROOT", "storage/docs")
+BATCH_EXTRACT_WORKERS = int(os.environ.get("BATCH_EXTRACT_WORKERS", min(4, os.cpu_count() or 1)))
+
+# Persistent cache of chunk embeddings keyed by (model, text hash), bounded in bytes
+EMBEDDING_CACHE_ENABLED = os.environ.get("EMBEDDING_CACHE_ENABLED", "1") == "1"
+EMBEDDING_CACHE_PATH = os.environ.get("EMBEDDING_CACHE_PATH", "storage/embedding_cache.sqlite")
+EMBEDDING_CACHE_MAX_BYTES = int(os.environ.get("EMBEDDING_CACHE_MAX_BYTES", 1024 ** 3))
+
+# Rows per statement for the SQLite stores' batched lookups and deletes;
+# SQLite caps the number of bound parameters per statement
+SQL_BATCH_SIZE = 500
+
+# Precision embeddings are produced, cached and indexed at: "float32" or "float16".
+# float16 halves vector memory, cache and index size; new indexes then store
+# vectors through a FAISS fp16 scalar quantizer
+EMBEDDING_DTYPE = os.environ.get("EMBEDDING_DTYPE", "float32")
+
+# Chunk text is kept in append-only segment files here rather than in the
+# metadata rows; CHUNK_TEXT_COMPRESSION is "" (none), "zlib" or "zstd" (needs
+# the zstandard package) and applies per block of text
+CHUNK_TEXT_DIR = os.environ.get("CHUNK_TEXT_DIR", "storage/text_segments")
+CHUNK_TEXT_COMPRESSION = os.environ.get("CHUNK_TEXT_COMPRESSION", "")
+
+# BM25 inverted index over chunk text, kept in step with every write, for the
+# "lexical" and "hybrid" /query modes. Hybrid queries fuse the top
+# max(4 * k, HYBRID_CANDIDATES) results of each ranking
+LEXICAL_INDEX_ENABLED = os.environ.get("LEXICAL_INDEX_ENABLED", "1") == "1"
+HYBRID_CANDIDATES = int(os.environ.get("HYBRID_CANDIDATES", 50))
+
+# In-memory LRU sizes for query embeddings and for search results
+QUERY_EMBEDDING_CACHE_SIZE = int(os.environ.get("QUERY_EMBEDDING_CACHE_SIZE", 1024))
+QUERY_RESULT_CACHE_SIZE = int(os.environ.get("QUERY_RESULT_CACHE_SIZE", 1024))
+
+# Micro-batching of concurrent query embeddings: flush after this many queries
+# or this many milliseconds after the first one arrives, whichever is first
+QUERY_BATCH_MAX_SIZE = int(os.environ.get("QUERY_BATCH_MAX_SIZE", 32))
+QUERY_BATCH_MAX_WAIT_MS = float(os.environ.get("QUERY_BATCH_MAX_WAIT_MS", 5))
+
+# Inference backends for the embedding models; EMBEDDING_BACKEND=hash runs
+# everything offline without a model. The ONNX backends export each
+# model once to ONNX_MODEL_DIR and run it with ONNX Runtime (optional
+# dependency: pip install onnxruntime); an export is only used after its
+# embeddings agree with PyTorch's to within min_cosine
+EMBEDDING_BACKENDS = {
+    "torch": {
+        "name": "PyTorch",
+        "description": "Full-precision PyTorch on CPU"
+    },
+    "onnx": {
+        "name": "ONNX Runtime",
+        "description": "ONNX export, full precision",
+        "quantize": False,
+        "min_cosine": 0.999
+    },
+    "onnx-int8": {
+        "name": "ONNX Runtime (int8)",
+        "description": "ONNX export with dynamic int8 weight quantization",
+        "quantize": True,
+        "min_cosine": 0.98
+    },
+    "hash": {
+        "name": "Hashing (offline)",
+        "description": "Deterministic feature-hashing stand-in with each model's dimensions; "
+                       "no download, for offline tests and benchmarks"
+    }
+}
+DEFAULT_EMBEDDING_BACKEND = os.environ.get("EMBEDDING_BACKEND", "torch")
+ONNX_MODEL_DIR = os.environ.get("ONNX_MODEL_DIR", "storage/onnx")
+
+# Models to load and warm up at startup, comma-separated "model" or "model@backend"
+PRELOAD_MODELS = [spec.strip() for spec in os.environ.get("PRELOAD_MODELS", "").split(",") if spec.strip()]
+
+# Large embedding jobs are split across worker processes, each pinned to
+# EMBEDDING_POOL_THREADS threads; a single process disables the pool
+EMBEDDING_POOL_THREADS = int(os.environ.get("EMBEDDING_POOL_THREADS", 2))
+EMBEDDING_POOL_PROCESSES = int(os.environ.get("EMBEDDING_POOL_PROCESSES", max(1, (os.cpu_count() or 1) // EMBEDDING_POOL_THREADS)))
+EMBEDDING_POOL_MIN_TEXTS = int(os.environ.get("EMBEDDING_POOL_MIN_TEXTS", 2000))
+
+# Memory budget for loaded embedding models (parameter footprint); least
+# recently used idle models are evicted beyond it. 0 disables eviction
+MODEL_CACHE_MAX_BYTES = int(os.environ.get("MODEL_CACHE_MAX_BYTES", 1024 ** 3))
+
+# CPU thread budget profile ("query" or "ingest"), switchable at runtime via
+# /thread_profile. Counts not overridden here come from thread_budget.DEFAULT_PROFILES.
+# BATCH_EXTRACT_WORKERS and EMBEDDING_POOL_PROCESSES size the ingest profile, and
+# when set explicitly hold in every profile (EMBEDDING_POOL_PROCESSES=1 always
+# disables the pool)
+THREAD_PROFILE = os.environ.get("THREAD_PROFILE", "query")
+_EXPLICIT_COUNTS = {
+    name: value for name, variable, value in (
+        ("extract_workers", "BATCH_EXTRACT_WORKERS", BATCH_EXTRACT_WORKERS),
+        ("embedding_pool_processes", "EMBEDDING_POOL_PROCESSES", EMBEDDING_POOL_PROCESSES)
+    ) if variable in os.environ
+}
+THREAD_PROFILE_OVERRIDES = {
+    "query": dict(_EXPLICIT_COUNTS),
+    "ingest": {
+        "extract_workers": BATCH_EXTRACT_WORKERS,
+        "embedding_pool_processes": EMBEDDING_POOL_PROCESSES
     }
-}
\ No newline at end of file
+}
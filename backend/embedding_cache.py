@@ -0,0 +1,145 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List
+
+import numpy as np
+
+from config import SQL_BATCH_SIZE as _SQL_BATCH
+
+
+class EmbeddingCache:
+    """Persistent content-addressed embedding cache backed by SQLite.
+
+    Vectors are keyed by (model name, SHA-256 of the text), so identical text
+    is only ever encoded once per model no matter which document, edit or
+    re-ingest it comes from. The total size of stored vectors is bounded by
+    max_bytes; when it is exceeded the least recently used entries are
+    evicted down to 90% of the budget.
+    """
+
+    def __init__(self, path: str, max_bytes: int = 1024 ** 3):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            " model TEXT NOT NULL,"
+            " text_hash TEXT NOT NULL,"
+            " dtype TEXT NOT NULL,"
+            " vector BLOB NOT NULL,"
+            " last_used REAL NOT NULL,"
+            " PRIMARY KEY (model, text_hash)"
+            ") WITHOUT ROWID"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings (last_used)")
+        self._conn.commit()
+        self._size = self._conn.execute("SELECT COALESCE(SUM(LENGTH(vector)), 0) FROM embeddings").fetchone()[0]
+
+    @staticmethod
+    def hash_text(text: str) -> str:
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def lookup(self, model_name: str, text_hashes: List[str]) -> Dict[str, np.ndarray]:
+        """Cached vectors for whichever of the hashes are present; hits are marked as recently used"""
+        unique = list(dict.fromkeys(text_hashes))
+        found = {}
+
+        with self._lock:
+            for start in range(0, len(unique), _SQL_BATCH):
+                batch = unique[start:start + _SQL_BATCH]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT text_hash, dtype, vector FROM embeddings WHERE model = ? AND text_hash IN ({placeholders})",
+                    [model_name, *batch]
+                ).fetchall()
+                for text_hash, dtype, vector in rows:
+                    found[text_hash] = np.frombuffer(vector, dtype=dtype)
+
+            if found:
+                now = time.time()
+                self._conn.executemany(
+                    "UPDATE embeddings SET last_used = ? WHERE model = ? AND text_hash = ?",
+                    [(now, model_name, text_hash) for text_hash in found]
+                )
+                self._conn.commit()
+
+            self.hits += sum(1 for text_hash in text_hashes if text_hash in found)
+            self.misses += sum(1 for text_hash in text_hashes if text_hash not in found)
+
+        return found
+
+    def store(self, model_name: str, text_hashes: List[str], vectors: np.ndarray):
+        """Insert vectors for hashes not yet cached, then evict if over budget"""
+        if len(text_hashes) == 0:
+            return
+
+        now = time.time()
+        rows = [
+            (model_name, text_hash, vector.dtype.str, vector.tobytes(), now)
+            for text_hash, vector in zip(text_hashes, vectors)
+        ]
+
+        with self._lock:
+            for row in rows:
+                # Content-addressed, so an existing entry is already correct
+                cursor = self._conn.execute("INSERT OR IGNORE INTO embeddings VALUES (?, ?, ?, ?, ?)", row)
+                if cursor.rowcount:
+                    self._size += len(row[3])
+            self._conn.commit()
+
+            if self.max_bytes and self._size > self.max_bytes:
+                self._evict(int(self.max_bytes * 0.9))
+
+    def _evict(self, target_bytes: int):
+        """Drop least recently used entries until the cache fits in target_bytes"""
+        evicted = 0
+        while self._size > target_bytes:
+            rows = self._conn.execute(
+                "SELECT model, text_hash, LENGTH(vector) FROM embeddings ORDER BY last_used LIMIT ?",
+                (_SQL_BATCH,)
+            ).fetchall()
+            if not rows:
+                break
+
+            doomed = []
+            for model, text_hash, size in rows:
+                if self._size <= target_bytes:
+                    break
+                doomed.append((model, text_hash))
+                self._size -= size
+
+            self._conn.executemany("DELETE FROM embeddings WHERE model = ? AND text_hash = ?", doomed)
+            evicted += len(doomed)
+
+        self._conn.commit()
+        self.evictions += evicted
+        print(f"Embedding cache evicted {evicted} entries ({self._size} bytes remain)")
+
+    def stats(self) -> Dict:
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "entries": entries,
+                "bytes": self._size,
+                "max_bytes": self.max_bytes
+            }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,134 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, List, Optional
+
+import numpy as np
+
+# Set in each worker process by _init_worker
+_worker_model = None
+
+
+def _init_worker(model_name: str, backend: str, threads: int):
+    """Pin the worker's thread count before the model's runtime starts, then load the model"""
+    global _worker_model
+
+    for var in ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS"):
+        os.environ[var] = str(threads)
+
+    if backend == "torch":
+        import torch
+        torch.set_num_threads(threads)
+        torch.set_num_interop_threads(1)
+
+    # The budget is re-applied when the model loads, so it must hold the pinned counts too
+    from thread_budget import budget
+    budget.pin(torch=threads, onnx=threads, faiss=1)
+
+    from embeddings import get_model
+    get_model(model_name, backend)
+    _worker_model = (model_name, backend)
+
+
+def _encode_slice(texts: List[str], batch_size: Optional[int], dtype: np.dtype):
+    from embeddings import _encode_counted
+
+    model_name, backend = _worker_model
+    # Converted in the worker, so float16 results cost half as much to send back
+    return _encode_counted(texts, model_name, backend, batch_size, dtype=dtype)
+
+
+class EmbeddingPool:
+    """Worker processes that each hold a copy of one model and encode a share of the texts.
+
+    Small models stop scaling with intra-op threads long before a many-core
+    box is busy, so large jobs are split into contiguous slices and encoded
+    by several processes, each pinned to threads_per_process threads.
+    Results are written back at their slice offsets, so output order always
+    matches input order.
+    """
+
+    def __init__(self, model_name: str, backend: str = "torch", processes: int = 2, threads_per_process: int = 1):
+        self.model_name = model_name
+        self.backend = backend
+        self.processes = processes
+        self.threads_per_process = threads_per_process
+        self.broken = False
+        self._executor = ProcessPoolExecutor(
+            max_workers=processes,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(model_name, backend, threads_per_process)
+        )
+
+    def encode(self, texts: List[str], batch_size: Optional[int] = None,
+               progress_callback: Optional[Callable[[int, int], None]] = None, dtype: np.dtype = np.float32) -> tuple:
+        """Embed texts across the pool; returns (embeddings in input order, total token count)"""
+        # A few slices per process keeps workers evenly loaded and progress moving
+        n_slices = min(len(texts), self.processes * 4)
+        bounds = np.linspace(0, len(texts), n_slices + 1, dtype=int)
+
+        try:
+            futures = {
+                self._executor.submit(_encode_slice, texts[start:end], batch_size, dtype): (start, end)
+                for start, end in zip(bounds[:-1], bounds[1:]) if end > start
+            }
+
+            embeddings = None
+            n_tokens = 0
+            done = 0
+            for future in as_completed(futures):
+                start, end = futures[future]
+                vectors, slice_tokens = future.result()
+                if embeddings is None:
+                    embeddings = np.empty((len(texts), vectors.shape[1]), dtype=dtype)
+                embeddings[start:end] = vectors
+                n_tokens += slice_tokens
+                done += end - start
+                if progress_callback:
+                    progress_callback(done, len(texts))
+        except BrokenProcessPool:
+            # A worker died (e.g. out of memory); get_pool() replaces this pool on the next job
+            self.broken = True
+            raise
+
+        return embeddings, n_tokens
+
+    def close(self, cancel_pending: bool = True):
+        self._executor.shutdown(wait=False, cancel_futures=cancel_pending)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# Long-lived pools keyed by (model name, backend), so workers load the model
+# once rather than on every large job
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(model_name: str, backend: str, processes: int, threads_per_process: int) -> EmbeddingPool:
+    """The shared pool for a model, replaced if its sizes changed or a worker died"""
+    key = (model_name, backend)
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is not None and (pool.broken or (pool.processes, pool.threads_per_process) != (processes, threads_per_process)):
+            # Jobs already submitted to the old pool still finish
+            pool.close(cancel_pending=False)
+            pool = None
+        if pool is None:
+            pool = _pools[key] = EmbeddingPool(model_name, backend, processes, threads_per_process)
+        return pool
+
+
+def close_pools():
+    """Shut down every shared pool, e.g. when the server stops"""
+    with _pools_lock:
+        for pool in _pools.values():
+            pool.close()
+        _pools.clear()
@@ -1,20 +1,316 @@
-from sentence_transformers import SentenceTransformer
 import numpy as np
-from typing import List
-from config import EMBEDDING_MODELS
-
-# Global model cache
-model_cache = {}
-
-def get_embeddings(texts: List[str], model_name: str = "all-MiniLM-L6-v2") -> np.ndarray:
-    global model_cache
-    
-    if model_name not in model_cache:
-        print(f"Loading model: {model_name}")
-        model_cache[model_name] = SentenceTransformer(model_name, device='cpu')
-    
-    model = model_cache[model_name]
-    return model.encode(texts)
+import threading
+import time
+from datetime import datetime
+from typing import TYPE_CHECKING, Callable, List, Optional, Tuple
+from config import (
+    EMBEDDING_MODELS, DEFAULT_EMBEDDING_BATCH_SIZE,
+    EMBEDDING_BACKENDS, DEFAULT_EMBEDDING_BACKEND, ONNX_MODEL_DIR,
+    EMBEDDING_POOL_THREADS, EMBEDDING_POOL_MIN_TEXTS,
+    EMBEDDING_CACHE_ENABLED, EMBEDDING_CACHE_PATH, EMBEDDING_CACHE_MAX_BYTES,
+    MODEL_CACHE_MAX_BYTES, EMBEDDING_DTYPE
+)
+from embedding_cache import EmbeddingCache
+from model_cache import ModelCache
+from thread_budget import budget as thread_budget
+
+# sentence_transformers pulls in torch, which takes seconds to import, so it
+# is only imported when the first model is loaded
+if TYPE_CHECKING:
+    from sentence_transformers import SentenceTransformer
+
+# Loaded models keyed by (model name, backend), under a memory budget. The
+# cache loads each model once even when concurrent first requests ask for it
+model_cache = ModelCache(max_bytes=MODEL_CACHE_MAX_BYTES)
+
+# Load and warmup timings per (model name, backend), reported on /index_status
+model_load_info = {}
+
+# Persistent cache of computed embeddings, opened on first use
+_embedding_cache = None
+_embedding_cache_lock = threading.Lock()
+
+# Running throughput counters per model
+embedding_stats = {}
+_stats_lock = threading.Lock()
+
+def _load_model(model_name: str, backend: str):
+    print(f"Loading model: {model_name} ({backend})")
+    started = time.perf_counter()
+    if backend == "torch":
+        from sentence_transformers import SentenceTransformer
+        model = SentenceTransformer(model_name, device='cpu')
+    elif backend == "hash":
+        from hash_backend import HashEmbedder
+        model = HashEmbedder(dimension=EMBEDDING_MODELS.get(model_name, {}).get("dimensions", 384))
+    else:
+        from onnx_backend import load_onnx_embedder
+        options = EMBEDDING_BACKENDS[backend]
+        model = load_onnx_embedder(
+            model_name,
+            ONNX_MODEL_DIR,
+            quantize=options["quantize"],
+            min_cosine=options["min_cosine"],
+            reference=model_cache.peek((model_name, "torch")),
+            threads=thread_budget.get("onnx")
+        )
+
+    # The model's runtime is imported now, so it can be held to the thread budget
+    thread_budget.apply()
+
+    load_seconds = time.perf_counter() - started
+    model_load_info[(model_name, backend)] = {
+        "model": model_name,
+        "backend": backend,
+        "load_seconds": round(load_seconds, 3),
+        "warmup_seconds": None,
+        "loaded_at": datetime.now().isoformat()
+    }
+    print(f"Loaded {model_name} ({backend}) in {load_seconds:.2f}s")
+    return model
+
+def _check_backend(backend: str):
+    if backend not in EMBEDDING_BACKENDS:
+        raise ValueError(f"Unknown embedding backend: {backend}")
+
+def get_model(model_name: str = "all-MiniLM-L6-v2", backend: str = "torch") -> "SentenceTransformer":
+    _check_backend(backend)
+    return model_cache.get((model_name, backend), lambda: _load_model(model_name, backend))
+
+def using_model(model_name: str = "all-MiniLM-L6-v2", backend: str = "torch"):
+    """Context manager holding the model in the cache (safe from eviction) while it is used"""
+    _check_backend(backend)
+    return model_cache.using((model_name, backend), lambda: _load_model(model_name, backend))
+
+def warmup_model(model_name: str, backend: str = "torch"):
+    """Run a throwaway encode so lazy initialisation happens before the first real request"""
+    with using_model(model_name, backend) as model:
+        started = time.perf_counter()
+        model.encode(["warmup", "A slightly longer warmup sentence to exercise padding."],
+                     batch_size=2, convert_to_numpy=True, show_progress_bar=False)
+    model_load_info[(model_name, backend)]["warmup_seconds"] = round(time.perf_counter() - started, 3)
+
+def preload_models(specs: List[str]):
+    """Load and warm up models given as "model" or "model@backend" (the model_key format)"""
+    for spec in specs:
+        model_name, _, backend = spec.partition("@")
+        try:
+            warmup_model(model_name, backend or DEFAULT_EMBEDDING_BACKEND)
+        except Exception as e:
+            print(f"Error preloading {spec}: {str(e)}")
+
+def get_model_status() -> dict:
+    """Loaded models with their load and warmup times and memory footprint"""
+    cache = model_cache.stats()
+    models = []
+    for entry in cache.pop("models"):
+        info = dict(model_load_info.get(entry["key"], {}))
+        info.update(bytes=entry["bytes"], in_use=entry["in_use"])
+        models.append(info)
+    return {**cache, "models": models}
+
+def model_key(model_name: str, backend: str = "torch") -> str:
+    """Name under which a model's embeddings are cached and counted; each backend gets its own"""
+    return model_name if backend == "torch" else f"{model_name}@{backend}"
+
+def _token_lengths(model: "SentenceTransformer", texts: List[str]) -> List[int]:
+    """Token count of each text as the model will see it (special tokens included, truncated)"""
+    encoded = model.tokenizer(
+        texts,
+        add_special_tokens=True,
+        truncation=True,
+        max_length=model.max_seq_length,
+        return_attention_mask=False,
+        return_token_type_ids=False,
+        verbose=False
+    )
+    return [len(ids) for ids in encoded["input_ids"]]
+
+def _length_buckets(order: np.ndarray, lengths: List[int], batch_size: int, max_seq_length: int) -> List[np.ndarray]:
+    """Split length-sorted positions into batches under a fixed padded-token budget.
+
+    The budget is what a full batch of max-length texts costs, so batches of
+    short texts get proportionally more texts (capped at 4x batch_size) and
+    nothing in a batch is padded much beyond its own length.
+    """
+    token_budget = batch_size * max_seq_length
+    max_texts = batch_size * 4
+    batches = []
+    start = 0
+
+    for end in range(1, len(order) + 1):
+        # order is ascending, so the newest text is always the longest in the batch
+        longest = lengths[order[end - 1]]
+        if end - start > 1 and ((end - start) * longest > token_budget or end - start > max_texts):
+            batches.append(order[start:end - 1])
+            start = end - 1
+    batches.append(order[start:])
+
+    return batches
+
+def get_embedding_cache() -> Optional[EmbeddingCache]:
+    global _embedding_cache
+
+    if not EMBEDDING_CACHE_ENABLED:
+        return None
+    with _embedding_cache_lock:
+        if _embedding_cache is None:
+            _embedding_cache = EmbeddingCache(EMBEDDING_CACHE_PATH, max_bytes=EMBEDDING_CACHE_MAX_BYTES)
+    return _embedding_cache
+
+def get_embeddings(
+    texts: List[str],
+    model_name: str = "all-MiniLM-L6-v2",
+    batch_size: Optional[int] = None,
+    progress_callback: Optional[Callable[[int, int], None]] = None,
+    use_cache: bool = True,
+    backend: Optional[str] = None,
+    dtype: Optional[str] = None
+) -> np.ndarray:
+    """Embed texts, encoding only those not already in the persistent cache.
+
+    Returns a C-contiguous array of dtype (default EMBEDDING_DTYPE) in input
+    order, ready for FAISS; progress_callback gets (texts_done, texts_total).
+    """
+    backend = backend or DEFAULT_EMBEDDING_BACKEND
+    dtype = np.dtype(dtype or EMBEDDING_DTYPE)
+    cache = get_embedding_cache() if use_cache else None
+    if cache is None or not texts:
+        return _encoder_for(len(texts))(texts, model_name, backend, batch_size, progress_callback, dtype)
+
+    key = model_key(model_name, backend)
+    text_hashes = [EmbeddingCache.hash_text(text) for text in texts]
+    cached = cache.lookup(key, text_hashes)
+
+    # Encode each distinct missing text once, however often it repeats
+    missing = {}
+    for text, text_hash in zip(texts, text_hashes):
+        if text_hash not in cached and text_hash not in missing:
+            missing[text_hash] = text
+
+    if missing:
+        n_cached = len(texts) - sum(1 for text_hash in text_hashes if text_hash not in cached)
+        on_progress = None
+        if progress_callback:
+            on_progress = lambda done, total: progress_callback(n_cached + done * (len(texts) - n_cached) // total, len(texts))
+
+        encoded = _encoder_for(len(missing))(list(missing.values()), model_name, backend, batch_size, on_progress, dtype)
+        cache.store(key, list(missing), encoded)
+        cached.update(zip(missing, encoded))
+    elif progress_callback:
+        progress_callback(len(texts), len(texts))
+
+    # Entries cached at another precision are converted while stacking, not copied twice
+    return np.stack([cached[text_hash] for text_hash in text_hashes], dtype=dtype)
+
+def _encoder_for(n_texts: int) -> Callable:
+    """Large jobs go to the multi-process pool, everything else is encoded in-process"""
+    if thread_budget.get("embedding_pool_processes") > 1 and n_texts >= EMBEDDING_POOL_MIN_TEXTS:
+        return _encode_pooled
+    return _encode
+
+def _encode_pooled(
+    texts: List[str],
+    model_name: str,
+    backend: str = "torch",
+    batch_size: Optional[int] = None,
+    progress_callback: Optional[Callable[[int, int], None]] = None,
+    dtype: np.dtype = np.float32
+) -> np.ndarray:
+    """Embed texts across the thread budget's embedding_pool_processes worker processes, in input order"""
+    from embedding_pool import get_pool
+
+    processes = thread_budget.get("embedding_pool_processes")
+    print(f"Embedding {len(texts)} texts with a pool of {processes} processes x {EMBEDDING_POOL_THREADS} threads")
+    started = time.perf_counter()
+    pool = get_pool(model_name, backend, processes, EMBEDDING_POOL_THREADS)
+    embeddings, n_tokens = pool.encode(texts, batch_size, progress_callback, dtype)
+
+    _record_stats(model_key(model_name, backend), len(texts), n_tokens, time.perf_counter() - started)
+    return embeddings
+
+def _encode(
+    texts: List[str],
+    model_name: str,
+    backend: str = "torch",
+    batch_size: Optional[int] = None,
+    progress_callback: Optional[Callable[[int, int], None]] = None,
+    dtype: np.dtype = np.float32
+) -> np.ndarray:
+    """Embed texts in length-bucketed batches.
+
+    Texts are sorted by token length so each batch pads as little as possible,
+    then written back in their original order, converted to dtype on the way.
+    """
+    return _encode_counted(texts, model_name, backend, batch_size, progress_callback, dtype)[0]
+
+def _encode_counted(
+    texts: List[str],
+    model_name: str,
+    backend: str = "torch",
+    batch_size: Optional[int] = None,
+    progress_callback: Optional[Callable[[int, int], None]] = None,
+    dtype: np.dtype = np.float32
+) -> Tuple[np.ndarray, int]:
+    """_encode(), also returning the token count it measured for bucketing"""
+    if batch_size is None:
+        batch_size = EMBEDDING_MODELS.get(model_name, {}).get("batch_size", DEFAULT_EMBEDDING_BATCH_SIZE)
+
+    with using_model(model_name, backend) as model:
+        embeddings = np.empty((len(texts), model.get_sentence_embedding_dimension()), dtype=dtype)
+        if not texts:
+            return embeddings, 0
+
+        started = time.perf_counter()
+        lengths = _token_lengths(model, texts)
+        order = np.argsort(lengths, kind="stable")
+
+        done = 0
+        for batch in _length_buckets(order, lengths, batch_size, model.max_seq_length):
+            embeddings[batch] = model.encode(
+                [texts[i] for i in batch],
+                batch_size=len(batch),
+                convert_to_numpy=True,
+                show_progress_bar=False
+            )
+            done += len(batch)
+            if progress_callback:
+                progress_callback(done, len(texts))
+
+    n_tokens = sum(lengths)
+    _record_stats(model_key(model_name, backend), len(texts), n_tokens, time.perf_counter() - started)
+    return embeddings, n_tokens
+
+def _record_stats(model_name: str, n_texts: int, n_tokens: int, seconds: float):
+    with _stats_lock:
+        stats = embedding_stats.setdefault(model_name, {"calls": 0, "texts": 0, "tokens": 0, "seconds": 0.0})
+        stats["calls"] += 1
+        stats["texts"] += n_texts
+        stats["tokens"] += n_tokens
+        stats["seconds"] += seconds
+
+    # Only large calls are worth a log line; single queries would flood it
+    if n_texts >= 100:
+        print(f"Embedded {n_texts} texts ({n_tokens} tokens) with {model_name} in {seconds:.2f}s: "
+              f"{n_texts / seconds:.1f} texts/s, {n_tokens / seconds:.0f} tokens/s")
+
+def get_embedding_stats():
+    """Cumulative encoder throughput per model, plus embedding cache counters"""
+    with _stats_lock:
+        models = {
+            model_name: {
+                **stats,
+                "texts_per_second": stats["texts"] / stats["seconds"] if stats["seconds"] else 0.0,
+                "tokens_per_second": stats["tokens"] / stats["seconds"] if stats["seconds"] else 0.0
+            }
+            for model_name, stats in embedding_stats.items()
+        }
+
+    cache = get_embedding_cache()
+    return {"models": models, "cache": cache.stats() if cache else None}
 
 def get_available_models():
-    return EMBEDDING_MODELS
\ No newline at end of file
+    return EMBEDDING_MODELS
+
+def get_available_backends():
+    return EMBEDDING_BACKENDS
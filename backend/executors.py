@@ -0,0 +1,76 @@
+import asyncio
+import functools
+import threading
+import time
+from concurrent.futures import Executor, Future
+from typing import Any, Callable, Dict
+
+
+class MeteredExecutor(Executor):
+    """Executor that measures the work it runs, delegating to the pool pool() returns.
+
+    Tracks queue depth (submitted but not started), running tasks, and the
+    wait and run time of each task. The pool is looked up on every submit, so
+    a pool the thread budget resizes or replaces is picked up without
+    rebuilding this wrapper; shutting the pool down is left to its owner.
+    """
+
+    def __init__(self, name: str, pool: Callable[[], Executor]):
+        self.name = name
+        self._pool = pool
+        self._lock = threading.Lock()
+        self.queued = 0
+        self.running = 0
+        self.started = 0
+        self.completed = 0
+        self.max_queued = 0
+        self.wait_total = 0.0
+        self.max_wait = 0.0
+        self.run_total = 0.0
+
+    def submit(self, fn: Callable, *args, **kwargs) -> Future:
+        submitted = time.perf_counter()
+        with self._lock:
+            self.queued += 1
+            self.max_queued = max(self.max_queued, self.queued)
+
+        def run():
+            started = time.perf_counter()
+            with self._lock:
+                self.queued -= 1
+                self.running += 1
+                self.started += 1
+                self.wait_total += started - submitted
+                self.max_wait = max(self.max_wait, started - submitted)
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                with self._lock:
+                    self.running -= 1
+                    self.completed += 1
+                    self.run_total += time.perf_counter() - started
+
+        try:
+            return self._pool().submit(run)
+        except BaseException:
+            with self._lock:
+                self.queued -= 1
+            raise
+
+    async def run(self, fn: Callable, *args, **kwargs) -> Any:
+        """Await fn(*args, **kwargs) run on the pool, leaving the event loop free meanwhile"""
+        return await asyncio.get_running_loop().run_in_executor(self, functools.partial(fn, *args, **kwargs))
+
+    def stats(self) -> Dict:
+        workers = getattr(self._pool(), "_max_workers", None)
+        with self._lock:
+            return {
+                "workers": workers,
+                "queued": self.queued,
+                "running": self.running,
+                "completed": self.completed,
+                "max_queued": self.max_queued,
+                "mean_wait_ms": 1000 * self.wait_total / self.started if self.started else 0.0,
+                "max_wait_ms": 1000 * self.max_wait,
+                "mean_run_ms": 1000 * self.run_total / self.completed if self.completed else 0.0
+            }
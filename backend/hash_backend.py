@@ -0,0 +1,87 @@
+import hashlib
+import re
+from typing import Dict, List
+
+import numpy as np
+
+# Words and individual punctuation marks, roughly what a WordPiece tokenizer splits on
+_TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]")
+
+_VOCAB_SIZE = 30522
+_CLS_ID = 101
+_SEP_ID = 102
+
+
+def _token_hash(token: str) -> int:
+    # Stable across processes and runs, unlike the built-in hash()
+    return int.from_bytes(hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+class HashTokenizer:
+    """Regex tokenizer answering the subset of the Hugging Face fast-tokenizer call the backend uses"""
+
+    def __init__(self, model_max_length: int = 256):
+        self.model_max_length = model_max_length
+
+    def __call__(self, texts, add_special_tokens: bool = True, truncation: bool = False, max_length: int = None,
+                 return_offsets_mapping: bool = False, **kwargs) -> Dict[str, list]:
+        if isinstance(texts, str):
+            texts = [texts]
+        limit = max_length or self.model_max_length
+
+        input_ids, offset_mapping = [], []
+        for text in texts:
+            matches = list(_TOKEN_PATTERN.finditer(text))
+            if truncation:
+                matches = matches[:limit - 2 if add_special_tokens else limit]
+
+            ids = [_token_hash(match.group().lower()) % _VOCAB_SIZE for match in matches]
+            offsets = [match.span() for match in matches]
+            if add_special_tokens:
+                ids = [_CLS_ID] + ids + [_SEP_ID]
+                offsets = [(0, 0)] + offsets + [(0, 0)]
+
+            input_ids.append(ids)
+            offset_mapping.append(offsets)
+
+        encoded = {"input_ids": input_ids}
+        if return_offsets_mapping:
+            encoded["offset_mapping"] = offset_mapping
+        return encoded
+
+
+class HashEmbedder:
+    """Deterministic offline stand-in for a SentenceTransformer.
+
+    Embeds text by feature hashing its lower-cased words and word bigrams into
+    a fixed number of signed buckets, then L2-normalising. Identical text
+    always gets the identical vector in any process, and texts sharing words
+    score as similar, so ingestion, search, caching and benchmarks behave
+    realistically without downloading or running a model.
+    """
+
+    def __init__(self, dimension: int = 384, max_seq_length: int = 256):
+        self.dimension = dimension
+        self.max_seq_length = max_seq_length
+        self.tokenizer = HashTokenizer(max_seq_length)
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.dimension
+
+    def encode(self, sentences: List[str], batch_size: int = 32, convert_to_numpy: bool = True,
+               show_progress_bar: bool = False, **kwargs) -> np.ndarray:
+        embeddings = np.zeros((len(sentences), self.dimension), dtype=np.float32)
+
+        for row, text in enumerate(sentences):
+            words = [match.group().lower() for match in _TOKEN_PATTERN.finditer(text)][:self.max_seq_length]
+            features = words + [f"{first} {second}" for first, second in zip(words, words[1:])]
+            if not features:
+                continue
+
+            hashes = np.array([_token_hash(feature) for feature in features], dtype=np.uint64)
+            buckets = (hashes % np.uint64(self.dimension)).astype(np.int64)
+            signs = np.where((hashes >> np.uint64(63)) == 0, 1.0, -1.0).astype(np.float32)
+            np.add.at(embeddings[row], buckets, signs)
+
+        norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+        return embeddings / np.where(norms == 0, 1.0, norms)
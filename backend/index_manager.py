@@ -1,64 +1,322 @@
-import faiss
+import contextlib
 import numpy as np
 import os
-import json
+import shutil
+import struct
+import threading
+import uuid
 import zipfile
-from typing import Dict, List, Tuple
+import zlib
+from typing import Dict, List, Optional, Tuple
+import serialization
+from thread_budget import budget as thread_budget
+
+# Commit log frame: body length and CRC32 of the body, which is a header
+# length, the JSON header and the raw vectors of the header's "add" operations
+_FRAME = struct.Struct("<QI")
+_HEADER_LENGTH = struct.Struct("<I")
 
 class IndexManager:
-    def __init__(self, index_path: str):
+    """FAISS index plus the chunk ID of every index position, saved as a snapshot and a commit log.
+    
+    Each commit appends just the transaction's additions and deletions to
+    index.faiss.log, so its cost follows the size of the change rather than
+    of the index. Once the log outgrows snapshot_ratio times the snapshot
+    (and at least snapshot_min_bytes), or after a reduction replaces the
+    whole index, the commit writes a fresh snapshot instead and starts an
+    empty log. Loading replays the log over the snapshot.
+    """
+    
+    def __init__(self, index_path: str, dtype: str = "float32", commit_token: Optional[str] = None,
+                 snapshot_ratio: float = 0.5, snapshot_min_bytes: int = 64 * 1024 ** 2):
         self.index_path = index_path
+        # Precision new indexes store vectors at; an index read from disk keeps its own
+        self.dtype = dtype
         self.mapping_path = index_path + ".mapping.json"
-        self.index = None
+        # Index and mappings of a snapshot being committed, see prepare_commit()
+        self.pending_path = index_path + ".pending"
+        self.log_path = index_path + ".log"
+        self.snapshot_ratio = snapshot_ratio
+        self.snapshot_min_bytes = snapshot_min_bytes
+        # Token of the last commit, as recorded by the metadata store
+        self.commit_token = commit_token
+        self._in_transaction = False
         self.id_map = {} 
         self.dimension = None  
+        # Bumped on every change to the vectors, so callers can tell cached search results are stale
+        self.generation = 0
+        
+        # Changes since the last commit, as (operation, vectors) pairs for the log
+        self._journal = []
+        # Set when the whole index was replaced, so the next commit must write a snapshot
+        self._snapshot_due = False
+        # Committed length of the log, and what prepare_commit() wrote: (token, "log" or "snapshot")
+        self._log_size = 0
+        self._prepared = None
+        
+        # chunk_id -> index positions, rebuilt when the generation moves on
+        self._positions = {}
+        self._positions_generation = None
+        
+        # A PCA reduction that has been evaluated but not yet applied
+        self._pending_reduction = None
+        
+        self._load_lock = threading.Lock()
+        self._load(self._recover(commit_token))
+    
+    @property
+    def index(self):
+        if not self._index_loaded:
+            with self._load_lock:
+                if not self._index_loaded:
+                    import faiss
+                    index = faiss.read_index(self.index_path) if os.path.exists(self.index_path) else None
+                    for op, vectors in self._replay:
+                        index = self._apply(index, op, vectors)
+                    self._replay = []
+                    self._index = index
+                    self.dimension = index.d if index is not None else None
+                    self._index_loaded = True
+        return self._index
+    
+    @index.setter
+    def index(self, value):
+        self._index = value
+        self._index_loaded = True
+    
+    def _load(self, records: List[Tuple[str, list]]):
+        """Read the snapshot's mappings and apply the committed log records to them.
         
-        # Load existing index if it exists
-        if os.path.exists(index_path):
-            self.index = faiss.read_index(index_path)
-            self.dimension = self.index.d 
+        An existing index is read on first access, so startup doesn't have to
+        import faiss; the records' vectors are kept until then.
+        """
+        self._index = None
+        self.dimension = None
+        self.id_map = {}
+        if os.path.exists(self.index_path):
             self._load_mappings()
         
+        self._replay = []
+        for _, ops in records:
+            for op, vectors in ops:
+                self._map(op)
+                self._replay.append((op, vectors))
+        self._index_loaded = not os.path.exists(self.index_path) and not self._replay
     
     def _load_mappings(self):
         """Load ID mappings from file"""
         if os.path.exists(self.mapping_path):
             try:
-                with open(self.mapping_path, 'r') as f:
-                    mapping_data = json.load(f)
-                    self.id_map = {int(k): v for k, v in mapping_data.items()}
+                mapping_data = serialization.load(self.mapping_path)
+                self.id_map = {int(k): v for k, v in mapping_data.items()}
             except Exception as e:
                 print(f"Error loading mappings: {e}")
                 self.id_map = {}
     
-    def _save_mappings(self):
-        """Save ID mappings to file"""
-        try:
-            with open(self.mapping_path, 'w') as f:
-                json.dump(self.id_map, f, indent=2)
-        except Exception as e:
-            print(f"Error saving mappings: {e}")
+    def _map(self, op: dict):
+        """Apply an operation to the position -> chunk ID mappings"""
+        if op["op"] == "add":
+            for offset, chunk_id in enumerate(op["chunk_ids"]):
+                self.id_map[op["start"] + offset] = chunk_id
+        else:
+            # remove_ids keeps the remaining vectors in order, so every position
+            # shifts down by the number of removed positions below it
+            removed = np.array(op["positions"], dtype=np.int64)
+            removed_set = set(op["positions"])
+            remaining = {idx: cid for idx, cid in self.id_map.items() if idx not in removed_set}
+            shifts = np.searchsorted(removed, np.fromiter(remaining.keys(), dtype=np.int64, count=len(remaining)))
+            self.id_map = {int(idx - shift): cid for (idx, cid), shift in zip(remaining.items(), shifts)}
+    
+    def _apply(self, index, op: dict, vectors: Optional[np.ndarray]):
+        """Apply an operation to a FAISS index, creating it on the first addition"""
+        import faiss
+        if op["op"] == "add":
+            if index is None:
+                index = self._new_flat_index(vectors.shape[1])
+            index.add(vectors)
+        else:
+            index.remove_ids(faiss.IDSelectorBatch(np.array(op["positions"], dtype=np.int64)))
+        return index
+    
+    def begin_transaction(self):
+        """Start a transaction: changes up to prepare_commit() are committed together, with any made before it"""
+        self._in_transaction = True
+    
+    def prepare_commit(self) -> str:
+        """First commit phase: write the changes since the last commit and return their commit token.
+        
+        Small changes are appended to the log as one record; otherwise the
+        whole index and mappings are written beside the live files. The
+        caller records the token in the metadata store's own commit and then
+        calls finish_commit(); if the process dies in between, the token
+        tells _recover() which side of the commit point it stopped on.
+        """
+        # Nothing to write: the last commit's files still hold the current state
+        if not self._journal and not self._snapshot_due and self.commit_token is not None:
+            self._prepared = (self.commit_token, None)
+            return self.commit_token
+        
+        token = uuid.uuid4().hex
+        record = _encode_record(token, self._journal) if not self._snapshot_due else None
+        snapshot_bytes = os.path.getsize(self.index_path) if os.path.exists(self.index_path) else 0
+        log_limit = max(self.snapshot_min_bytes, self.snapshot_ratio * snapshot_bytes)
+        
+        if record is not None and self._log_size + len(record) <= log_limit:
+            self._truncate_log()
+            with open(self.log_path, 'ab') as f:
+                f.write(record)
+                f.flush()
+                os.fsync(f.fileno())
+            self._prepared = (token, "log")
+            return token
+        
+        import faiss
+        shutil.rmtree(self.pending_path, ignore_errors=True)
+        os.makedirs(self.pending_path)
+        
+        if self.index is not None:
+            index_file = os.path.join(self.pending_path, "index.faiss")
+            faiss.write_index(self.index, index_file)
+            _fsync(index_file)
+        serialization.dump(self.id_map, os.path.join(self.pending_path, "mapping.json"), sync=True)
+        # Written last: a pending directory without a token is always incomplete
+        with open(os.path.join(self.pending_path, "commit"), 'w') as f:
+            f.write(token)
+            f.flush()
+            os.fsync(f.fileno())
+        self._prepared = (token, "snapshot")
+        return token
+    
+    def finish_commit(self):
+        """Second commit phase, after the metadata has committed: make the prepared changes the committed state"""
+        token, kind = self._prepared
+        if kind == "log":
+            self._log_size = os.path.getsize(self.log_path)
+        elif kind == "snapshot":
+            self._install_pending()
+            self._log_size = 0
+        
+        self.commit_token = token
+        self._prepared = None
+        self._journal = []
+        self._snapshot_due = False
+        self._in_transaction = False
+    
+    def save(self):
+        """Commit the changes made since the last commit, for callers with no metadata store to coordinate with"""
+        if self._in_transaction:
+            raise RuntimeError("save() would commit part of an open transaction")
+        self.prepare_commit()
+        self.finish_commit()
+    
+    def abort_commit(self):
+        """Drop the changes since the last commit by discarding anything prepared and reloading the committed index"""
+        written = self._prepared is not None and self._prepared[1] is not None
+        changed = bool(self._journal) or self._snapshot_due
+        self._in_transaction = False
+        self._prepared = None
+        self._journal = []
+        self._snapshot_due = False
+        # Nothing was changed or written, so the loaded index is still the committed one
+        if not written and not changed:
+            return
+        
+        shutil.rmtree(self.pending_path, ignore_errors=True)
+        self._truncate_log()
+        
+        self._load(_read_log(self.log_path)[0])
+        self.generation += 1
+    
+    def _truncate_log(self):
+        """Cut the log back to its committed length; truncating a shorter file would pad it with zeros"""
+        if os.path.exists(self.log_path) and os.path.getsize(self.log_path) > self._log_size:
+            with open(self.log_path, 'r+b') as f:
+                f.truncate(self._log_size)
+    
+    def _install_pending(self):
+        for name, target in (("index.faiss", self.index_path), ("mapping.json", self.mapping_path)):
+            source = os.path.join(self.pending_path, name)
+            # Already moved if an earlier attempt was interrupted part way
+            if os.path.exists(source):
+                os.replace(source, target)
+        # The snapshot includes everything logged before it
+        if os.path.exists(self.log_path):
+            os.remove(self.log_path)
+        shutil.rmtree(self.pending_path, ignore_errors=True)
+    
+    def _recover(self, commit_token: Optional[str]) -> List[Tuple[str, list]]:
+        """Complete or discard a commit interrupted by a crash, and return the committed log records.
+        
+        A prepared snapshot whose token matches the metadata store's last
+        commit belongs to a committed transaction and is moved into place;
+        any other is thrown away. Likewise log records after the one
+        carrying that token, and a record cut short by the crash, were never
+        committed and are truncated away.
+        """
+        if os.path.isdir(self.pending_path):
+            token_path = os.path.join(self.pending_path, "commit")
+            token = None
+            if os.path.exists(token_path):
+                with open(token_path, 'r') as f:
+                    token = f.read()
+            
+            if token is not None and token == commit_token:
+                print(f"Completing interrupted index commit {token}")
+                self._install_pending()
+            else:
+                print("Discarding index changes from an uncommitted transaction")
+                shutil.rmtree(self.pending_path, ignore_errors=True)
+        
+        records, ends = _read_log(self.log_path)
+        tokens = [token for token, _ in records]
+        committed = tokens.index(commit_token) + 1 if commit_token in tokens else 0
+        size = ends[committed - 1] if committed else 0
+        
+        if os.path.exists(self.log_path) and os.path.getsize(self.log_path) > size:
+            print(f"Discarding {len(records) - committed} uncommitted index log records")
+            with open(self.log_path, 'r+b') as f:
+                f.truncate(size)
+        self._log_size = size
+        return records[:committed]
     
     def add_vector(self, vector: np.ndarray, chunk_id: str):
         """Add a vector to the index and update mappings"""
-        vector = vector.reshape(1, -1)
-        current_dim = vector.shape[1]
+        self.add_vectors(vector.reshape(1, -1), [chunk_id])
+    
+    def add_vectors(self, vectors: np.ndarray, chunk_ids: List[str]):
+        """Add a batch of vectors with one index call"""
+        if len(chunk_ids) == 0:
+            return
+        # FAISS converts to float32 per call, so float16 input is passed through as is
+        vectors = np.asarray(vectors).reshape(len(chunk_ids), -1)
+        current_dim = vectors.shape[1]
         
         if self.index is None:
             self.dimension = current_dim
-            self.index = faiss.IndexFlatL2(self.dimension)
-            print(f"Created new index with dimension: {self.dimension}")
+            self.index = self._new_flat_index(self.dimension)
+            print(f"Created new {self.dtype} index with dimension: {self.dimension}")
         else:
             if current_dim != self.dimension:
                 raise ValueError(f"Vector dimension {current_dim} does not match index dimension {self.dimension}")
         
-        idx = self.index.ntotal
-        self.index.add(vector)
-        self.id_map[idx] = chunk_id
-        self._save_mappings()
+        op = {"op": "add", "start": self.index.ntotal, "chunk_ids": list(chunk_ids)}
+        self.index.add(vectors)
+        self._map(op)
+        self._journal.append((op, vectors))
+        self.generation += 1
     
-    def search(self, query_vector: np.ndarray, k: int = 5) -> List[Tuple[str, float]]:
-        """Search for similar vectors in the index"""
+    def _positions_of(self, chunk_ids: List[str]) -> np.ndarray:
+        """Index positions holding the given chunks' vectors"""
+        if self._positions_generation != self.generation:
+            positions = {}
+            for idx, chunk_id in self.id_map.items():
+                positions.setdefault(chunk_id, []).append(idx)
+            self._positions = positions
+            self._positions_generation = self.generation
+        return np.array([idx for chunk_id in chunk_ids for idx in self._positions.get(chunk_id, ())], dtype=np.int64)
+    
+    def search(self, query_vector: np.ndarray, k: int = 5, chunk_ids: Optional[List[str]] = None) -> List[Tuple[str, float]]:
+        """Search for similar vectors in the index, optionally only among the vectors of chunk_ids"""
         if self.index is None:
             return []
             
@@ -68,9 +326,25 @@ class IndexManager:
         if query_vector.shape[1] != self.dimension:
             raise ValueError(f"Query vector dimension {query_vector.shape[1]} does not match index dimension {self.dimension}")
         
+        import faiss
+        params = None
+        candidates = self.index.ntotal
+        if chunk_ids is not None:
+            positions = self._positions_of(chunk_ids)
+            if len(positions) == 0:
+                return []
+            # FAISS skips every position outside the selector while scanning
+            selector = faiss.IDSelectorBatch(positions)
+            params = faiss.SearchParameters(sel=selector)
+            if isinstance(self.index, faiss.IndexPreTransform):
+                params = faiss.SearchParametersPreTransform(index_params=params)
+            candidates = len(positions)
+        
         # Search more results than needed to account for missing mappings
-        search_k = min(k * 3, self.index.ntotal)
-        distances, indices = self.index.search(query_vector, search_k)
+        search_k = min(k * 3, candidates)
+        # OpenMP thread counts are per calling thread, so set it on whichever thread searches
+        faiss.omp_set_num_threads(thread_budget.faiss_threads)
+        distances, indices = self.index.search(query_vector, search_k, params=params)
         
         results = []
         seen_chunks = set() 
@@ -92,45 +366,249 @@ class IndexManager:
         return results
     
     def update_vector(self, chunk_id: str, new_vector: np.ndarray):
-        """Update a vector in the index"""
-        idx_to_update = None
-        for idx, cid in self.id_map.items():
-            if cid == chunk_id:
-                idx_to_update = idx
-                break
+        """Replace a chunk's vector, leaving no copy of the old one behind"""
+        self.update_vectors(new_vector.reshape(1, -1), [chunk_id])
+    
+    def update_vectors(self, vectors: np.ndarray, chunk_ids: List[str]):
+        """Replace the vectors of chunks already in the index; unknown chunk IDs are skipped"""
+        present = set(self.id_map.values())
+        rows = [row for row, chunk_id in enumerate(chunk_ids) if chunk_id in present]
+        if not rows:
+            return
         
-        if idx_to_update is not None:
-            self.add_vector(new_vector, chunk_id)
+        updated = [chunk_ids[row] for row in rows]
+        self.delete_vectors(updated)
+        self.add_vectors(np.asarray(vectors).reshape(len(chunk_ids), -1)[rows], updated)
     
     def delete_vector(self, chunk_id: str):
         """Delete a vector from the index"""
-        idx_to_remove = None
-        for idx, cid in list(self.id_map.items()):
-            if cid == chunk_id:
-                idx_to_remove = idx
-                break
-        
-        if idx_to_remove is not None:
-            del self.id_map[idx_to_remove]
-            self._save_mappings()
+        self.delete_vectors([chunk_id])
+    
+    def delete_vectors(self, chunk_ids: List[str]) -> int:
+        """Remove every vector mapped to the given chunks and compact the mappings"""
+        chunk_ids = set(chunk_ids)
+        idxs_to_remove = [idx for idx, cid in self.id_map.items() if cid in chunk_ids]
+        if not idxs_to_remove or self.index is None:
+            return 0
+        
+        import faiss
+        removed = np.array(sorted(idxs_to_remove), dtype=np.int64)
+        self.index.remove_ids(faiss.IDSelectorBatch(removed))
+        
+        op = {"op": "delete", "positions": removed.tolist()}
+        self._map(op)
+        self._journal.append((op, None))
+        self.generation += 1
+        return len(idxs_to_remove)
 
     def get_index_stats(self):
         return {
-            "index_size": self.index.ntotal,
-            "mappings_count": len(self.id_map)
+            "index_size": self.index.ntotal if self.index is not None else 0,
+            "mappings_count": len(self.id_map),
+            "dimension": self.dimension,
+            "stored_dimension": self._stored_dimension(),
+            "vector_dtype": self._stored_dtype()
+        }
+    
+    def _new_flat_index(self, dimension: int):
+        """Exact L2 index at self.dtype: float16 is kept through an fp16 scalar quantizer"""
+        import faiss
+        if self.dtype == "float16":
+            return faiss.IndexScalarQuantizer(dimension, faiss.ScalarQuantizer.QT_fp16, faiss.METRIC_L2)
+        return faiss.IndexFlatL2(dimension)
+    
+    def _storage_index(self):
+        """The index holding the vectors, beneath any PCA transform"""
+        if self.index is None:
+            return None
+        import faiss
+        if isinstance(self.index, faiss.IndexPreTransform):
+            return faiss.downcast_index(self.index.index)
+        return self.index
+    
+    def _stored_dimension(self):
+        """Dimension vectors are stored at: the PCA output if the index is reduced"""
+        storage = self._storage_index()
+        return storage.d if storage is not None else None
+    
+    def _stored_dtype(self):
+        storage = self._storage_index()
+        if storage is None:
+            return None
+        import faiss
+        if isinstance(storage, faiss.IndexScalarQuantizer) and storage.sq.qtype == faiss.ScalarQuantizer.QT_fp16:
+            return "float16"
+        return "float32"
+    
+    def plan_reduction(self, dimension: int, sample_size: int = 20000, k: int = 10, eval_queries: int = 200,
+                       lock=None) -> dict:
+        """Train a PCA reduction on a sample of the stored vectors and measure its recall, without applying it.
+        
+        Recall@k compares each evaluation vector's k nearest neighbours (itself
+        excluded) in the reduced index against the exact full-dimension ones.
+        The trained index is kept until commit_reduction() applies it. If lock
+        is given it is held only while the vectors are copied out, not while
+        the PCA is trained and evaluated; commit_reduction() refuses the plan
+        if the index changed in between.
+        """
+        import faiss
+        if lock is None:
+            lock = contextlib.nullcontext()
+        
+        with lock:
+            if self.index is None or self.index.ntotal == 0:
+                raise ValueError("Index is empty")
+            if isinstance(self.index, faiss.IndexPreTransform):
+                raise ValueError("Index is already reduced; reset and re-ingest to change its dimension")
+            if not 0 < dimension < self.dimension:
+                raise ValueError(f"Target dimension must be between 1 and {self.dimension - 1}")
+            
+            from_dimension = self.dimension
+            generation = self.generation
+            stored_dtype = self._stored_dtype()
+            vectors = self.index.reconstruct_n(0, self.index.ntotal)
+        
+        ntotal = len(vectors)
+        rng = np.random.default_rng(0)
+        
+        train = vectors[rng.choice(ntotal, min(sample_size, ntotal), replace=False)]
+        if len(train) < dimension:
+            raise ValueError(f"Need at least {dimension} stored vectors to train a {dimension}-d PCA, have {len(train)}")
+        
+        pca = faiss.PCAMatrix(from_dimension, dimension)
+        pca.train(train)
+        reduced = faiss.IndexPreTransform(pca, self._new_flat_index(dimension))
+        reduced.add(vectors)
+        
+        # Exact neighbours from the copied vectors, so the live index isn't searched outside the lock
+        exact_index = faiss.IndexFlatL2(from_dimension)
+        exact_index.add(vectors)
+        query_ids = rng.choice(ntotal, min(eval_queries, ntotal), replace=False)
+        search_k = min(k + 1, ntotal)
+        _, exact = exact_index.search(vectors[query_ids], search_k)
+        _, approx = reduced.search(vectors[query_ids], search_k)
+        
+        recalls = []
+        for query_id, exact_row, approx_row in zip(query_ids, exact, approx):
+            truth = [idx for idx in exact_row if idx != query_id][:k]
+            found = [idx for idx in approx_row if idx != query_id][:k]
+            if truth:
+                recalls.append(len(set(truth) & set(found)) / len(truth))
+        
+        eigenvalues = faiss.vector_to_array(pca.eigenvalues)
+        report = {
+            "from_dimension": from_dimension,
+            "to_dimension": dimension,
+            "trained_on": len(train),
+            "eval_queries": len(recalls),
+            "k": k,
+            "recall_at_k": float(np.mean(recalls)) if recalls else None,
+            "explained_variance": float(eigenvalues[:dimension].sum() / eigenvalues.sum()),
+            "vector_bytes_before": ntotal * from_dimension * np.dtype(stored_dtype).itemsize,
+            "vector_bytes_after": ntotal * dimension * np.dtype(self.dtype).itemsize + from_dimension * dimension * 4
         }
+        
+        with lock:
+            self._pending_reduction = {"index": reduced, "generation": generation, "report": report}
+        return report
+    
+    def commit_reduction(self) -> dict:
+        """Swap in the index trained by plan_reduction(); the next commit saves it as a new snapshot"""
+        pending = self._pending_reduction
+        if pending is None:
+            raise ValueError("No reduction has been planned")
+        if pending["generation"] != self.generation:
+            self._pending_reduction = None
+            raise ValueError("Index changed since the reduction was evaluated; plan it again")
+        
+        self.index = pending["index"]
+        self._pending_reduction = None
+        self._snapshot_due = True
+        self.generation += 1
+        print(f"Reduced index from {pending['report']['from_dimension']} to {pending['report']['to_dimension']} dimensions")
+        return pending["report"]
     
-    def export_data(self) -> str:
-        """Export the index and mappings as a zip file"""
-        faiss.write_index(self.index, self.index_path)
-        self._save_mappings()
+    def export_data(self, metadata_path: str = "storage/metadata.json") -> str:
+        """Export the index, mappings and the metadata file at metadata_path as a zip file.
+        
+        The in-memory index is written to a scratch file for the archive, so
+        the committed files on disk are never touched.
+        """
+        import faiss
         
-        # Create zip file
         zip_path = "storage/export.zip"
-        with zipfile.ZipFile(zip_path, 'w') as zipf:
-            zipf.write(self.index_path, "index.faiss")
-            zipf.write(self.mapping_path, "index.mapping.json")  
-            zipf.write("storage/metadata.json", "metadata.json")
+        index_copy = zip_path + ".index.tmp"
+        try:
+            with zipfile.ZipFile(zip_path, 'w') as zipf:
+                if self.index is not None:
+                    faiss.write_index(self.index, index_copy)
+                    zipf.write(index_copy, "index.faiss")
+                zipf.writestr("index.mapping.json", serialization.dumps(self.id_map))
+                zipf.write(metadata_path, "metadata.json")
+        finally:
+            if os.path.exists(index_copy):
+                os.remove(index_copy)
         
         print(f"Exported data to {zip_path}")
-        return zip_path
\ No newline at end of file
+        return zip_path
+
+
+def _encode_record(token: str, journal: list) -> bytes:
+    """One commit log frame holding a transaction's operations"""
+    ops, payloads = [], []
+    for op, vectors in journal:
+        if vectors is not None:
+            vectors = np.ascontiguousarray(vectors)
+            op = {**op, "dtype": vectors.dtype.str, "shape": list(vectors.shape)}
+            payloads.append(vectors.tobytes())
+        ops.append(op)
+    
+    header = serialization.dumps({"token": token, "ops": ops})
+    body = b"".join([_HEADER_LENGTH.pack(len(header)), header] + payloads)
+    return _FRAME.pack(len(body), zlib.crc32(body)) + body
+
+
+def _read_log(path: str) -> Tuple[List[Tuple[str, list]], List[int]]:
+    """Records of a commit log as (token, [(operation, vectors)]), with the offset each ends at.
+    
+    Reading stops at the first frame that is cut short, fails its checksum
+    or is too short for its own header, as a zero-filled tail is.
+    """
+    if not os.path.exists(path):
+        return [], []
+    with open(path, 'rb') as f:
+        data = f.read()
+    
+    records, ends = [], []
+    offset = 0
+    while offset + _FRAME.size <= len(data):
+        length, checksum = _FRAME.unpack_from(data, offset)
+        body = data[offset + _FRAME.size:offset + _FRAME.size + length]
+        if len(body) < length or zlib.crc32(body) != checksum or length < _HEADER_LENGTH.size:
+            break
+        
+        (header_length,) = _HEADER_LENGTH.unpack_from(body)
+        if _HEADER_LENGTH.size + header_length > length:
+            break
+        header = serialization.loads(body[_HEADER_LENGTH.size:_HEADER_LENGTH.size + header_length])
+        position = _HEADER_LENGTH.size + header_length
+        ops = []
+        for op in header["ops"]:
+            vectors = None
+            if "shape" in op:
+                dtype = np.dtype(op.pop("dtype"))
+                shape = op.pop("shape")
+                size = int(np.prod(shape)) * dtype.itemsize
+                vectors = np.frombuffer(body, dtype=dtype, count=int(np.prod(shape)), offset=position).reshape(shape)
+                position += size
+            ops.append((op, vectors))
+        
+        offset += _FRAME.size + length
+        records.append((header["token"], ops))
+        ends.append(offset)
+    return records, ends
+
+
+def _fsync(path: str):
+    with open(path, 'rb') as f:
+        os.fsync(f.fileno())
@@ -1,138 +1,292 @@
-import PyPDF2
+import hashlib
 import re
-from typing import List, Dict
-from langchain.text_splitter import RecursiveCharacterTextSplitter, SentenceTransformersTokenTextSplitter
+from typing import Callable, List, Dict, Optional, Tuple
+
+# (page number, page text) pairs; page numbers start at 1
+Pages = List[Tuple[int, str]]
+
+def extract_pages(file_path: str, progress_callback: Optional[Callable[[int, int], None]] = None) -> List[str]:
+    """Extract the text of every page, reporting (pages_done, pages_total) as it goes"""
+    import PyPDF2
+
+    texts = []
 
-def process_pdf_fixed_size(file_path: str, chunk_size: int = 500, chunk_overlap: int = 50) -> List[Dict]:
-    chunks = []
-    
     with open(file_path, 'rb') as file:
         reader = PyPDF2.PdfReader(file)
-        
-        for page_num, page in enumerate(reader.pages):
-            text = page.extract_text()
-            
-            # Simple chunking by character count
-            for i in range(0, len(text), chunk_size - chunk_overlap):
-                chunk_text = text[i:i+chunk_size]
-                chunks.append({
-                    "text": chunk_text,
-                    "page": page_num + 1,
-                    "start_index": i
-                })
-    
+        total = len(reader.pages)
+
+        for page in reader.pages:
+            texts.append(page.extract_text() or "")
+            if progress_callback:
+                progress_callback(len(texts), total)
+
+    return texts
+
+def hash_page(text: str) -> str:
+    """Fingerprint of a page's extracted text, used to detect changed pages on re-ingestion"""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+def chunk_pages_fixed_size(pages: Pages, chunk_size: int = 500, chunk_overlap: int = 50) -> List[Dict]:
+    chunks = []
+
+    for page_num, text in pages:
+        # Simple chunking by character count
+        for i in range(0, len(text), chunk_size - chunk_overlap):
+            chunk_text = text[i:i+chunk_size]
+            chunks.append({
+                "text": chunk_text,
+                "page": page_num,
+                "start_index": i
+            })
+
     return chunks
 
-def process_pdf_sentence_aware(file_path: str, chunk_size: int = 500, chunk_overlap: int = 50) -> List[Dict]:
+def chunk_pages_sentence_aware(pages: Pages, chunk_size: int = 500, chunk_overlap: int = 50) -> List[Dict]:
     chunks = []
-    
-    with open(file_path, 'rb') as file:
-        reader = PyPDF2.PdfReader(file)
-        
-        for page_num, page in enumerate(reader.pages):
-            text = page.extract_text()
-            
-            # Split into sentences
-            sentences = re.split(r'(?<!\w\.\w.)(?<![A-Z][a-z]\.)(?<=\.|\?|\!)\s', text)
-            
-            current_chunk = ""
-            for sentence in sentences:
-                if len(current_chunk) + len(sentence) > chunk_size:
-                    if current_chunk:
-                        chunks.append({
-                            "text": current_chunk,
-                            "page": page_num + 1,
-                            "start_index": text.find(current_chunk)
-                        })
-                    current_chunk = sentence
+
+    for page_num, text in pages:
+        # Split into sentences
+        sentences = re.split(r'(?<!\w\.\w.)(?<![A-Z][a-z]\.)(?<=\.|\?|\!)\s', text)
+
+        current_chunk = ""
+        for sentence in sentences:
+            if len(current_chunk) + len(sentence) > chunk_size:
+                if current_chunk:
+                    chunks.append({
+                        "text": current_chunk,
+                        "page": page_num,
+                        "start_index": text.find(current_chunk)
+                    })
+                current_chunk = sentence
+            else:
+                if current_chunk:
+                    current_chunk += " " + sentence
                 else:
-                    if current_chunk:
-                        current_chunk += " " + sentence
-                    else:
-                        current_chunk = sentence
-            
-            if current_chunk:
-                chunks.append({
-                    "text": current_chunk,
-                    "page": page_num + 1,
-                    "start_index": text.find(current_chunk)
-                })
-    
+                    current_chunk = sentence
+
+        if current_chunk:
+            chunks.append({
+                "text": current_chunk,
+                "page": page_num,
+                "start_index": text.find(current_chunk)
+            })
+
     return chunks
 
-def process_pdf_paragraph_aware(file_path: str, chunk_size: int = 500) -> List[Dict]:
+def chunk_pages_paragraph_aware(pages: Pages, chunk_size: int = 500) -> List[Dict]:
     chunks = []
-    
-    with open(file_path, 'rb') as file:
-        reader = PyPDF2.PdfReader(file)
-        
-        for page_num, page in enumerate(reader.pages):
-            text = page.extract_text()
-            
-            # Split into paragraphs
-            paragraphs = text.split('\n\n')
-            
-            for paragraph in paragraphs:
-                if paragraph.strip():
-                    # If paragraph is too long, split it
-                    if len(paragraph) > chunk_size:
-                        for i in range(0, len(paragraph), chunk_size):
-                            chunk_text = paragraph[i:i+chunk_size]
-                            chunks.append({
-                                "text": chunk_text,
-                                "page": page_num + 1,
-                                "start_index": text.find(paragraph) + i
-                            })
-                    else:
+
+    for page_num, text in pages:
+        # Split into paragraphs
+        paragraphs = text.split('\n\n')
+
+        for paragraph in paragraphs:
+            if paragraph.strip():
+                # If paragraph is too long, split it
+                if len(paragraph) > chunk_size:
+                    for i in range(0, len(paragraph), chunk_size):
+                        chunk_text = paragraph[i:i+chunk_size]
                         chunks.append({
-                            "text": paragraph,
-                            "page": page_num + 1,
-                            "start_index": text.find(paragraph)
+                            "text": chunk_text,
+                            "page": page_num,
+                            "start_index": text.find(paragraph) + i
                         })
-    
+                else:
+                    chunks.append({
+                        "text": paragraph,
+                        "page": page_num,
+                        "start_index": text.find(paragraph)
+                    })
+
     return chunks
 
-def process_pdf_recursive_character(file_path: str, chunk_size: int = 500, chunk_overlap: int = 50) -> List[Dict]:
+def chunk_pages_recursive_character(pages: Pages, chunk_size: int = 500, chunk_overlap: int = 50) -> List[Dict]:
+    from langchain.text_splitter import RecursiveCharacterTextSplitter
+
     chunks = []
-    
-    with open(file_path, 'rb') as file:
-        reader = PyPDF2.PdfReader(file)
-        
-        for page_num, page in enumerate(reader.pages):
-            text = page.extract_text()
-            
-
-            splitter = RecursiveCharacterTextSplitter(
-                chunk_size=chunk_size,
-                chunk_overlap=chunk_overlap,
-                length_function=len,
-            )
-            
-            page_chunks = splitter.split_text(text)
-            
-            for chunk_text in page_chunks:
-                start_index = text.find(chunk_text)
-                chunks.append({
-                    "text": chunk_text,
-                    "page": page_num + 1,
-                    "start_index": start_index if start_index >= 0 else 0
-                })
-    
+
+    splitter = RecursiveCharacterTextSplitter(
+        chunk_size=chunk_size,
+        chunk_overlap=chunk_overlap,
+        length_function=len,
+    )
+
+    for page_num, text in pages:
+        page_chunks = splitter.split_text(text)
+
+        for chunk_text in page_chunks:
+            start_index = text.find(chunk_text)
+            chunks.append({
+                "text": chunk_text,
+                "page": page_num,
+                "start_index": start_index if start_index >= 0 else 0
+            })
+
+    return chunks
+
+def chunk_pages_token_aware(pages: Pages, model_name: str = "all-MiniLM-L6-v2", chunk_size: int = 500, chunk_overlap: int = 50,
+                            backend: Optional[str] = None) -> List[Dict]:
+    """Chunk by the embedding model's own tokens so every chunk fits its max sequence length"""
+    from config import DEFAULT_EMBEDDING_BACKEND
+    from embeddings import get_model
+
+    model = get_model(model_name, backend or DEFAULT_EMBEDDING_BACKEND)
+    tokenizer = model.tokenizer
+
+    # chunk_size and chunk_overlap are token counts here; leave room for [CLS]/[SEP]
+    window = min(chunk_size, model.max_seq_length - 2)
+    overlap = min(chunk_overlap, window // 2)
+
+    if not pages:
+        return []
+
+    # Tokenise the whole document in one batched call to the fast tokenizer
+    encoded = tokenizer(
+        [text for _, text in pages],
+        add_special_tokens=False,
+        return_offsets_mapping=True,
+        return_attention_mask=False,
+        verbose=False
+    )
+
+    chunks = []
+    for (page_num, text), offsets in zip(pages, encoded["offset_mapping"]):
+        n_tokens = len(offsets)
+        start = 0
+
+        while start < n_tokens:
+            end = min(start + window, n_tokens)
+
+            # Don't cut a word in half: a sub-word token directly follows the previous one.
+            # A single word longer than the window is split anyway.
+            boundary = end
+            while boundary < n_tokens and boundary - start > 1 and offsets[boundary][0] == offsets[boundary - 1][1]:
+                boundary -= 1
+            if boundary >= n_tokens or offsets[boundary][0] != offsets[boundary - 1][1]:
+                end = boundary
+
+            char_start = offsets[start][0]
+            char_end = offsets[end - 1][1]
+            chunks.append({
+                "text": text[char_start:char_end],
+                "page": page_num,
+                "start_index": char_start
+            })
+
+            if end >= n_tokens:
+                break
+
+            next_start = max(end - overlap, start + 1)
+            while next_start < end and offsets[next_start][0] == offsets[next_start - 1][1]:
+                next_start += 1
+            start = next_start
+
     return chunks
 
-def process_pdf(file_path: str, chunking_method: str = "fixed_size", **kwargs) -> List[Dict]:
+def chunk_pages(pages: Pages, chunking_method: str = "fixed_size", model_name: str = "all-MiniLM-L6-v2",
+                backend: Optional[str] = None, **kwargs) -> List[Dict]:
     method_map = {
-        "fixed_size": process_pdf_fixed_size,
-        "sentence_aware": process_pdf_sentence_aware,
-        "paragraph_aware": process_pdf_paragraph_aware,
-        "recursive_character": process_pdf_recursive_character
+        "fixed_size": chunk_pages_fixed_size,
+        "sentence_aware": chunk_pages_sentence_aware,
+        "paragraph_aware": chunk_pages_paragraph_aware,
+        "recursive_character": chunk_pages_recursive_character,
+        "token_aware": chunk_pages_token_aware
     }
-    
+
     if chunking_method not in method_map:
         raise ValueError(f"Unknown chunking method: {chunking_method}")
-    
-    return method_map[chunking_method](file_path, **kwargs)
+
+    # Only the token-aware splitter depends on the embedding model
+    if chunking_method == "token_aware":
+        kwargs["model_name"] = model_name
+        kwargs["backend"] = backend
+
+    # Paragraph-aware chunks never overlap
+    if chunking_method == "paragraph_aware":
+        kwargs.pop("chunk_overlap", None)
+
+    return method_map[chunking_method](pages, **kwargs)
+
+def chunk_metadata(filename: str, chunk: dict, file_hash: str, page_hash: str, model_name: str,
+                   chunking_method: str, chunk_size: int, chunk_overlap: int, backend: str = "torch") -> Dict:
+    return {
+        "document": filename,
+        "page": chunk["page"],
+        "text": chunk["text"],
+        "start_index": chunk["start_index"],
+        "model": model_name,
+        "backend": backend,
+        "chunking_method": chunking_method,
+        "chunk_size": chunk_size,
+        "chunk_overlap": chunk_overlap,
+        "sha256": file_hash,
+        "page_hash": page_hash
+    }
+
+def plan_document(filename: str, file_hash: str, texts: List[str], existing: Dict[str, Dict], model_name: str,
+                  chunking_method: str, chunk_size: int, chunk_overlap: int, backend: str = "torch") -> Dict:
+    """Diff a (re-)ingested document against its stored chunks (chunk_id -> metadata), page by page.
+
+    Pages whose text hash and chunking settings match what is stored keep
+    their chunks and vectors; every other page is re-chunked and re-embedded,
+    and chunks of changed or removed pages are retired.
+    """
+    page_hashes = {page_num: hash_page(text) for page_num, text in enumerate(texts, start=1)}
+    settings = {"chunking_method": chunking_method, "chunk_size": chunk_size, "chunk_overlap": chunk_overlap}
+
+    chunks_by_page = {}
+    for chunk_id, chunk in existing.items():
+        chunks_by_page.setdefault(chunk["page"], []).append(chunk)
+
+    unchanged_pages = {
+        page_num for page_num, chunks in chunks_by_page.items()
+        if page_num in page_hashes and all(
+            chunk.get("page_hash") == page_hashes[page_num]
+            and all(chunk.get(key) == value for key, value in settings.items())
+            for chunk in chunks
+        )
+    }
+
+    kept = {chunk_id: chunk for chunk_id, chunk in existing.items() if chunk["page"] in unchanged_pages}
+    for chunk in kept.values():
+        chunk["sha256"] = file_hash
+
+    changed_pages = [(page_num, texts[page_num - 1]) for page_num in page_hashes if page_num not in unchanged_pages]
+    chunks = chunk_pages(
+        changed_pages,
+        chunking_method=chunking_method,
+        model_name=model_name,
+        backend=backend,
+        chunk_size=chunk_size,
+        chunk_overlap=chunk_overlap
+    )
+
+    # Number chunks within their page so IDs of untouched pages stay stable
+    chunk_ids, metadatas = [], []
+    per_page = {}
+    for chunk in chunks:
+        i = per_page.get(chunk["page"], 0)
+        per_page[chunk["page"]] = i + 1
+        chunk_ids.append(f"{filename}_p{chunk['page']}_{i}")
+        metadatas.append(chunk_metadata(
+            filename, chunk, file_hash, page_hashes[chunk["page"]], model_name, chunking_method, chunk_size, chunk_overlap,
+            backend
+        ))
+
+    return {
+        "chunk_ids": chunk_ids,
+        "metadatas": metadatas,
+        "kept": kept,
+        "retired_ids": [chunk_id for chunk_id in existing if chunk_id not in kept],
+        "pages_reembedded": len(changed_pages),
+        "pages_unchanged": len(unchanged_pages)
+    }
+
+def process_pdf(file_path: str, chunking_method: str = "fixed_size", model_name: str = "all-MiniLM-L6-v2", **kwargs) -> List[Dict]:
+    texts = extract_pages(file_path)
+    pages = list(enumerate(texts, start=1))
+    return chunk_pages(pages, chunking_method, model_name, **kwargs)
 
 def get_available_chunking_methods():
     from config import CHUNKING_METHODS
-    return CHUNKING_METHODS
\ No newline at end of file
+    return CHUNKING_METHODS
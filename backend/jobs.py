@@ -0,0 +1,186 @@
+import queue
+import threading
+import time
+import traceback
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+
+class JobCancelled(Exception):
+    """Raised inside a job's worker when the job has been cancelled"""
+
+
+class JobQueueFull(Exception):
+    """Raised by JobQueue.submit when the backlog is at capacity"""
+
+
+class IngestionJob:
+    def __init__(self, description: str = ""):
+        self.id = str(uuid.uuid4())
+        self.description = description
+        self.status = "queued"
+        self.stage = None
+        self.files_done = 0
+        self.files_total = None
+        self.pages_done = 0
+        self.pages_total = None
+        self.chunks_embedded = 0
+        self.chunks_total = None
+        self.stage_times = {}
+        self.result = None
+        self.error = None
+        self.created_at = datetime.now().isoformat()
+        self._stage_started = None
+        self._cancel_event = threading.Event()
+        self._lock = threading.Lock()
+
+    def start_stage(self, stage: str):
+        """Close the timer on the current stage and start timing the next one"""
+        self.check_cancelled()
+        with self._lock:
+            self._finish_stage()
+            self.stage = stage
+            self._stage_started = time.perf_counter()
+
+    def _finish_stage(self):
+        if self.stage is not None and self._stage_started is not None:
+            elapsed = time.perf_counter() - self._stage_started
+            self.stage_times[self.stage] = round(self.stage_times.get(self.stage, 0.0) + elapsed, 3)
+            self._stage_started = None
+
+    def update(self, **counters):
+        with self._lock:
+            for name, value in counters.items():
+                setattr(self, name, value)
+
+    def cancel(self):
+        self._cancel_event.set()
+
+    @property
+    def cancel_requested(self) -> bool:
+        return self._cancel_event.is_set()
+
+    def check_cancelled(self):
+        if self._cancel_event.is_set():
+            raise JobCancelled(f"Job {self.id} was cancelled")
+
+    def finish(self, status: str, result=None, error: Optional[str] = None):
+        with self._lock:
+            self._finish_stage()
+            self.status = status
+            self.result = result
+            self.error = error
+
+    def to_dict(self) -> Dict:
+        with self._lock:
+            stage_times = dict(self.stage_times)
+            # Include the time spent so far in the stage that is still running
+            if self.stage is not None and self._stage_started is not None:
+                running = time.perf_counter() - self._stage_started
+                stage_times[self.stage] = round(stage_times.get(self.stage, 0.0) + running, 3)
+
+            return {
+                "job_id": self.id,
+                "description": self.description,
+                "status": self.status,
+                "stage": self.stage,
+                "files_done": self.files_done,
+                "files_total": self.files_total,
+                "pages_done": self.pages_done,
+                "pages_total": self.pages_total,
+                "chunks_embedded": self.chunks_embedded,
+                "chunks_total": self.chunks_total,
+                "stage_times": stage_times,
+                "result": self.result,
+                "error": self.error,
+                "created_at": self.created_at
+            }
+
+
+class JobQueue:
+    """Bounded queue of ingestion jobs drained by a fixed pool of worker threads.
+
+    submit() never blocks: once max_queued jobs are waiting it raises
+    JobQueueFull so the API can push back on the client instead of piling up
+    work. Jobs report progress through the IngestionJob handed to them and
+    are expected to call job.check_cancelled() between units of work.
+    """
+
+    def __init__(self, num_workers: int = 1, max_queued: int = 8, max_history: int = 100):
+        self._queue = queue.Queue(maxsize=max_queued)
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+        self.max_history = max_history
+        self._workers = []
+
+        for i in range(num_workers):
+            worker = threading.Thread(target=self._worker, name=f"ingest-worker-{i}", daemon=True)
+            worker.start()
+            self._workers.append(worker)
+
+    def submit(self, fn: Callable, *args, description: str = "", **kwargs) -> IngestionJob:
+        job = IngestionJob(description)
+        try:
+            self._queue.put_nowait((job, fn, args, kwargs))
+        except queue.Full:
+            raise JobQueueFull(f"Ingestion queue is full ({self._queue.maxsize} jobs waiting)")
+
+        with self._lock:
+            self._jobs[job.id] = job
+            self._prune()
+        return job
+
+    def get(self, job_id: str) -> Optional[IngestionJob]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def list(self) -> List[Dict]:
+        with self._lock:
+            jobs = list(self._jobs.values())
+        return [job.to_dict() for job in jobs]
+
+    def cancel(self, job_id: str) -> Optional[IngestionJob]:
+        job = self.get(job_id)
+        if job is None:
+            return None
+
+        job.cancel()
+        # Jobs that haven't started yet are cancelled straight away; running
+        # jobs stop at their next check_cancelled()
+        if job.status == "queued":
+            job.finish("cancelled")
+        return job
+
+    @property
+    def queued(self) -> int:
+        return self._queue.qsize()
+
+    def _prune(self):
+        """Forget the oldest finished jobs once the history limit is reached"""
+        finished = [job_id for job_id, job in self._jobs.items()
+                    if job.status in ("done", "failed", "cancelled")]
+        for job_id in finished[:max(0, len(self._jobs) - self.max_history)]:
+            del self._jobs[job_id]
+
+    def _worker(self):
+        while True:
+            job, fn, args, kwargs = self._queue.get()
+            try:
+                if job.cancel_requested:
+                    job.finish("cancelled")
+                    continue
+
+                job.update(status="running")
+                result = fn(job, *args, **kwargs)
+                job.finish("done", result=result)
+            except JobCancelled:
+                print(f"Job {job.id} cancelled during stage {job.stage}")
+                job.finish("cancelled")
+            except Exception as e:
+                print(f"Job {job.id} failed: {str(e)}")
+                traceback.print_exc()
+                job.finish("failed", error=str(e))
+            finally:
+                self._queue.task_done()
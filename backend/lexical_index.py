@@ -0,0 +1,53 @@
+import re
+import sqlite3
+from typing import Dict, Iterable, List, Tuple
+
+# Words, keeping identifiers such as E-1042, AB_12 or v2.3.1 together so they match as a phrase
+_TERM_PATTERN = re.compile(r"\w+(?:[-./]\w+)*")
+
+
+def match_expression(query: str) -> str:
+    """FTS5 query matching chunks containing any of the query's terms, each term quoted as a phrase"""
+    terms = dict.fromkeys(term.lower() for term in _TERM_PATTERN.findall(query))
+    return " OR ".join(f'"{term}"' for term in terms)
+
+
+def reciprocal_rank_fusion(rankings: Iterable[List[str]], k: int = 60) -> List[Tuple[str, float]]:
+    """Fuse ranked ID lists: each ID scores the sum of 1 / (k + rank) over the lists it appears in"""
+    scores: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, item in enumerate(ranking, start=1):
+            scores[item] = scores.get(item, 0.0) + 1.0 / (k + rank)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
+
+
+class LexicalIndex:
+    """BM25 inverted index over chunk text, kept in an SQLite FTS5 table.
+
+    The table is contentless: it stores the postings but not the text, which
+    lives elsewhere, so removing a document needs the text it was indexed
+    with. Rows are keyed by the owning table's rowid, and every change runs
+    on the caller's connection, inside whatever transaction it has open.
+    """
+
+    def __init__(self, conn: sqlite3.Connection, table: str = "chunk_text_index"):
+        self._conn = conn
+        self.table = table
+        conn.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {table} USING fts5("
+            " text, content='', tokenize='unicode61 remove_diacritics 2'"
+            ")"
+        )
+
+    def add(self, rows: List[Tuple[int, str]]):
+        """Index (rowid, text) pairs"""
+        self._conn.executemany(f"INSERT INTO {self.table} (rowid, text) VALUES (?, ?)", rows)
+
+    def remove(self, rows: List[Tuple[int, str]]):
+        """Unindex (rowid, text) pairs; text must be what the row was indexed with"""
+        self._conn.executemany(
+            f"INSERT INTO {self.table} ({self.table}, rowid, text) VALUES ('delete', ?, ?)", rows
+        )
+
+    def clear(self):
+        self._conn.execute(f"INSERT INTO {self.table} ({self.table}) VALUES ('delete-all')")
@@ -4,22 +4,47 @@ from fastapi.responses import FileResponse
 from fastapi.staticfiles import StaticFiles
 import numpy as np
 from pydantic import BaseModel
-import faiss 
 import tempfile
 import zipfile
 import shutil
 import os
-from typing import List
-import json
+from typing import Any, Dict, List, Optional, Tuple
 import uuid
+import threading
+import functools
+import multiprocessing
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from datetime import datetime
+from starlette.concurrency import run_in_threadpool
 
 
-from ingestion import process_pdf, get_available_chunking_methods
-from embeddings import get_embeddings, get_available_models
+from ingestion import extract_pages, plan_document, get_available_chunking_methods
+from embeddings import (
+    get_embeddings, get_embedding_stats, get_available_models, get_available_backends, model_key,
+    preload_models, get_model_status
+)
 from index_manager import IndexManager
 from metadata_store import MetadataStore
-from config import EMBEDDING_MODELS, CHUNKING_METHODS
+from lexical_index import reciprocal_rank_fusion
+from text_store import TextSegmentStore
+import serialization
+from uploads import save_upload, file_sha256
+from jobs import JobQueue, JobQueueFull
+from query_cache import QueryCache
+from batcher import EmbeddingBatcher
+from executors import MeteredExecutor
+from config import (
+    EMBEDDING_MODELS, CHUNKING_METHODS, MAX_UPLOAD_SIZE, UPLOAD_CHUNK_SIZE,
+    EMBEDDING_BACKENDS, DEFAULT_EMBEDDING_BACKEND,
+    INGEST_WORKERS, INGEST_QUEUE_SIZE,
+    BATCH_INGEST_ROOT,
+    QUERY_EMBEDDING_CACHE_SIZE, QUERY_RESULT_CACHE_SIZE,
+    QUERY_BATCH_MAX_SIZE, QUERY_BATCH_MAX_WAIT_MS, PRELOAD_MODELS,
+    THREAD_PROFILE, THREAD_PROFILE_OVERRIDES, EMBEDDING_DTYPE,
+    CHUNK_TEXT_DIR, CHUNK_TEXT_COMPRESSION, LEXICAL_INDEX_ENABLED, HYBRID_CANDIDATES
+)
+from thread_budget import budget as thread_budget
 
 app = FastAPI(title="Interactive RAG Backend")
 
@@ -28,12 +53,26 @@ app.mount("/storage", StaticFiles(directory="storage"), name="storage")
 class QueryRequest(BaseModel):
     query: str
     k: int = 5
+    # Only search chunks whose metadata matches, e.g. {"document": "a.pdf", "page": 3}
+    filters: Optional[Dict[str, Any]] = None
+    # "vector" (embedding similarity), "lexical" (BM25 over chunk text) or
+    # "hybrid" (both rankings fused by reciprocal rank)
+    mode: str = "vector"
+
+QUERY_MODES = ("vector", "lexical", "hybrid")
 
 
 class UpdateChunkRequest(BaseModel):
     new_text: str
 
 
+class ReduceDimensionsRequest(BaseModel):
+    dimension: int
+    sample_size: int = 20000
+    k: int = 10
+    eval_queries: int = 200
+
+
 class IngestRequest(BaseModel):
     model_name: str = "all-MiniLM-L6-v2"
     chunking_method: str = "fixed_size"
@@ -43,6 +82,8 @@ class IngestRequest(BaseModel):
 
 
 vector_stores = {}
+# Serialises the read-modify-write cycles on uploaded vector stores' files
+vector_store_lock = threading.Lock()
 
 
 # CORS middleware
@@ -54,9 +95,329 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Initialize components
-index_manager = IndexManager("storage/index.faiss")
-metadata_store = MetadataStore("storage/metadata.json")
+# The stores and the ingestion queue are opened by the startup hook, not on
+# import: worker processes started with "spawn" import this module again when
+# the server runs as a script, and must not recover the index or open the
+# stores behind the server's back
+metadata_store: Optional[MetadataStore] = None
+index_manager: Optional[IndexManager] = None
+ingestion_jobs: Optional[JobQueue] = None
+
+# Ingestion runs on background workers; this lock serialises their writes
+# against searches and edits made from request handlers
+store_lock = threading.RLock()
+
+# (model, backend) the indexed chunks were embedded with, or None while nothing
+# is indexed. Refreshed after every commit, so request handlers can check it
+# without waiting on the store lock held by a commit in progress
+indexed_model: Optional[Tuple[str, str]] = None
+
+def _refresh_indexed_model():
+    global indexed_model
+    first_chunk = metadata_store.first_chunk()
+    indexed_model = (first_chunk.get("model", "all-MiniLM-L6-v2"), first_chunk.get("backend", "torch")) if first_chunk else None
+
+def _open_stores():
+    """Open the metadata store and the index, finishing or discarding any commit a crash interrupted"""
+    global metadata_store
+    global index_manager
+    metadata_store = MetadataStore(
+        "storage/metadata.sqlite",
+        legacy_path="storage/metadata.json",
+        text_store=TextSegmentStore(CHUNK_TEXT_DIR, CHUNK_TEXT_COMPRESSION),
+        lexical_index=LEXICAL_INDEX_ENABLED
+    )
+    index_manager = IndexManager("storage/index.faiss", EMBEDDING_DTYPE, commit_token=metadata_store.get_state("index_commit"))
+    _refresh_indexed_model()
+
+@app.on_event("startup")
+def open_stores():
+    global ingestion_jobs
+    with store_lock:
+        _open_stores()
+    ingestion_jobs = JobQueue(num_workers=INGEST_WORKERS, max_queued=INGEST_QUEUE_SIZE)
+
+@contextmanager
+def store_transaction():
+    """Apply index and metadata writes together: both are committed, or neither is.
+    
+    The index files are prepared on disk first; the metadata commit, which
+    records their commit token, is the commit point; the prepared files are
+    moved into place last. On restart IndexManager finishes or discards a
+    commit that was interrupted, according to that token.
+    
+    Commits block on disk writes and on the store lock, so call this from
+    worker threads, never from the event loop.
+    """
+    with store_lock:
+        index_manager.begin_transaction()
+        try:
+            with metadata_store.transaction():
+                yield
+                metadata_store.set_state("index_commit", index_manager.prepare_commit())
+        except BaseException:
+            index_manager.abort_commit()
+            raise
+        index_manager.finish_commit()
+        _refresh_indexed_model()
+
+query_cache = QueryCache(max_embeddings=QUERY_EMBEDDING_CACHE_SIZE, max_results=QUERY_RESULT_CACHE_SIZE)
+
+def _encode_queries(queries: List[str], model_name: str, backend: str) -> np.ndarray:
+    # Queries stay out of the persistent chunk cache
+    return get_embeddings(queries, model_name, use_cache=False, backend=backend)
+
+thread_budget.configure(THREAD_PROFILE_OVERRIDES, THREAD_PROFILE)
+
+# Model inference and searches from request handlers run on these pools, sized
+# by the thread budget, so the event loop keeps serving other requests meanwhile
+executors = {
+    name: MeteredExecutor(name, functools.partial(thread_budget.executor, name))
+    for name in ("query_executor", "embed_executor", "search_executor")
+}
+embed_executor = executors["embed_executor"]
+search_executor = executors["search_executor"]
+
+# Concurrent queries are embedded together in micro-batches
+query_batcher = EmbeddingBatcher(
+    _encode_queries,
+    max_batch_size=QUERY_BATCH_MAX_SIZE,
+    max_wait_ms=QUERY_BATCH_MAX_WAIT_MS,
+    executor=executors["query_executor"]
+)
+
+async def embed_query(query: str, model_name: str, backend: str = "torch") -> np.ndarray:
+    """Query embedding via the in-memory LRU, falling back to the micro-batcher"""
+    embedding = query_cache.get_embedding(model_key(model_name, backend), query)
+    if embedding is None:
+        embedding = await query_batcher.embed(query, model_name, backend)
+        query_cache.put_embedding(model_key(model_name, backend), query, embedding)
+    return embedding
+
+
+@app.on_event("startup")
+async def preload_embedding_models():
+    # Load and warm up configured models before serving so the first request isn't the slow one
+    if PRELOAD_MODELS:
+        await run_in_threadpool(preload_models, PRELOAD_MODELS)
+
+
+@app.on_event("shutdown")
+def close_embedding_pools():
+    # Pool workers each hold a copy of a model; stop them with the server
+    from embedding_pool import close_pools
+    close_pools()
+
+
+def _check_model_compatible(model_name: str, backend: str = "torch"):
+    """Reject ingesting with a different model or backend than the one the index was built with"""
+    if backend not in EMBEDDING_BACKENDS:
+        raise HTTPException(status_code=400, detail=f"Unknown embedding backend: {backend}")
+    
+    if indexed_model is not None:
+        existing_model, existing_backend = indexed_model
+        
+        if existing_model != model_name:
+            error_msg = f"Cannot use model '{model_name}'. Index already contains documents embedded with '{existing_model}'. Please reset the index to use a different model."
+            print(error_msg)
+            raise HTTPException(status_code=400, detail=error_msg)
+        
+        if existing_backend != backend:
+            error_msg = f"Cannot use backend '{backend}'. Index already contains documents embedded with the '{existing_backend}' backend. Please reset the index to use a different backend."
+            print(error_msg)
+            raise HTTPException(status_code=400, detail=error_msg)
+
+
+def _find_unchanged_chunks(filename: str, file_hash: str, chunking_method: str,
+                           chunk_size: int, chunk_overlap: int) -> List[str]:
+    """Chunk IDs of an identical earlier ingest of this file, if there was one"""
+    with store_lock:
+        chunks = metadata_store.find(document=filename)
+    
+    unchanged = chunks and all(
+        chunk.get("sha256") == file_hash
+        and chunk.get("chunking_method") == chunking_method
+        and chunk.get("chunk_size") == chunk_size
+        and chunk.get("chunk_overlap") == chunk_overlap
+        for chunk in chunks.values()
+    )
+    return list(chunks) if unchanged else []
+
+
+def _plan_document(filename: str, file_hash: str, texts: List[str], model_name: str,
+                   chunking_method: str, chunk_size: int, chunk_overlap: int, backend: str = "torch") -> dict:
+    """Diff a (re-)ingested document against its stored chunks, page by page"""
+    with store_lock:
+        existing = metadata_store.find(document=filename)
+    
+    plan = plan_document(filename, file_hash, texts, existing, model_name, chunking_method, chunk_size, chunk_overlap, backend)
+    if existing:
+        print(f"{filename}: {plan['pages_reembedded']} of {len(texts)} pages changed, retiring {len(plan['retired_ids'])} chunks")
+    return plan
+
+
+def _embed_in_batches(job, texts: List[str], model_name: str, backend: str = "torch") -> np.ndarray:
+    """Embed all texts in one engine call, reporting progress and honouring cancellation between batches"""
+    job.update(chunks_total=len(texts), chunks_embedded=0)
+    print(f"Generating embeddings using {model_name} ({backend})...")
+    
+    def on_progress(done: int, total: int):
+        job.update(chunks_embedded=done)
+        job.check_cancelled()
+    
+    embeddings = get_embeddings(texts, model_name, progress_callback=on_progress, backend=backend)
+    print(f"Generated {len(embeddings)} embeddings")
+    return embeddings
+
+
+def _index_chunks(chunk_ids: List[str], embeddings: np.ndarray, metadatas: List[dict],
+                  retired_ids: List[str] = (), kept: dict = None):
+    """Retire old chunks and write new vectors and metadata, one bulk call each, in a single transaction"""
+    with store_transaction():
+        if retired_ids:
+            index_manager.delete_vectors(retired_ids)
+            metadata_store.delete_chunks(retired_ids)
+        
+        if chunk_ids:
+            try:
+                index_manager.add_vectors(embeddings, chunk_ids)
+            except ValueError as e:
+                if "dimension" in str(e):
+                    raise ValueError(f"Dimension mismatch: {e}. Please reset the index to use a different embedding model.")
+                raise
+        
+        updates = dict(kept or {})
+        updates.update(zip(chunk_ids, metadatas))
+        metadata_store.add_chunks(updates)
+
+
+def run_ingestion(job, file_path: str, filename: str, file_hash: str, model_name: str,
+                  chunking_method: str, chunk_size: int, chunk_overlap: int, backend: str = "torch"):
+    """Ingestion pipeline executed by the job queue's worker threads"""
+    job.start_stage("extracting")
+    texts = extract_pages(
+        file_path,
+        progress_callback=lambda done, total: (job.update(pages_done=done, pages_total=total), job.check_cancelled())
+    )
+    
+    # Process PDF with selected chunking method, only for pages that changed
+    job.start_stage("chunking")
+    plan = _plan_document(filename, file_hash, texts, model_name, chunking_method, chunk_size, chunk_overlap, backend)
+    print(f"Extracted {len(plan['chunk_ids'])} chunks from PDF using {chunking_method}")
+    
+    # Generate embeddings with selected model
+    job.start_stage("embedding")
+    embeddings = _embed_in_batches(job, [metadata["text"] for metadata in plan["metadatas"]], model_name, backend)
+    
+    # Last chance to cancel: the index and metadata are then written in one go
+    job.start_stage("indexing")
+    _index_chunks(plan["chunk_ids"], embeddings, plan["metadatas"], plan["retired_ids"], plan["kept"])
+    
+    chunk_ids = list(plan["kept"]) + plan["chunk_ids"]
+    print(f"Successfully ingested {len(plan['chunk_ids'])} chunks")
+    return {
+        "message": "File ingested successfully",
+        "chunk_ids": chunk_ids,
+        "sha256": file_hash,
+        "pages_reembedded": plan["pages_reembedded"],
+        "pages_unchanged": plan["pages_unchanged"],
+        "chunks_retired": len(plan["retired_ids"])
+    }
+
+
+def run_batch_ingestion(job, files: List[dict], model_name: str, chunking_method: str,
+                        chunk_size: int, chunk_overlap: int, results: dict, backend: str = "torch"):
+    """Ingest many PDFs at once: parallel extraction, pooled embedding, one bulk commit"""
+    job.start_stage("extracting")
+    job.update(files_total=len(files), files_done=0, pages_done=0)
+    
+    # PDF parsing is pure Python, so extract in separate processes to use every core
+    texts_by_file = {}
+    pool = ProcessPoolExecutor(
+        max_workers=max(1, min(thread_budget.get("extract_workers"), len(files))),
+        mp_context=multiprocessing.get_context("spawn")
+    )
+    try:
+        futures = {pool.submit(extract_pages, entry["path"]): entry for entry in files}
+        for future in as_completed(futures):
+            entry = futures[future]
+            try:
+                texts_by_file[entry["filename"]] = future.result()
+            except Exception as e:
+                print(f"Error extracting {entry['filename']}: {str(e)}")
+                results[entry["filename"]] = {"status": "failed", "error": str(e)}
+            
+            job.update(
+                files_done=job.files_done + 1,
+                pages_done=job.pages_done + len(texts_by_file.get(entry["filename"], []))
+            )
+            job.check_cancelled()
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+    
+    # Chunk the changed pages of every file, then pool all chunks so embedding runs in full batches
+    job.start_stage("chunking")
+    chunk_ids, metadatas, retired_ids, kept = [], [], [], {}
+    for entry in files:
+        filename = entry["filename"]
+        if filename not in texts_by_file:
+            continue
+        
+        try:
+            plan = _plan_document(
+                filename, entry["sha256"], texts_by_file[filename], model_name, chunking_method, chunk_size, chunk_overlap,
+                backend
+            )
+        except Exception as e:
+            print(f"Error chunking {filename}: {str(e)}")
+            results[filename] = {"status": "failed", "error": str(e)}
+            continue
+        
+        chunk_ids.extend(plan["chunk_ids"])
+        metadatas.extend(plan["metadatas"])
+        retired_ids.extend(plan["retired_ids"])
+        kept.update(plan["kept"])
+        results[filename] = {
+            "status": "ingested",
+            "chunk_ids": list(plan["kept"]) + plan["chunk_ids"],
+            "sha256": entry["sha256"],
+            "pages_reembedded": plan["pages_reembedded"],
+            "pages_unchanged": plan["pages_unchanged"]
+        }
+    print(f"Extracted {len(chunk_ids)} chunks from {len(texts_by_file)} PDFs using {chunking_method}")
+    
+    job.start_stage("embedding")
+    embeddings = _embed_in_batches(job, [metadata["text"] for metadata in metadatas], model_name, backend)
+    
+    job.start_stage("indexing")
+    _index_chunks(chunk_ids, embeddings, metadatas, retired_ids, kept)
+    
+    ingested = sum(1 for result in results.values() if result["status"] == "ingested")
+    print(f"Batch ingested {len(chunk_ids)} chunks from {ingested} files")
+    return {"message": f"Ingested {ingested} of {len(results)} files", "results": results}
+
+
+def _collect_directory(directory: str) -> List[dict]:
+    """PDFs under a server-side directory, which must lie inside BATCH_INGEST_ROOT"""
+    root = os.path.realpath(BATCH_INGEST_ROOT)
+    target = os.path.realpath(os.path.join(root, directory))
+    if target != root and not target.startswith(root + os.sep):
+        raise HTTPException(status_code=400, detail=f"Directory must be inside {BATCH_INGEST_ROOT}")
+    if not os.path.isdir(target):
+        raise HTTPException(status_code=404, detail=f"Directory not found: {directory}")
+    
+    entries = []
+    for dirpath, _, filenames in sorted(os.walk(target)):
+        for name in sorted(filenames):
+            if name.lower().endswith(".pdf"):
+                path = os.path.join(dirpath, name)
+                entries.append({
+                    "path": path,
+                    "filename": os.path.relpath(path, root),
+                    "sha256": file_sha256(path, chunk_size=UPLOAD_CHUNK_SIZE)
+                })
+    return entries
+
 
 @app.post("/ingest")
 async def ingest_pdf(
@@ -64,74 +425,46 @@ async def ingest_pdf(
     model_name: str = Form("all-MiniLM-L6-v2"),
     chunking_method: str = Form("fixed_size"),
     chunk_size: int = Form(500),
-    chunk_overlap: int = Form(50)
+    chunk_overlap: int = Form(50),
+    backend: str = Form(DEFAULT_EMBEDDING_BACKEND)
 ):
+    """Save the upload and queue it for ingestion; poll /ingest_status/{job_id} for progress"""
     try:
-        print(f"Processing file: {file.filename} with model: {model_name}, chunking: {chunking_method}")
+        print(f"Processing file: {file.filename} with model: {model_name} ({backend}), chunking: {chunking_method}")
         
         # Check if we already have an index with a different model
-        if index_manager.index is not None and index_manager.index.ntotal > 0:
-            if metadata_store.metadata:
-                first_chunk_id = next(iter(metadata_store.metadata))
-                existing_model = metadata_store.metadata[first_chunk_id].get("model", "all-MiniLM-L6-v2")
-                
-                if existing_model != model_name:
-                    error_msg = f"Cannot use model '{model_name}'. Index already contains documents embedded with '{existing_model}'. Please reset the index to use a different model."
-                    print(error_msg)
-                    raise HTTPException(status_code=400, detail=error_msg)
-        
-        # Save uploaded file
+        _check_model_compatible(model_name, backend)
+        
+        # Stream uploaded file to disk
         file_path = f"storage/docs/{file.filename}"
-        os.makedirs(os.path.dirname(file_path), exist_ok=True)
-        
-        with open(file_path, "wb") as f:
-            content = await file.read()
-            f.write(content)
-        print(f"File saved to: {file_path}")
-        
-        # Process PDF with selected chunking method
-        chunks = process_pdf(
-            file_path, 
-            chunking_method=chunking_method,
-            chunk_size=chunk_size,
-            chunk_overlap=chunk_overlap
+        upload = await save_upload(file, file_path, max_size=MAX_UPLOAD_SIZE, chunk_size=UPLOAD_CHUNK_SIZE)
+        file_hash = upload["sha256"]
+        print(f"File saved to: {file_path} ({upload['size']} bytes, sha256 {file_hash})")
+        
+        # Skip the whole pipeline if this exact file was already ingested the same way
+        existing_ids = await run_in_threadpool(
+            _find_unchanged_chunks, file.filename, file_hash, chunking_method, chunk_size, chunk_overlap
         )
-        print(f"Extracted {len(chunks)} chunks from PDF using {chunking_method}")
-        
-        # Generate embeddings with selected model
-        texts = [chunk["text"] for chunk in chunks]
-        print(f"Generating embeddings using {model_name}...")
-        embeddings = get_embeddings(texts, model_name)
-        print(f"Generated {len(embeddings)} embeddings")
-        
-        # Add to index and metadata
-        chunk_ids = []
-        for i, (chunk, embedding) in enumerate(zip(chunks, embeddings)):
-            chunk_id = f"{file.filename}_{i}"
-            
-            try:
-                index_manager.add_vector(embedding, chunk_id)
-            except ValueError as e:
-                if "dimension" in str(e):
-                    error_msg = f"Dimension mismatch: {e}. Please reset the index to use a different embedding model."
-                    print(error_msg)
-                    raise HTTPException(status_code=400, detail=error_msg)
-                else:
-                    raise
-            
-            metadata_store.add_chunk(chunk_id, {
-                "document": file.filename,
-                "page": chunk["page"],
-                "text": chunk["text"],
-                "start_index": chunk["start_index"],
-                "model": model_name,
-                "chunking_method": chunking_method
-            })
-            chunk_ids.append(chunk_id)
-        
-        print(f"Successfully ingested {len(chunk_ids)} chunks")
-        return {"message": "File ingested successfully", "chunk_ids": chunk_ids}
+        if existing_ids:
+            print(f"{file.filename} is unchanged, reusing {len(existing_ids)} existing chunks")
+            return {"message": "File already ingested", "chunk_ids": existing_ids, "sha256": file_hash}
+        
+        try:
+            job = ingestion_jobs.submit(
+                run_ingestion,
+                file_path, file.filename, file_hash, model_name,
+                chunking_method, chunk_size, chunk_overlap,
+                backend=backend,
+                description=file.filename
+            )
+        except JobQueueFull as e:
+            raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "10"})
+        
+        print(f"Queued ingestion job {job.id} for {file.filename}")
+        return {"message": "File queued for ingestion", "job_id": job.id, "status": job.status, "sha256": file_hash}
     
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Error in ingest_pdf: {str(e)}")
         import traceback
@@ -139,34 +472,117 @@ async def ingest_pdf(
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@app.post("/query")
-async def query_documents(request: QueryRequest):
+@app.post("/ingest_batch")
+async def ingest_batch(
+    files: List[UploadFile] = File(None),
+    directory: str = Form(None),
+    model_name: str = Form("all-MiniLM-L6-v2"),
+    chunking_method: str = Form("fixed_size"),
+    chunk_size: int = Form(500),
+    chunk_overlap: int = Form(50),
+    backend: str = Form(DEFAULT_EMBEDDING_BACKEND)
+):
+    """Queue many PDFs as one job, from a multipart list and/or a directory under BATCH_INGEST_ROOT"""
     try:
-        query = request.query
-        k = request.k
-        
-        print(f"Received query: '{query}' with k={k}")
-        
-        # Get the model used for the index from metadata
-        if not metadata_store.metadata:
-            raise HTTPException(status_code=400, detail="No documents indexed yet")
-            
-        # Get the model from the first chunk's metadata
-        first_chunk_id = next(iter(metadata_store.metadata))
-        model_name = metadata_store.metadata[first_chunk_id].get("model", "all-MiniLM-L6-v2")
-        
-        print(f"Using model '{model_name}' for query embedding")
-        
-        # Embed query using the same model that was used for indexing
-        query_embedding = get_embeddings([query], model_name)[0]
-        
-        # Search index
-        results = index_manager.search(query_embedding, k)
+        if not files and not directory:
+            raise HTTPException(status_code=400, detail="Provide files or a directory to ingest")
+        
+        _check_model_compatible(model_name, backend)
+        
+        batch = []
+        for file in files or []:
+            file_path = f"storage/docs/{file.filename}"
+            upload = await save_upload(file, file_path, max_size=MAX_UPLOAD_SIZE, chunk_size=UPLOAD_CHUNK_SIZE)
+            batch.append({"path": file_path, "filename": file.filename, "sha256": upload["sha256"]})
+        
+        if directory:
+            batch.extend(await run_in_threadpool(_collect_directory, directory))
+        
+        # Files already ingested unchanged are reported but not queued
+        results = {}
+        to_ingest = []
+        for entry in batch:
+            existing_ids = await run_in_threadpool(
+                _find_unchanged_chunks, entry["filename"], entry["sha256"], chunking_method, chunk_size, chunk_overlap
+            )
+            if existing_ids:
+                results[entry["filename"]] = {"status": "unchanged", "chunk_ids": existing_ids, "sha256": entry["sha256"]}
+            else:
+                to_ingest.append(entry)
+        
+        if not to_ingest:
+            return {"message": "All files already ingested", "results": results}
+        
+        try:
+            job = ingestion_jobs.submit(
+                run_batch_ingestion,
+                to_ingest, model_name, chunking_method, chunk_size, chunk_overlap, results,
+                backend=backend,
+                description=f"batch of {len(to_ingest)} files"
+            )
+        except JobQueueFull as e:
+            raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "10"})
+        
+        print(f"Queued batch ingestion job {job.id} for {len(to_ingest)} files")
+        return {"message": f"{len(to_ingest)} files queued for ingestion", "job_id": job.id, "status": job.status, "results": results}
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"Error in ingest_batch: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.get("/ingest_status/{job_id}")
+async def ingest_status(job_id: str):
+    """Stage, progress counters and per-stage timings of an ingestion job"""
+    job = ingestion_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.to_dict()
+
+
+@app.get("/ingest_jobs")
+async def list_ingest_jobs():
+    return {"jobs": ingestion_jobs.list(), "queued": ingestion_jobs.queued}
+
+
+@app.post("/cancel_ingest/{job_id}")
+async def cancel_ingest(job_id: str):
+    job = ingestion_jobs.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return {"message": "Cancellation requested", "job_id": job_id, "status": job.status}
+
+
+def _search(query: str, query_embedding: Optional[np.ndarray], k: int, mode: str, filters: Optional[Dict[str, Any]]):
+    """Top k chunks with their metadata for a /query request, and the index generation they came from"""
+    enriched_results = []
+    with store_lock:
+        generation = index_manager.generation
+        # Hybrid mode fuses deeper candidate lists than the k it returns
+        candidates = k if mode != "hybrid" else max(4 * k, HYBRID_CANDIDATES)
+        try:
+            lexical_results = metadata_store.search_text(query, candidates, **(filters or {})) if mode != "vector" else []
+            chunk_ids = metadata_store.find_ids(**filters) if filters and mode != "lexical" else None
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        
+        if mode == "lexical":
+            results = lexical_results
+        else:
+            results = index_manager.search(query_embedding, candidates, chunk_ids)
+            if mode == "hybrid":
+                results = reciprocal_rank_fusion([
+                    [chunk_id for chunk_id, _ in results],
+                    [chunk_id for chunk_id, _ in lexical_results]
+                ])[:k]
+        chunks = metadata_store.get_chunks(chunk_id for chunk_id, _ in results)
         
-        # Get metadata for results
-        enriched_results = []
         for chunk_id, score in results:
-            metadata = metadata_store.get_chunk(chunk_id)
+            metadata = chunks.get(chunk_id)
             if metadata:  # Only add if metadata exists
                 enriched_results.append({
                     "chunk_id": chunk_id,
@@ -178,79 +594,277 @@ async def query_documents(request: QueryRequest):
                     "model": metadata.get("model", "unknown"),
                     "chunking_method": metadata.get("chunking_method", "unknown")
                 })
+    return generation, enriched_results
+
+
+@app.post("/query")
+async def query_documents(request: QueryRequest):
+    try:
+        query = request.query
+        k = request.k
+        filters = request.filters or None
+        mode = request.mode
+        
+        if mode not in QUERY_MODES:
+            raise HTTPException(status_code=400, detail=f"Unknown query mode '{mode}'; use one of {', '.join(QUERY_MODES)}")
+        if mode != "vector" and metadata_store.lexical is None:
+            raise HTTPException(status_code=400, detail="The lexical index is disabled (LEXICAL_INDEX_ENABLED=0)")
+        
+        print(f"Received {mode} query: '{query}' with k={k}" + (f", filters={filters}" if filters else ""))
         
+        # The model the index was built with
+        if indexed_model is None:
+            raise HTTPException(status_code=400, detail="No documents indexed yet")
+        model_name, backend = indexed_model
+        
+        # Identical query against an unchanged index: answer from the result cache
+        generation = index_manager.generation
+        cached_results = query_cache.get_results(model_key(model_name, backend), query, k, generation, filters=filters, mode=mode)
+        if cached_results is not None:
+            return {"results": cached_results, "mode": mode}
+        
+        # Embed query using the same model that was used for indexing; lexical queries need no embedding
+        query_embedding = None
+        if mode != "lexical":
+            print(f"Using model '{model_name}' ({backend}) for query embedding")
+            query_embedding = await embed_query(query, model_name, backend)
+        
+        # Search index and get metadata for results
+        generation, enriched_results = await search_executor.run(_search, query, query_embedding, k, mode, filters)
+        
+        query_cache.put_results(model_key(model_name, backend), query, k, generation, enriched_results, filters=filters, mode=mode)
         print(f"Returning {len(enriched_results)} results")
-        return {"results": enriched_results}
+        return {"results": enriched_results, "mode": mode}
     
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Error in query_documents: {str(e)}")
         import traceback
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=str(e))
 
+
+@app.get("/query_cache_stats")
+async def query_cache_stats():
+    return {**query_cache.stats(), "generation": index_manager.generation, "batching": query_batcher.stats()}
+
+
+@app.get("/executor_stats")
+async def executor_stats():
+    """Queue depth, wait and run times of the pools running embeddings and searches"""
+    return {name: executor.stats() for name, executor in executors.items()}
+
+
+@app.get("/thread_profile")
+async def get_thread_profile():
+    """Current CPU thread budget: profile name and per-consumer thread counts"""
+    return thread_budget.status()
+
+
+@app.post("/thread_profile/{mode}")
+async def set_thread_profile(mode: str):
+    """Switch thread budget profile, e.g. to "ingest" for a bulk load and back to "query" after"""
+    if mode not in thread_budget.profiles:
+        raise HTTPException(status_code=400, detail=f"Unknown thread profile: {mode}. Available: {list(thread_budget.profiles)}")
+    
+    # The metered executors look their pools up on each submit, so they pick up the resized ones
+    thread_budget.set_mode(mode)
+    print(f"Switched thread profile to {mode}: {thread_budget.profile}")
+    return thread_budget.status()
+
+
 @app.get("/available_models")
 async def get_available_embedding_models():
     return get_available_models()
 
 
+@app.get("/available_backends")
+async def get_available_embedding_backends():
+    return get_available_backends()
+
+
+@app.get("/embedding_stats")
+async def embedding_stats():
+    """Texts/s and tokens/s of the embedding engine, per model"""
+    return get_embedding_stats()
+
+
 @app.get("/available_chunking_methods")
 async def get_available_chunking_methods_endpoint():
     return get_available_chunking_methods()
 
 
-@app.post("/update_chunk/{chunk_id}")
+def _replace_chunk(chunk_id: str, metadata: dict, embedding: np.ndarray):
+    with store_transaction():
+        metadata_store.update_chunk(chunk_id, metadata)
+        index_manager.update_vector(chunk_id, embedding)
+
+
+@app.post("/update_chunk/{chunk_id:path}")
 async def update_chunk(chunk_id: str, request: UpdateChunkRequest):
     try:
         new_text = request.new_text
         
         # Get the current metadata to find which model was used
-        metadata = metadata_store.get_chunk(chunk_id)
+        metadata = await run_in_threadpool(metadata_store.get_chunk, chunk_id)
         if not metadata:
             raise HTTPException(status_code=404, detail="Chunk not found")
         
         model_name = metadata.get("model", "all-MiniLM-L6-v2")
-        print(f"Updating chunk {chunk_id} using model {model_name}")
-        
-        # Update metadata
-        metadata["text"] = new_text
-        metadata_store.update_chunk(chunk_id, metadata)
+        backend = metadata.get("backend", "torch")
+        print(f"Updating chunk {chunk_id} using model {model_name} ({backend})")
         
         # Re-embed using the same model that was originally used
-        new_embedding = get_embeddings([new_text], model_name)[0]
-        index_manager.update_vector(chunk_id, new_embedding)
+        new_embedding = (await embed_executor.run(get_embeddings, [new_text], model_name, backend=backend))[0]
+        
+        # Update metadata and index
+        metadata["text"] = new_text
+        await run_in_threadpool(_replace_chunk, chunk_id, metadata, new_embedding)
         
         return {"message": "Chunk updated successfully"}
     
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Error in update_chunk: {str(e)}")
         import traceback
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.delete("/delete_chunk/{chunk_id}")
-async def delete_chunk(chunk_id: str):
-    try:
+def _delete_chunk(chunk_id: str):
+    with store_transaction():
         metadata_store.delete_chunk(chunk_id)
         index_manager.delete_vector(chunk_id)
+
+
+@app.delete("/delete_chunk/{chunk_id:path}")
+async def delete_chunk(chunk_id: str):
+    try:
+        await run_in_threadpool(_delete_chunk, chunk_id)
         return {"message": "Chunk deleted successfully"}
     
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+def _list_documents() -> List[dict]:
+    with store_lock:
+        return metadata_store.documents()
+
+@app.get("/documents")
+async def list_documents():
+    """Every indexed document with its chunk and page counts"""
+    return {"documents": await run_in_threadpool(_list_documents)}
+
+def _find_chunks(filters: dict) -> Dict[str, dict]:
+    with store_lock:
+        return metadata_store.get_chunks(metadata_store.find_ids(**filters))
+
+@app.get("/documents/{filename:path}/chunks")
+async def get_document_chunks(filename: str, page: Optional[int] = None):
+    """A document's chunks in order, optionally for one page only"""
+    filters = {"document": filename}
+    if page is not None:
+        filters["page"] = page
+    chunks = await run_in_threadpool(_find_chunks, filters)
+    if not chunks:
+        raise HTTPException(status_code=404, detail="Document not found")
+    return {"document": filename, "chunks": [{"chunk_id": chunk_id, **chunk} for chunk_id, chunk in chunks.items()]}
+
+def _delete_document(filename: str) -> List[str]:
+    with store_lock:
+        # Checked before the transaction, so a 404 doesn't abort it and drop the loaded index
+        chunk_ids = metadata_store.find_ids(document=filename)
+        if not chunk_ids:
+            raise HTTPException(status_code=404, detail="Document not found")
+        with store_transaction():
+            index_manager.delete_vectors(chunk_ids)
+            metadata_store.delete_chunks(chunk_ids)
+    return chunk_ids
+
+@app.delete("/documents/{filename:path}")
+async def delete_document(filename: str):
+    """Remove every chunk and vector of a document in one transaction"""
+    try:
+        chunk_ids = await run_in_threadpool(_delete_document, filename)
+        
+        print(f"Deleted {filename}: {len(chunk_ids)} chunks")
+        return {"message": f"Deleted {len(chunk_ids)} chunks of {filename}", "chunk_ids": chunk_ids}
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"Error in delete_document: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail=str(e))
+
+def _export() -> str:
+    with store_lock:
+        metadata_path = metadata_store.export_json("storage/export_metadata.json")
+        return index_manager.export_data(metadata_path)
+
 @app.get("/export")
 async def export_data():
     try:
         # Create zip file with index and metadata
-        export_path = index_manager.export_data()
+        export_path = await search_executor.run(_export)
         return FileResponse(export_path, media_type="application/zip")
     
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+def _index_stats() -> dict:
+    # Reading the stats loads a lazily opened index and replays its log, so it
+    # runs on the search executor under the lock rather than on the event loop
+    with store_lock:
+        return {**index_manager.get_index_stats(), "metadata_count": len(metadata_store)}
+
 @app.get("/index_status")
 async def index_status():
     """Get information about the current index state"""
-    return index_manager.get_index_stats()
+    return {**await search_executor.run(_index_stats), "model_cache": get_model_status()}
+
+@app.post("/reduce_dimensions")
+async def reduce_dimensions(request: ReduceDimensionsRequest):
+    """Train a PCA reduction on the stored vectors and report its recall; nothing changes until /reduce_dimensions/commit"""
+    def plan():
+        # The lock is held while the vectors are copied, not while the PCA trains
+        return index_manager.plan_reduction(request.dimension, request.sample_size, request.k, request.eval_queries,
+                                            lock=store_lock)
+    
+    try:
+        report = await run_in_threadpool(plan)
+        print(f"Planned PCA reduction: {report}")
+        return {**report, "message": "Review recall_at_k, then POST /reduce_dimensions/commit to apply"}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        print(f"Error in reduce_dimensions: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.post("/reduce_dimensions/commit")
+async def commit_reduce_dimensions():
+    """Apply the reduction last evaluated by /reduce_dimensions"""
+    def commit():
+        # Saved through the two-phase commit, so a crash leaves either the old index or the reduced one
+        with store_transaction():
+            return index_manager.commit_reduction()
+    
+    try:
+        report = await run_in_threadpool(commit)
+        return {**report, "message": "Index reduced"}
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except Exception as e:
+        print(f"Error in commit_reduce_dimensions: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail=str(e))
+
 
 @app.post("/fix_mappings")
 async def fix_mappings():
@@ -275,30 +889,44 @@ async def fix_mappings():
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@app.post("/reset_index")
-async def reset_index():
-    try:
-        # Delete index files
-        index_files = [
-            "storage/index.faiss",
-            "storage/index.faiss.mapping.json",
-            "storage/metadata.json",
-            "storage/export.zip"
-        ]
-        
+def _reset_stores():
+    """Delete the index, metadata and chunk texts and start over with empty stores"""
+    index_files = [
+        "storage/index.faiss",
+        "storage/index.faiss.mapping.json",
+        "storage/index.faiss.log",
+        "storage/metadata.sqlite",
+        "storage/metadata.sqlite-wal",
+        "storage/metadata.sqlite-shm",
+        "storage/metadata.json",
+        "storage/export_metadata.json",
+        "storage/export.zip"
+    ]
+    
+    with store_lock:
+        metadata_store.close()
         for file_path in index_files:
             if os.path.exists(file_path):
                 os.remove(file_path)
                 print(f"Removed {file_path}")
-        
-        # Reinitialize the index manager
-        global index_manager
-        index_manager = IndexManager("storage/index.faiss")
-        
-        # Reinitialize the metadata store
-        global metadata_store
-        metadata_store = MetadataStore("storage/metadata.json")
-        
+        shutil.rmtree("storage/index.faiss.pending", ignore_errors=True)
+        shutil.rmtree(CHUNK_TEXT_DIR, ignore_errors=True)
+        
+        # Reinitialize the metadata store and the index manager
+        generation = index_manager.generation
+        _open_stores()
+        
+        # Carry the generation on past the old index's, so a query that read the old
+        # index and finishes after the reset can't cache its results under a
+        # generation the new index will reach
+        index_manager.generation = generation + 1
+        query_cache.results.clear()
+
+
+@app.post("/reset_index")
+async def reset_index():
+    try:
+        await run_in_threadpool(_reset_stores)
         return {"message": "Index reset successfully. You can now use a different embedding model."}
     
     except Exception as e:
@@ -309,8 +937,8 @@ async def reset_index():
 @app.get("/health")
 async def health_check():
     """Check the health of the index and mappings"""
-    stats = index_manager.get_index_stats()
-    metadata_count = len(metadata_store.metadata)
+    stats = await search_executor.run(_index_stats)
+    metadata_count = stats["metadata_count"]
     
     # Check for consistency
     index_size = stats["index_size"]
@@ -326,22 +954,34 @@ async def health_check():
     }
 
 
+def _extract_zip(zip_path: str, target_dir: str) -> List[str]:
+    with zipfile.ZipFile(zip_path, 'r') as zip_ref:
+        zip_ref.extractall(target_dir)
+        return zip_ref.namelist()
+
+
+def _load_vector_store(index_path: Optional[str], metadata_path: str, mapping_path: str):
+    """Index (None without index_path), metadata and position -> chunk ID mappings of an exported store"""
+    import faiss
+    index = faiss.read_index(index_path) if index_path else None
+    metadata = serialization.load(metadata_path)
+    # Convert string keys to integers
+    mappings = {int(k): v for k, v in serialization.load(mapping_path).items()}
+    return index, metadata, mappings
+
+
 @app.post("/test_export")
 async def test_export(file: UploadFile = File(...), query: str = Body(...), k: int = Body(5)):
     try:
         # Create a temporary directory for extraction
         with tempfile.TemporaryDirectory() as temp_dir:
-            # Save the uploaded zip file
+            # Stream the uploaded zip file to disk
             zip_path = os.path.join(temp_dir, "uploaded_export.zip")
-            with open(zip_path, "wb") as f:
-                content = await file.read()
-                f.write(content)
+            await save_upload(file, zip_path, max_size=MAX_UPLOAD_SIZE, chunk_size=UPLOAD_CHUNK_SIZE)
             
             # Extract the zip file
-            with zipfile.ZipFile(zip_path, 'r') as zip_ref:
-                file_list = zip_ref.namelist()
-                print(f"Files in export zip: {file_list}")
-                zip_ref.extractall(temp_dir)
+            file_list = await search_executor.run(_extract_zip, zip_path, temp_dir)
+            print(f"Files in export zip: {file_list}")
             
             # Check for required files with different possible names
             extracted_index_path = os.path.join(temp_dir, "index.faiss")
@@ -371,29 +1011,23 @@ async def test_export(file: UploadFile = File(...), query: str = Body(...), k: i
                 print(error_msg)
                 raise HTTPException(status_code=400, detail=error_msg)
             
-            # Load the index
-            index = faiss.read_index(extracted_index_path)
-            
-            # Load mappings
-            with open(extracted_mapping_path, 'r') as f:
-                mappings = json.load(f)
-                # Convert string keys to integers
-                mappings = {int(k): v for k, v in mappings.items()}
-            
-            # Load metadata
-            with open(extracted_metadata_path, 'r') as f:
-                metadata = json.load(f)
+            # Load the index, mappings and metadata
+            index, metadata, mappings = await search_executor.run(
+                _load_vector_store, extracted_index_path, extracted_metadata_path, extracted_mapping_path
+            )
             
             # Determine which model was used for the index by checking the first chunk's metadata
             model_name = "all-MiniLM-L6-v2"  # Default fallback
+            backend = "torch"
             if metadata:
                 first_chunk_id = next(iter(metadata))
                 model_name = metadata[first_chunk_id].get("model", "all-MiniLM-L6-v2")
+                backend = metadata[first_chunk_id].get("backend", "torch")
             
-            print(f"Using model '{model_name}' for query embedding in test export")
+            print(f"Using model '{model_name}' ({backend}) for query embedding in test export")
             
             # Embed query using the same model that was used for the index
-            query_embedding = get_embeddings([query], model_name)[0]
+            query_embedding = await embed_query(query, model_name, backend)
             
             # Check if the query vector dimension matches the index dimension
             if query_embedding.shape[0] != index.d:
@@ -406,7 +1040,7 @@ async def test_export(file: UploadFile = File(...), query: str = Body(...), k: i
             
             # Search more results than needed to account for duplicates
             search_k = min(k * 3, index.ntotal)
-            distances, indices = index.search(query_vector, search_k)
+            distances, indices = await search_executor.run(index.search, query_vector, search_k)
             
             # Get metadata for results with deduplication
             enriched_results = []
@@ -438,6 +1072,8 @@ async def test_export(file: UploadFile = File(...), query: str = Body(...), k: i
             
             return {"results": enriched_results}
     
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Error in test_export: {str(e)}")
         import traceback
@@ -447,23 +1083,28 @@ async def test_export(file: UploadFile = File(...), query: str = Body(...), k: i
 @app.post("/upload_vector_store")
 async def upload_vector_store(
     file: UploadFile = File(...),
-    model_name: str = Form("all-MiniLM-L6-v2")
+    model_name: str = Form("all-MiniLM-L6-v2"),
+    backend: str = Form("torch")
 ):
     try:
+        if backend not in EMBEDDING_BACKENDS:
+            raise HTTPException(status_code=400, detail=f"Unknown embedding backend: {backend}")
+        
         # Create a directory for external vector stores
         vector_store_id = str(uuid.uuid4())
         store_dir = f"storage/vector_stores/{vector_store_id}"
         os.makedirs(store_dir, exist_ok=True)
         
-        # Save the uploaded zip file
+        # Stream the uploaded zip file to disk
         zip_path = f"{store_dir}/uploaded.zip"
-        with open(zip_path, "wb") as f:
-            content = await file.read()
-            f.write(content)
+        try:
+            upload = await save_upload(file, zip_path, max_size=MAX_UPLOAD_SIZE, chunk_size=UPLOAD_CHUNK_SIZE)
+        except HTTPException:
+            shutil.rmtree(store_dir)
+            raise
         
         # Extract the zip file
-        with zipfile.ZipFile(zip_path, 'r') as zip_ref:
-            zip_ref.extractall(store_dir)
+        await search_executor.run(_extract_zip, zip_path, store_dir)
         
         # Check if the required files exist
         extracted_index_path = f"{store_dir}/index.faiss"
@@ -486,15 +1127,19 @@ async def upload_vector_store(
         # Store the vector store information
         vector_stores[vector_store_id] = {
             "model_name": model_name,
+            "backend": backend,
             "store_dir": store_dir,
             "index_path": extracted_index_path,
             "metadata_path": extracted_metadata_path,
             "mapping_path": extracted_mapping_path,
+            "sha256": upload["sha256"],
             "created_at": datetime.now().isoformat()
         }
         
         return {"message": "Vector store uploaded successfully", "vector_store_id": vector_store_id}
     
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Error in upload_vector_store: {str(e)}")
         import traceback
@@ -516,19 +1161,12 @@ async def query_vector_store(
         k = request.k
         
         # Load the index, metadata, and mappings for this vector store
-        index = faiss.read_index(store_info["index_path"])
-        
-        with open(store_info["metadata_path"], 'r') as f:
-            metadata = json.load(f)
-        
-        # Load mappings
-        with open(store_info["mapping_path"], 'r') as f:
-            mappings = json.load(f)
-            # Convert string keys to integers
-            mappings = {int(k): v for k, v in mappings.items()}
+        index, metadata, mappings = await search_executor.run(
+            _load_vector_store, store_info["index_path"], store_info["metadata_path"], store_info["mapping_path"]
+        )
         
         # Embed query using the specified model
-        query_embedding = get_embeddings([query], store_info["model_name"])[0]
+        query_embedding = await embed_query(query, store_info["model_name"], store_info.get("backend", "torch"))
         
         # Check dimension compatibility
         if query_embedding.shape[0] != index.d:
@@ -537,7 +1175,7 @@ async def query_vector_store(
         
         # Search in the vector store index
         query_vector = query_embedding.reshape(1, -1)
-        distances, indices = index.search(query_vector, k)
+        distances, indices = await search_executor.run(index.search, query_vector, k)
         
         # Get metadata for results using the mappings
         enriched_results = []
@@ -559,6 +1197,8 @@ async def query_vector_store(
         
         return {"results": enriched_results, "vector_store_id": vector_store_id}
     
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Error in query_vector_store: {str(e)}")
         import traceback
@@ -567,7 +1207,18 @@ async def query_vector_store(
 
 
 
-@app.post("/update_vector_store_chunk/{vector_store_id}/{chunk_id}")
+def _update_vector_store_text(store_info: dict, chunk_id: str, new_text: str):
+    with vector_store_lock:
+        metadata = serialization.load(store_info["metadata_path"])
+        
+        if chunk_id not in metadata:
+            raise HTTPException(status_code=404, detail="Chunk not found")
+        
+        metadata[chunk_id]["text"] = new_text
+        serialization.dump(metadata, store_info["metadata_path"])
+
+
+@app.post("/update_vector_store_chunk/{vector_store_id}/{chunk_id:path}")
 async def update_vector_store_chunk(
     vector_store_id: str,
     chunk_id: str,
@@ -580,22 +1231,13 @@ async def update_vector_store_chunk(
         store_info = vector_stores[vector_store_id]
         new_text = request.new_text
         
-        # Load metadata
-        with open(store_info["metadata_path"], 'r') as f:
-            metadata = json.load(f)
-        
-        if chunk_id not in metadata:
-            raise HTTPException(status_code=404, detail="Chunk not found")
-        
         # Update metadata
-        metadata[chunk_id]["text"] = new_text
-        
-        # Save updated metadata
-        with open(store_info["metadata_path"], 'w') as f:
-            json.dump(metadata, f, indent=2)
+        await search_executor.run(_update_vector_store_text, store_info, chunk_id, new_text)
         
         # Re-embed using the same model
-        new_embedding = get_embeddings([new_text], store_info["model_name"])[0]
+        new_embedding = (await embed_executor.run(
+            get_embeddings, [new_text], store_info["model_name"], backend=store_info.get("backend", "torch")
+        ))[0]
         
         # Update the index (this is complex with FAISS - we'd need to implement update functionality)
         # For now, we'll just update the metadata and note that the index is now out of sync
@@ -603,6 +1245,8 @@ async def update_vector_store_chunk(
         
         return {"message": "Chunk updated successfully (metadata only - index not updated)"}
     
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Error in update_vector_store_chunk: {str(e)}")
         import traceback
@@ -637,35 +1281,12 @@ async def delete_vector_store(vector_store_id: str):
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@app.post("/add_to_vector_store/{vector_store_id}")
-async def add_to_vector_store(
-    vector_store_id: str,
-    text: str = Form(...),
-    document: str = Form("custom"),
-    page: int = Form(1),
-    start_index: int = Form(0)
-):
-    try:
-        if vector_store_id not in vector_stores:
-            raise HTTPException(status_code=404, detail="Vector store not found")
-        
-        store_info = vector_stores[vector_store_id]
-        
-        # Generate embedding for the new text
-        embedding = get_embeddings([text], store_info["model_name"])[0]
-        
-        # Load the existing index
-        index = faiss.read_index(store_info["index_path"])
-        
-        # Load metadata
-        with open(store_info["metadata_path"], 'r') as f:
-            metadata = json.load(f)
-        
-        # Load mappings
-        with open(store_info["mapping_path"], 'r') as f:
-            mappings = json.load(f)
-            # Convert string keys to integers
-            mappings = {int(k): v for k, v in mappings.items()}
+def _add_to_vector_store(store_info: dict, embedding: np.ndarray, text: str, document: str, page: int, start_index: int) -> str:
+    import faiss
+    with vector_store_lock:
+        index, metadata, mappings = _load_vector_store(
+            store_info["index_path"], store_info["metadata_path"], store_info["mapping_path"]
+        )
         
         # Add the new vector to the index
         new_index = index.ntotal
@@ -684,43 +1305,59 @@ async def add_to_vector_store(
             "page": page,
             "start_index": start_index,
             "model": store_info["model_name"],
+            "backend": store_info.get("backend", "torch"),
             "chunking_method": "manual_addition"
         }
         
         # Save updated index, metadata, and mappings
-        faiss.write_index(index, store_info["index_path"])
+        tmp_index_path = store_info["index_path"] + ".tmp"
+        faiss.write_index(index, tmp_index_path)
+        os.replace(tmp_index_path, store_info["index_path"])
         
-        with open(store_info["metadata_path"], 'w') as f:
-            json.dump(metadata, f, indent=2)
+        serialization.dump(metadata, store_info["metadata_path"])
         
-        with open(store_info["mapping_path"], 'w') as f:
-            json.dump(mappings, f, indent=2)
-        
-        return {"message": "Chunk added successfully", "chunk_id": chunk_id}
-    
-    except Exception as e:
-        print(f"Error in add_to_vector_store: {str(e)}")
-        import traceback
-        traceback.print_exc()
-        raise HTTPException(status_code=500, detail=str)
+        serialization.dump(mappings, store_info["mapping_path"])
+        return chunk_id
 
 
-@app.delete("/delete_from_vector_store/{vector_store_id}/{chunk_id}")
-async def delete_from_vector_store(vector_store_id: str, chunk_id: str):
+@app.post("/add_to_vector_store/{vector_store_id}")
+async def add_to_vector_store(
+    vector_store_id: str,
+    text: str = Form(...),
+    document: str = Form("custom"),
+    page: int = Form(1),
+    start_index: int = Form(0)
+):
     try:
         if vector_store_id not in vector_stores:
             raise HTTPException(status_code=404, detail="Vector store not found")
         
         store_info = vector_stores[vector_store_id]
         
-        # Load metadata
-        with open(store_info["metadata_path"], 'r') as f:
-            metadata = json.load(f)
+        # Generate embedding for the new text
+        embedding = (await embed_executor.run(
+            get_embeddings, [text], store_info["model_name"], backend=store_info.get("backend", "torch")
+        ))[0]
         
-        # Load mappings
-        with open(store_info["mapping_path"], 'r') as f:
-            mappings = json.load(f)
-            mappings = {int(k): v for k, v in mappings.items()}
+        # Add the vector and its metadata, then save the store
+        chunk_id = await search_executor.run(
+            _add_to_vector_store, store_info, embedding, text, document, page, start_index
+        )
+        
+        return {"message": "Chunk added successfully", "chunk_id": chunk_id}
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"Error in add_to_vector_store: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+def _delete_from_vector_store(store_info: dict, chunk_id: str):
+    with vector_store_lock:
+        _, metadata, mappings = _load_vector_store(None, store_info["metadata_path"], store_info["mapping_path"])
         
         # Find the index for this chunk ID
         index_to_remove = None
@@ -740,20 +1377,42 @@ async def delete_from_vector_store(vector_store_id: str, chunk_id: str):
             del mappings[index_to_remove]
         
         # Save updated metadata and mappings
-        with open(store_info["metadata_path"], 'w') as f:
-            json.dump(metadata, f, indent=2)
+        serialization.dump(metadata, store_info["metadata_path"])
         
-        with open(store_info["mapping_path"], 'w') as f:
-            json.dump(mappings, f, indent=2)
+        serialization.dump(mappings, store_info["mapping_path"])
+
+
+@app.delete("/delete_from_vector_store/{vector_store_id}/{chunk_id:path}")
+async def delete_from_vector_store(vector_store_id: str, chunk_id: str):
+    try:
+        if vector_store_id not in vector_stores:
+            raise HTTPException(status_code=404, detail="Vector store not found")
+        
+        store_info = vector_stores[vector_store_id]
+        
+        await search_executor.run(_delete_from_vector_store, store_info, chunk_id)
         
         return {"message": "Chunk deleted successfully"}
     
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Error in delete_from_vector_store: {str(e)}")
         import traceback
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=str(e))
 
+
+def _zip_vector_store(store_info: dict) -> str:
+    zip_path = f"{store_info['store_dir']}/export.zip"
+    with vector_store_lock:
+        with zipfile.ZipFile(zip_path, 'w') as zipf:
+            zipf.write(store_info["index_path"], "index.faiss")
+            zipf.write(store_info["mapping_path"], "index.mapping.json")
+            zipf.write(store_info["metadata_path"], "metadata.json")
+    return zip_path
+
+
 @app.get("/export_vector_store/{vector_store_id}")
 async def export_vector_store(vector_store_id: str):
     try:
@@ -763,14 +1422,12 @@ async def export_vector_store(vector_store_id: str):
         store_info = vector_stores[vector_store_id]
         
         # Create a zip file with the vector store contents
-        zip_path = f"{store_info['store_dir']}/export.zip"
-        with zipfile.ZipFile(zip_path, 'w') as zipf:
-            zipf.write(store_info["index_path"], "index.faiss")
-            zipf.write(store_info["mapping_path"], "index.mapping.json")
-            zipf.write(store_info["metadata_path"], "metadata.json")
+        zip_path = await search_executor.run(_zip_vector_store, store_info)
         
         return FileResponse(zip_path, media_type="application/zip", filename=f"vector_store_{vector_store_id}.zip")
     
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Error in export_vector_store: {str(e)}")
         import traceback
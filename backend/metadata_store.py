@@ -1,34 +1,351 @@
 # backend/metadata_store.py
-import json
 import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import serialization
+from lexical_index import LexicalIndex, match_expression
+
+if TYPE_CHECKING:
+    from text_store import TextSegmentStore
+
+from config import SQL_BATCH_SIZE as _SQL_BATCH
+
+# State key present while the lexical index holds every stored chunk's text
+_LEXICAL_SYNCED = "lexical_index_synced"
+
+# Metadata fields with a secondary index, usable as lookup filters
+INDEXED_FIELDS = ("document", "page", "chunking_method", "model")
+
+
+def _field(name: str) -> str:
+    return f"json_extract(metadata, '$.{name}')"
+
 
 class MetadataStore:
-    def __init__(self, metadata_path: str):
-        self.metadata_path = metadata_path
-        self.metadata = {}
-        
-        if os.path.exists(metadata_path):
-            with open(metadata_path, 'r') as f:
-                self.metadata = json.load(f)
-    
+    """Chunk metadata persisted in SQLite (WAL mode), one row per chunk.
+
+    Adds, updates and deletes only touch the rows involved, and metadata is
+    read from disk on demand rather than held in memory, so the cost of a
+    write no longer grows with the corpus. Chunks iterate in insertion order.
+    Writes inside transaction() are committed together, or not at all.
+    Lookups by document, page, chunking method or model go through
+    secondary indexes and cost O(result), not a scan of the corpus.
+    A metadata.json written by earlier versions is imported on first open
+    and renamed to metadata.json.migrated.
+
+    With a text_store, chunk text is written there and rows keep only a
+    "text_ref" to it; get_chunk() and get_chunks() fetch the text back,
+    while bulk reads (find, items, first_chunk) leave it on disk.
+
+    With lexical_index, chunk text is also kept in a BM25 inverted index,
+    updated in the same transaction as each write; search_text() queries it.
+    A state marker records that the index is complete. Opening the store
+    without lexical_index clears the marker, since later writes skip the
+    index, and the next open with it rebuilds the index from the chunks.
+    """
+
+    def __init__(self, db_path: str, legacy_path: Optional[str] = None,
+                 text_store: "Optional[TextSegmentStore]" = None, lexical_index: bool = False):
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self.db_path = db_path
+        self.text_store = text_store
+        self._lock = threading.RLock()
+        self._depth = 0
+
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        # Each commit is the commit point for the matching index files too, so it must survive power loss
+        self._conn.execute("PRAGMA synchronous=FULL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS chunks ("
+            " chunk_id TEXT PRIMARY KEY,"
+            " metadata TEXT NOT NULL"
+            ")"
+        )
+        self._conn.execute("CREATE TABLE IF NOT EXISTS state (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        # Expression indexes over the JSON fields: SQLite keeps them in step with
+        # each row inside the same transaction, and rebuilds any that are missing
+        # from the rows themselves
+        self._conn.execute(f"CREATE INDEX IF NOT EXISTS chunks_document_page ON chunks ({_field('document')}, {_field('page')})")
+        # The (document, page) index only serves page lookups within a document; this one serves page alone
+        self._conn.execute(f"CREATE INDEX IF NOT EXISTS chunks_page ON chunks ({_field('page')})")
+        self._conn.execute(f"CREATE INDEX IF NOT EXISTS chunks_chunking_method ON chunks ({_field('chunking_method')})")
+        self._conn.execute(f"CREATE INDEX IF NOT EXISTS chunks_model ON chunks ({_field('model')})")
+        self.lexical = LexicalIndex(self._conn) if lexical_index else None
+        self._conn.commit()
+
+        if self.lexical is not None:
+            if self.get_state(_LEXICAL_SYNCED) is None:
+                self._rebuild_lexical()
+        else:
+            # Writes made now skip the lexical index, so it has to be rebuilt before it is used again
+            self._conn.execute("DELETE FROM state WHERE key = ?", (_LEXICAL_SYNCED,))
+            self._conn.commit()
+
+        if legacy_path and os.path.exists(legacy_path) and len(self) == 0:
+            self._migrate(legacy_path)
+
+    def _migrate(self, legacy_path: str):
+        metadata = serialization.load(legacy_path)
+        self.add_chunks(metadata)
+        os.replace(legacy_path, legacy_path + ".migrated")
+        print(f"Migrated {len(metadata)} chunks from {legacy_path} to {self.db_path}")
+
+    @contextmanager
+    def transaction(self):
+        """Group writes into one commit, rolled back if the block raises; transactions nest"""
+        with self._lock:
+            self._depth += 1
+            try:
+                yield self
+            except BaseException:
+                self._depth -= 1
+                if self._depth == 0:
+                    self._conn.rollback()
+                raise
+            self._depth -= 1
+            self._commit()
+
+    def _commit(self):
+        if self._depth == 0:
+            # Texts must be on disk before any row referring to them is
+            if self.text_store is not None:
+                self.text_store.sync()
+            self._conn.commit()
+
+    def _encode(self, chunks: Dict[str, dict]) -> List[Tuple[str, str]]:
+        """(chunk_id, JSON) rows, with any text moved out to the text store"""
+        if self.text_store is not None:
+            with_text = [chunk_id for chunk_id, metadata in chunks.items() if "text" in metadata]
+            refs = self.text_store.put([chunks[chunk_id]["text"] for chunk_id in with_text])
+            chunks = dict(chunks)
+            for chunk_id, ref in zip(with_text, refs):
+                metadata = {key: value for key, value in chunks[chunk_id].items() if key != "text"}
+                metadata["text_ref"] = ref
+                chunks[chunk_id] = metadata
+        return [(chunk_id, serialization.dumps_text(metadata)) for chunk_id, metadata in chunks.items()]
+
+    def _texts_of(self, metadatas: List[dict]) -> List[str]:
+        """Each chunk's text, inline or fetched through its text ref"""
+        refs = [metadata["text_ref"] for metadata in metadatas if "text_ref" in metadata]
+        stored = iter(self.text_store.get(refs) if refs else ())
+        return [next(stored) if "text_ref" in metadata else metadata.get("text", "") for metadata in metadatas]
+
+    def _fetch(self, columns: str, chunk_ids: List[str]) -> list:
+        """Rows of the given columns for whichever of the chunk IDs exist"""
+        rows = []
+        for start in range(0, len(chunk_ids), _SQL_BATCH):
+            batch = chunk_ids[start:start + _SQL_BATCH]
+            placeholders = ",".join("?" * len(batch))
+            rows.extend(self._conn.execute(f"SELECT {columns} FROM chunks WHERE chunk_id IN ({placeholders})", batch))
+        return rows
+
+    def _index_texts(self, texts: Dict[str, str]):
+        rowids = dict(self._fetch("chunk_id, rowid", list(texts)))
+        self.lexical.add([(rowids[chunk_id], text) for chunk_id, text in texts.items() if chunk_id in rowids])
+
+    def _unindex_texts(self, chunk_ids: List[str]):
+        rows = self._fetch("rowid, metadata", chunk_ids)
+        texts = self._texts_of([serialization.loads(metadata) for _, metadata in rows])
+        self.lexical.remove([(rowid, text) for (rowid, _), text in zip(rows, texts)])
+
+    def _rebuild_lexical(self):
+        """Index every stored chunk's text, for a store the lexical index is missing or out of date on"""
+        with self.transaction():
+            self.lexical.clear()
+            for page in self._pages():
+                texts = self._texts_of([serialization.loads(metadata) for _, _, metadata in page])
+                self.lexical.add([(rowid, text) for (rowid, _, _), text in zip(page, texts)])
+            self.set_state(_LEXICAL_SYNCED, "1")
+        if len(self):
+            print(f"Built the lexical index for {len(self)} chunks")
+
+    def _attach_texts(self, chunks: Dict[str, dict]) -> Dict[str, dict]:
+        """Replace text refs with the texts they point to, in one read"""
+        with_ref = [metadata for metadata in chunks.values() if "text_ref" in metadata]
+        if with_ref:
+            texts = self.text_store.get([metadata.pop("text_ref") for metadata in with_ref])
+            for metadata, text in zip(with_ref, texts):
+                metadata["text"] = text
+        return chunks
+
+    def get_state(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM state WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def set_state(self, key: str, value: str):
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO state (key, value) VALUES (?, ?)", (key, value))
+            self._commit()
+
     def add_chunk(self, chunk_id: str, metadata: dict):
-        self.metadata[chunk_id] = metadata
-        self._save()
-    
+        self.add_chunks({chunk_id: metadata})
+
+    def add_chunks(self, chunks: Dict[str, dict]):
+        """Insert or replace many chunks (chunk_id -> metadata) in one transaction"""
+        if not chunks:
+            return
+        # Chunks re-added by text ref keep their text, so only new text is (re)indexed
+        texts = {chunk_id: metadata["text"] for chunk_id, metadata in chunks.items() if "text" in metadata}
+        rows = self._encode(chunks)
+        with self.transaction():
+            if self.lexical is not None and texts:
+                self._unindex_texts(list(texts))
+            # An upsert keeps a replaced chunk's position in the iteration order
+            self._conn.executemany(
+                "INSERT INTO chunks (chunk_id, metadata) VALUES (?, ?)"
+                " ON CONFLICT (chunk_id) DO UPDATE SET metadata = excluded.metadata",
+                rows
+            )
+            if self.lexical is not None and texts:
+                self._index_texts(texts)
+
     def get_chunk(self, chunk_id: str) -> dict:
-        return self.metadata.get(chunk_id, {})
-    
+        return self.get_chunks([chunk_id]).get(chunk_id, {})
+
+    def get_chunks(self, chunk_ids: Iterable[str]) -> Dict[str, dict]:
+        """Metadata, text included, for whichever of the chunk IDs exist, in the order asked for"""
+        chunk_ids = list(dict.fromkeys(chunk_ids))
+        with self._lock:
+            rows = self._fetch("chunk_id, metadata", chunk_ids)
+        found = {chunk_id: serialization.loads(metadata) for chunk_id, metadata in rows}
+        return self._attach_texts({chunk_id: found[chunk_id] for chunk_id in chunk_ids if chunk_id in found})
+
+    def first_chunk(self) -> Optional[dict]:
+        """Metadata of the earliest stored chunk, or None if the store is empty"""
+        with self._lock:
+            row = self._conn.execute("SELECT metadata FROM chunks ORDER BY rowid LIMIT 1").fetchone()
+        return serialization.loads(row[0]) if row else None
+
+    def find(self, **filters) -> Dict[str, dict]:
+        """Chunks whose metadata equals every filter (e.g. document="a.pdf", page=3), in insertion order"""
+        where, params = self._where(filters)
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT chunk_id, metadata FROM chunks WHERE {where} ORDER BY rowid", params
+            ).fetchall()
+        return {chunk_id: serialization.loads(metadata) for chunk_id, metadata in rows}
+
+    def find_ids(self, **filters) -> List[str]:
+        """Like find(), but only the chunk IDs, so no metadata is parsed"""
+        where, params = self._where(filters)
+        with self._lock:
+            rows = self._conn.execute(f"SELECT chunk_id FROM chunks WHERE {where} ORDER BY rowid", params).fetchall()
+        return [chunk_id for chunk_id, in rows]
+
+    def _where(self, filters: dict) -> Tuple[str, list]:
+        unknown = sorted(set(filters) - set(INDEXED_FIELDS))
+        if unknown:
+            raise ValueError(f"Cannot filter on {', '.join(unknown)}; indexed fields are {', '.join(INDEXED_FIELDS)}")
+        if not filters:
+            return "1", []
+        return " AND ".join(f"{_field(name)} = ?" for name in filters), list(filters.values())
+
+    def documents(self) -> List[dict]:
+        """Every document with its chunk and page counts, grouped through the document index"""
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {_field('document')}, COUNT(*), COUNT(DISTINCT {_field('page')}) FROM chunks"
+                f" GROUP BY {_field('document')} ORDER BY {_field('document')}"
+            ).fetchall()
+        return [{"document": document, "chunks": chunks, "pages": pages} for document, chunks, pages in rows]
+
+    def search_text(self, query: str, k: int = 10, **filters) -> List[Tuple[str, float]]:
+        """BM25 top k chunks containing any of the query's terms, optionally among those matching filters.
+
+        Scores are negated FTS5 bm25() values, so higher is better.
+        """
+        if self.lexical is None:
+            raise ValueError("The lexical index is not enabled")
+        expression = match_expression(query)
+        if not expression:
+            return []
+
+        table = self.lexical.table
+        where, params = self._where(filters)
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT chunks.chunk_id, bm25({table}) FROM {table} JOIN chunks ON chunks.rowid = {table}.rowid"
+                f" WHERE {table} MATCH ? AND {where} ORDER BY bm25({table}) LIMIT ?",
+                [expression, *params, k]
+            ).fetchall()
+        return [(chunk_id, -score) for chunk_id, score in rows]
+
+    def items(self) -> Iterator[Tuple[str, dict]]:
+        """Every (chunk_id, metadata) pair in insertion order"""
+        for page in self._pages():
+            for _, chunk_id, metadata in page:
+                yield chunk_id, serialization.loads(metadata)
+
+    def _pages(self) -> Iterator[List[Tuple[int, str, str]]]:
+        """Raw (rowid, chunk_id, metadata JSON) rows in insertion order, a page at a time"""
+        last_rowid = 0
+        while True:
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT rowid, chunk_id, metadata FROM chunks WHERE rowid > ? ORDER BY rowid LIMIT ?",
+                    (last_rowid, _SQL_BATCH)
+                ).fetchall()
+            if not rows:
+                return
+            yield rows
+            last_rowid = rows[-1][0]
+
     def update_chunk(self, chunk_id: str, metadata: dict):
-        if chunk_id in self.metadata:
-            self.metadata[chunk_id] = metadata
-            self._save()
-    
+        self.update_chunks({chunk_id: metadata})
+
+    def update_chunks(self, chunks: Dict[str, dict]):
+        """Replace the metadata of chunks that exist; unknown chunk IDs are ignored"""
+        if not chunks:
+            return
+        texts = {chunk_id: metadata["text"] for chunk_id, metadata in chunks.items() if "text" in metadata}
+        rows = [(metadata, chunk_id) for chunk_id, metadata in self._encode(chunks)]
+        with self.transaction():
+            if self.lexical is not None and texts:
+                self._unindex_texts(list(texts))
+            self._conn.executemany("UPDATE chunks SET metadata = ? WHERE chunk_id = ?", rows)
+            if self.lexical is not None and texts:
+                self._index_texts(texts)
+
     def delete_chunk(self, chunk_id: str):
-        if chunk_id in self.metadata:
-            del self.metadata[chunk_id]
-            self._save()
-    
-    def _save(self):
-        os.makedirs(os.path.dirname(self.metadata_path), exist_ok=True)
-        with open(self.metadata_path, 'w') as f:
-            json.dump(self.metadata, f, indent=2)
\ No newline at end of file
+        self.delete_chunks([chunk_id])
+
+    def delete_chunks(self, chunk_ids: list):
+        """Delete many chunks in one transaction"""
+        if not chunk_ids:
+            return
+        with self.transaction():
+            if self.lexical is not None:
+                self._unindex_texts(list(chunk_ids))
+            self._conn.executemany("DELETE FROM chunks WHERE chunk_id = ?", [(chunk_id,) for chunk_id in chunk_ids])
+
+    def export_json(self, path: str) -> str:
+        """Write every chunk, text included, to a metadata.json-format file, streamed rather than built in memory"""
+        with open(path, 'w') as f:
+            f.write("{")
+            rows = (row for page in self._pages() for row in page)
+            for n, (_, chunk_id, metadata) in enumerate(rows):
+                if self.text_store is not None and '"text_ref"' in metadata:
+                    metadata = serialization.dumps_text(self._attach_texts({chunk_id: serialization.loads(metadata)})[chunk_id])
+                # Other rows are already JSON, so they are copied through without parsing
+                f.write(("," if n else "") + serialization.dumps_text(chunk_id) + ":" + metadata)
+            f.write("}")
+        return path
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+            if self.text_store is not None:
+                self.text_store.close()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM chunks").fetchone()[0]
+
+    def __contains__(self, chunk_id: str) -> bool:
+        with self._lock:
+            return self._conn.execute("SELECT 1 FROM chunks WHERE chunk_id = ?", (chunk_id,)).fetchone() is not None
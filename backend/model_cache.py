@@ -0,0 +1,114 @@
+import os
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Callable, Dict, Hashable, Optional
+
+
+def model_footprint(model) -> int:
+    """Bytes held by a model's parameters and buffers (or its ONNX weights file)"""
+    if hasattr(model, "parameters"):
+        tensors = list(model.parameters()) + list(model.buffers())
+        return sum(tensor.numel() * tensor.element_size() for tensor in tensors)
+    model_path = getattr(model, "model_path", None)
+    if model_path and os.path.exists(model_path):
+        return os.path.getsize(model_path)
+    return 0
+
+
+class ModelCache:
+    """Loaded models under a memory budget, evicting the least recently used.
+
+    Each model is loaded at most once at a time (per-key lock) and its
+    footprint measured after loading. When the total exceeds max_bytes, idle
+    models are evicted oldest first; models checked out with using() are
+    never evicted while in use, so the cache may run over budget until they
+    are released. An evicted model is simply loaded again on its next use.
+    """
+
+    def __init__(self, max_bytes: int = 0, footprint_fn: Callable = model_footprint):
+        self.max_bytes = max_bytes
+        self.footprint_fn = footprint_fn
+        self.evictions = 0
+        self._models = OrderedDict()
+        self._sizes = {}
+        self._refs = {}
+        self._lock = threading.Lock()
+        self._load_locks = {}
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self._lock:
+            return key in self._models
+
+    def peek(self, key: Hashable):
+        """The model if it is loaded, without loading it or counting as a use"""
+        with self._lock:
+            return self._models.get(key)
+
+    def get(self, key: Hashable, loader: Callable[[], object]):
+        """Return the model, loading it with loader() if it isn't cached"""
+        with self._lock:
+            if key in self._models:
+                self._models.move_to_end(key)
+                return self._models[key]
+            load_lock = self._load_locks.setdefault(key, threading.Lock())
+
+        with load_lock:
+            # Another thread may have finished loading while we waited
+            with self._lock:
+                if key in self._models:
+                    self._models.move_to_end(key)
+                    return self._models[key]
+
+            model = loader()
+            size = self.footprint_fn(model)
+
+            with self._lock:
+                self._models[key] = model
+                self._sizes[key] = size
+                self._evict(keep=key)
+            return model
+
+    @contextmanager
+    def using(self, key: Hashable, loader: Callable[[], object]):
+        """Check a model out for the duration of a with-block; it can't be evicted meanwhile"""
+        with self._lock:
+            self._refs[key] = self._refs.get(key, 0) + 1
+        try:
+            yield self.get(key, loader)
+        finally:
+            with self._lock:
+                self._refs[key] -= 1
+                if not self._refs[key]:
+                    del self._refs[key]
+                self._evict()
+
+    def _evict(self, keep: Optional[Hashable] = None):
+        if not self.max_bytes:
+            return
+
+        total = sum(self._sizes.values())
+        for key in list(self._models):
+            if total <= self.max_bytes:
+                break
+            if key == keep or self._refs.get(key):
+                continue
+            del self._models[key]
+            total -= self._sizes.pop(key)
+            self.evictions += 1
+            print(f"Evicted model {key} from cache ({total} of {self.max_bytes} bytes in use)")
+
+        if keep is not None and total > self.max_bytes:
+            print(f"Model cache is over budget ({total} of {self.max_bytes} bytes): nothing idle left to evict")
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "bytes": sum(self._sizes.values()),
+                "max_bytes": self.max_bytes,
+                "evictions": self.evictions,
+                "models": [
+                    {"key": key, "bytes": self._sizes[key], "in_use": self._refs.get(key, 0)}
+                    for key in self._models
+                ]
+            }
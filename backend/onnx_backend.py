@@ -0,0 +1,211 @@
+import json
+import os
+from datetime import datetime
+from typing import List
+
+import numpy as np
+
+# Sentences embedded by both backends to check an export before it is used
+VALIDATION_SENTENCES = [
+    "The quick brown fox jumps over the lazy dog.",
+    "How do I reset my password?",
+    "Error code E-1042 indicates the pump pressure sensor has failed.",
+    "Revenue grew 12% year over year, driven mainly by subscription sales.",
+    "Paris is the capital of France.",
+    "a",
+    "Section 4.2: the warranty does not cover damage caused by improper installation, "
+    "misuse, or repairs carried out by anyone other than an authorised service centre.",
+    "Les modèles multilingues peuvent encoder des phrases dans plusieurs langues.",
+]
+
+
+def export_model(model, export_dir: str):
+    """Export a SentenceTransformer's transformer to ONNX, with its tokenizer and pooling settings"""
+    import torch
+
+    os.makedirs(export_dir, exist_ok=True)
+    transformer = model[0].auto_model
+    tokenizer = model.tokenizer
+
+    dummy = tokenizer(["export the embedding model"], return_tensors="pt")
+    input_names = list(dummy.keys())
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+    dynamic_axes["last_hidden_state"] = {0: "batch", 1: "sequence"}
+
+    transformer.eval()
+    with torch.no_grad():
+        torch.onnx.export(
+            transformer,
+            (dict(dummy),),
+            os.path.join(export_dir, "model.onnx"),
+            input_names=input_names,
+            output_names=["last_hidden_state"],
+            dynamic_axes=dynamic_axes,
+            opset_version=14,
+            do_constant_folding=True
+        )
+
+    tokenizer.save_pretrained(export_dir)
+
+    # Reproduce the SentenceTransformer head: pooling, then optional normalisation
+    pooling = "mean"
+    normalize = False
+    for module in model:
+        kind = type(module).__name__
+        if kind == "Pooling":
+            config = module.get_config_dict()
+            if config.get("pooling_mode_cls_token"):
+                pooling = "cls"
+            elif config.get("pooling_mode_max_tokens"):
+                pooling = "max"
+        elif kind == "Normalize":
+            normalize = True
+
+    with open(os.path.join(export_dir, "pooling.json"), "w") as f:
+        json.dump({
+            "pooling": pooling,
+            "normalize": normalize,
+            "max_seq_length": model.max_seq_length,
+            "dimension": model.get_sentence_embedding_dimension()
+        }, f, indent=2)
+
+
+def quantize_model(export_dir: str):
+    """Dynamic int8 quantization of the exported weights; activations stay float"""
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    quantize_dynamic(
+        os.path.join(export_dir, "model.onnx"),
+        os.path.join(export_dir, "model-int8.onnx"),
+        weight_type=QuantType.QInt8
+    )
+
+
+def cosine_agreement(reference: np.ndarray, candidate: np.ndarray) -> np.ndarray:
+    """Row-wise cosine similarity between two embedding matrices"""
+    reference = reference / np.linalg.norm(reference, axis=1, keepdims=True)
+    candidate = candidate / np.linalg.norm(candidate, axis=1, keepdims=True)
+    return np.sum(reference * candidate, axis=1)
+
+
+class OnnxEmbedder:
+    """ONNX Runtime stand-in for a SentenceTransformer.
+
+    Exposes the parts of the SentenceTransformer interface the rest of the
+    backend relies on (encode, tokenizer, max_seq_length and the embedding
+    dimension), so it can be cached and used interchangeably with it.
+    """
+
+    def __init__(self, export_dir: str, quantized: bool = False, threads: int = 0):
+        import onnxruntime
+        from transformers import AutoTokenizer
+
+        with open(os.path.join(export_dir, "pooling.json")) as f:
+            head = json.load(f)
+
+        self.pooling = head["pooling"]
+        self.normalize = head["normalize"]
+        self.max_seq_length = head["max_seq_length"]
+        self.dimension = head["dimension"]
+        self.quantized = quantized
+        self.tokenizer = AutoTokenizer.from_pretrained(export_dir)
+
+        options = onnxruntime.SessionOptions()
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        # Threads come from the thread budget; 0 lets ONNX Runtime use every core
+        options.intra_op_num_threads = threads
+        self.model_path = os.path.join(export_dir, "model-int8.onnx" if quantized else "model.onnx")
+        self.session = onnxruntime.InferenceSession(self.model_path, options, providers=["CPUExecutionProvider"])
+        self.input_names = [model_input.name for model_input in self.session.get_inputs()]
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.dimension
+
+    def encode(self, sentences: List[str], batch_size: int = 32, convert_to_numpy: bool = True,
+               show_progress_bar: bool = False, **kwargs) -> np.ndarray:
+        embeddings = np.empty((len(sentences), self.dimension), dtype=np.float32)
+
+        for start in range(0, len(sentences), batch_size):
+            batch = sentences[start:start + batch_size]
+            encoded = self.tokenizer(
+                batch,
+                padding=True,
+                truncation=True,
+                max_length=self.max_seq_length,
+                return_tensors="np"
+            )
+            feed = {name: encoded[name].astype(np.int64) for name in self.input_names}
+            hidden = self.session.run(None, feed)[0]
+            embeddings[start:start + len(batch)] = self._pool(hidden, encoded["attention_mask"])
+
+        return embeddings
+
+    def _pool(self, hidden: np.ndarray, attention_mask: np.ndarray) -> np.ndarray:
+        mask = attention_mask[..., None].astype(np.float32)
+        if self.pooling == "cls":
+            pooled = hidden[:, 0]
+        elif self.pooling == "max":
+            pooled = np.where(mask > 0, hidden, -1e9).max(axis=1)
+        else:
+            pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+
+        if self.normalize:
+            pooled = pooled / np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+        return pooled
+
+
+def load_onnx_embedder(model_name: str, model_dir: str, quantize: bool = False,
+                       min_cosine: float = 0.99, reference=None, threads: int = 0) -> OnnxEmbedder:
+    """Load the ONNX export of a model, exporting and validating it on first use.
+
+    Before a variant is used for the first time its embeddings of
+    VALIDATION_SENTENCES are compared with the PyTorch model's; if any falls
+    below min_cosine the variant is rejected. Passing results are recorded in
+    validation.json next to the export so the check runs once per variant.
+    """
+    export_dir = os.path.join(model_dir, model_name.replace("/", "__"))
+    variant = "int8" if quantize else "fp32"
+    validation_path = os.path.join(export_dir, "validation.json")
+
+    validation = {}
+    if os.path.exists(validation_path):
+        with open(validation_path) as f:
+            validation = json.load(f)
+
+    needs_export = not os.path.exists(os.path.join(export_dir, "model.onnx"))
+    if (needs_export or variant not in validation) and reference is None:
+        from sentence_transformers import SentenceTransformer
+        reference = SentenceTransformer(model_name, device="cpu")
+
+    if needs_export:
+        print(f"Exporting {model_name} to ONNX in {export_dir}")
+        export_model(reference, export_dir)
+    if quantize and not os.path.exists(os.path.join(export_dir, "model-int8.onnx")):
+        print(f"Quantizing {model_name} to int8")
+        quantize_model(export_dir)
+
+    embedder = OnnxEmbedder(export_dir, quantized=quantize, threads=threads)
+
+    if variant not in validation:
+        expected = reference.encode(VALIDATION_SENTENCES, convert_to_numpy=True, show_progress_bar=False)
+        actual = embedder.encode(VALIDATION_SENTENCES)
+        similarity = cosine_agreement(expected, actual)
+        worst = float(similarity.min())
+
+        if worst < min_cosine:
+            raise ValueError(
+                f"ONNX {variant} export of {model_name} disagrees with PyTorch: "
+                f"min cosine similarity {worst:.4f} is below {min_cosine}"
+            )
+
+        print(f"Validated ONNX {variant} export of {model_name}: min cosine similarity {worst:.4f}")
+        validation[variant] = {
+            "min_cosine": worst,
+            "mean_cosine": float(similarity.mean()),
+            "threshold": min_cosine,
+            "validated_at": datetime.now().isoformat()
+        }
+        with open(validation_path, "w") as f:
+            json.dump(validation, f, indent=2)
+
+    return embedder
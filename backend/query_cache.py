@@ -0,0 +1,103 @@
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
+
+import numpy as np
+
+
+class LRUCache:
+    """Thread-safe bounded mapping that forgets the least recently used key"""
+
+    def __init__(self, maxsize: int = 1024):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+            self.misses += 1
+            return default
+
+    def put(self, key: Hashable, value: Any):
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0
+            }
+
+
+def normalise_query(query: str) -> str:
+    """Canonical form of a query for cache keys: NFKC with whitespace collapsed"""
+    return " ".join(unicodedata.normalize("NFKC", query).split())
+
+
+def _freeze(filters: Optional[Dict]) -> Optional[tuple]:
+    if not filters:
+        return None
+    return tuple(sorted((key, value) for key, value in filters.items() if value is not None))
+
+
+class QueryCache:
+    """Caches query embeddings and search results for repeated queries.
+
+    Embeddings are keyed by (model, normalised query) and never go stale.
+    Results are keyed by (model, normalised query, k, filters, mode, generation),
+    where generation is the index's mutation counter, so any ingest, edit or
+    delete makes every earlier result unreachable instead of stale.
+    """
+
+    def __init__(self, max_embeddings: int = 1024, max_results: int = 1024):
+        self.embeddings = LRUCache(max_embeddings)
+        self.results = LRUCache(max_results)
+
+    def get_embedding(self, model_name: str, query: str) -> Optional[np.ndarray]:
+        return self.embeddings.get((model_name, normalise_query(query)))
+
+    def put_embedding(self, model_name: str, query: str, embedding: np.ndarray):
+        # float16 embeddings stay half precision; anything else is stored as float32
+        embedding = np.array(embedding, dtype=np.float16 if embedding.dtype == np.float16 else np.float32)
+        embedding.setflags(write=False)
+        self.embeddings.put((model_name, normalise_query(query)), embedding)
+
+    def _results_key(self, model_name: str, query: str, k: int, filters: Optional[Dict], mode: str,
+                     generation: Hashable) -> tuple:
+        return (model_name, normalise_query(query), k, _freeze(filters), mode, generation)
+
+    def get_results(self, model_name: str, query: str, k: int, generation: Hashable, filters: Optional[Dict] = None,
+                    mode: str = "vector"):
+        return self.results.get(self._results_key(model_name, query, k, filters, mode, generation))
+
+    def put_results(self, model_name: str, query: str, k: int, generation: Hashable, results,
+                    filters: Optional[Dict] = None, mode: str = "vector"):
+        self.results.put(self._results_key(model_name, query, k, filters, mode, generation), results)
+
+    def clear(self):
+        self.embeddings.clear()
+        self.results.clear()
+
+    def stats(self) -> Dict:
+        return {"embeddings": self.embeddings.stats(), "results": self.results.stats()}
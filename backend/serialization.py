@@ -0,0 +1,43 @@
+import json
+import os
+from typing import Any
+
+try:
+    import orjson
+except ImportError:  # the standard library is several times slower but reads and writes the same files
+    orjson = None
+
+
+def dumps(obj: Any) -> bytes:
+    """Compact JSON; integer dict keys (index positions) become strings, as with the json module"""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(obj, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+def dumps_text(obj: Any) -> str:
+    """dumps() as a str, for SQLite TEXT columns"""
+    return dumps(obj).decode("utf-8")
+
+
+def loads(data) -> Any:
+    """Parse JSON from bytes or str, compact or pretty-printed"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def load(path: str) -> Any:
+    with open(path, 'rb') as f:
+        return loads(f.read())
+
+
+def dump(obj: Any, path: str, sync: bool = False):
+    """Write obj to path atomically: readers see the old file or the new one, never a partial write"""
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(dumps(obj))
+        if sync:
+            f.flush()
+            os.fsync(f.fileno())
+    os.replace(tmp_path, path)
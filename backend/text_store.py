@@ -0,0 +1,143 @@
+import mmap
+import os
+import threading
+import zlib
+from collections import OrderedDict
+from typing import Callable, List, Optional
+
+CODECS = ("", "zlib", "zstd")
+
+
+def _compressor(codec: str) -> Optional[Callable[[bytes], bytes]]:
+    if codec == "zstd":
+        import zstandard
+        return zstandard.ZstdCompressor(level=3).compress
+    if codec == "zlib":
+        return lambda data: zlib.compress(data, 6)
+    return None
+
+
+def _decompress(codec: str, data: bytes) -> bytes:
+    if codec == "zstd":
+        import zstandard
+        return zstandard.ZstdDecompressor().decompress(data)
+    if codec == "zlib":
+        return zlib.decompress(data)
+    return data
+
+
+class TextSegmentStore:
+    """Chunk texts in append-only segment files, read back through mmap.
+
+    put() packs texts into blocks of about block_size bytes, compresses each
+    block with codec ("zlib", or "zstd" with the zstandard package; "" stores
+    them raw) and appends it to the current segment, starting a new segment
+    past segment_max_bytes. The refs it returns,
+    [segment, block offset, block length, codec, start, end], are the offset
+    index: kept with each chunk's metadata, they locate its text without any
+    text being held in memory. Space taken by replaced or deleted texts is
+    not reclaimed.
+    """
+
+    def __init__(self, directory: str, codec: str = "", block_size: int = 64 * 1024,
+                 segment_max_bytes: int = 256 * 1024 ** 2):
+        if codec not in CODECS:
+            raise ValueError(f"Unknown text compression codec {codec!r}; use one of {CODECS}")
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.codec = codec
+        self.block_size = block_size
+        self.segment_max_bytes = segment_max_bytes
+        # Raises ImportError here, not on the first write, if zstandard is missing
+        self._compress = _compressor(codec)
+        self._lock = threading.Lock()
+
+        segments = sorted(int(name[8:14]) for name in os.listdir(directory) if name.startswith("segment-"))
+        self._segment = segments[-1] if segments else 1
+        self._writer = open(self._path(self._segment), 'ab')
+        self._maps = {}
+        # Recently decompressed blocks, so neighbouring chunks don't decompress the same block again
+        self._blocks = OrderedDict()
+        self._max_blocks = 64
+
+    def _path(self, segment: int) -> str:
+        return os.path.join(self.directory, f"segment-{segment:06d}.dat")
+
+    def put(self, texts: List[str]) -> List[list]:
+        """Append texts and return one ref per text, in order"""
+        refs = []
+        with self._lock:
+            block = bytearray()
+            spans = []
+            for text in texts:
+                data = text.encode("utf-8")
+                if spans and len(block) + len(data) > self.block_size:
+                    refs.extend(self._write_block(bytes(block), spans))
+                    block = bytearray()
+                    spans = []
+                spans.append((len(block), len(block) + len(data)))
+                block += data
+            if spans:
+                refs.extend(self._write_block(bytes(block), spans))
+            # Make the bytes visible to mmap readers
+            self._writer.flush()
+        return refs
+
+    def _write_block(self, block: bytes, spans: list) -> List[list]:
+        if self._writer.tell() >= self.segment_max_bytes:
+            self._writer.close()
+            self._segment += 1
+            self._writer = open(self._path(self._segment), 'ab')
+
+        payload = self._compress(block) if self._compress else block
+        offset = self._writer.tell()
+        self._writer.write(payload)
+        return [[self._segment, offset, len(payload), self.codec, start, end] for start, end in spans]
+
+    def get(self, refs: List[list]) -> List[str]:
+        with self._lock:
+            return [self._read(ref) for ref in refs]
+
+    def _read(self, ref: list) -> str:
+        segment, offset, length, codec, start, end = ref
+        if start == end:
+            # An empty text may be all that was written to its segment, and an empty file can't be mapped
+            return ""
+        if not codec:
+            return self._map(segment, offset + length)[offset + start:offset + end].decode("utf-8")
+
+        key = (segment, offset)
+        block = self._blocks.get(key)
+        if block is None:
+            block = _decompress(codec, self._map(segment, offset + length)[offset:offset + length])
+            self._blocks[key] = block
+            if len(self._blocks) > self._max_blocks:
+                self._blocks.popitem(last=False)
+        else:
+            self._blocks.move_to_end(key)
+        return block[start:end].decode("utf-8")
+
+    def _map(self, segment: int, needed: int) -> mmap.mmap:
+        """Read-only map of a segment, remapped once it has grown past the mapped length"""
+        mapped = self._maps.get(segment)
+        if mapped is None or len(mapped) < needed:
+            if mapped is not None:
+                mapped.close()
+            with open(self._path(segment), 'rb') as f:
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            self._maps[segment] = mapped
+        return mapped
+
+    def sync(self):
+        """Flush appended texts to disk, before metadata referring to them is committed"""
+        with self._lock:
+            self._writer.flush()
+            os.fsync(self._writer.fileno())
+
+    def close(self):
+        with self._lock:
+            self._writer.close()
+            for mapped in self._maps.values():
+                mapped.close()
+            self._maps.clear()
+            self._blocks.clear()
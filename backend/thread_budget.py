@@ -0,0 +1,121 @@
+import os
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional
+
+_CORES = os.cpu_count() or 1
+
+# Built-in profiles; config.THREAD_PROFILE_OVERRIDES is merged over them at startup.
+#   torch                     PyTorch intra-op threads (process-wide)
+#   onnx                      ONNX Runtime intra-op threads, fixed per session when a model loads
+#   faiss                     OpenMP threads per FAISS search
+#   query_executor            threads embedding micro-batched queries
+#   embed_executor            threads re-embedding edited or added chunks for request handlers
+#   search_executor           threads running FAISS and BM25 searches for request handlers
+#   extract_workers           processes parsing PDFs in batch ingestion
+#   embedding_pool_processes  processes encoding large jobs (1 disables the pool)
+DEFAULT_PROFILES = {
+    # Keep cores free for concurrent searches and request handling
+    "query": {
+        "torch": max(1, _CORES // 2),
+        "onnx": max(1, _CORES // 2),
+        "faiss": max(1, _CORES // 4),
+        "query_executor": max(2, _CORES // 2),
+        "embed_executor": 2,
+        "search_executor": max(2, _CORES // 2),
+        "extract_workers": min(2, _CORES),
+        "embedding_pool_processes": max(1, _CORES // 4)
+    },
+    # Give encoding and extraction nearly everything; searches get one thread
+    "ingest": {
+        "torch": max(1, _CORES - 1),
+        "onnx": max(1, _CORES - 1),
+        "faiss": 1,
+        "query_executor": 2,
+        "embed_executor": 1,
+        "search_executor": 2,
+        "extract_workers": min(4, _CORES),
+        "embedding_pool_processes": max(1, _CORES // 2)
+    }
+}
+
+
+class ThreadBudget:
+    """Single owner of the thread counts handed to PyTorch, FAISS and our executors.
+
+    A profile maps each consumer to a thread (or process) count; switching
+    profile at runtime applies the new counts to the runtimes already loaded
+    and resizes the executors it owns. Runtimes imported later pick the
+    budget up through apply() / faiss_threads, so setting a profile never
+    forces torch or faiss to be imported.
+    """
+
+    def __init__(self, profiles: Optional[Dict[str, Dict[str, int]]] = None, mode: str = "query"):
+        self.profiles = {name: dict(counts) for name, counts in (profiles or DEFAULT_PROFILES).items()}
+        self.mode = None
+        self._executors = {}
+        self._lock = threading.Lock()
+        self.set_mode(mode)
+
+    def configure(self, overrides: Dict[str, Dict[str, int]], mode: str):
+        """Merge per-profile overrides over the current profiles (new profile names are added)"""
+        with self._lock:
+            for name, counts in overrides.items():
+                self.profiles[name] = {**self.profiles.get(name, {}), **counts}
+        self.set_mode(mode)
+
+    @property
+    def profile(self) -> Dict[str, int]:
+        return self.profiles[self.mode]
+
+    def get(self, name: str, default: int = 1) -> int:
+        return self.profile.get(name, default)
+
+    @property
+    def faiss_threads(self) -> int:
+        return self.get("faiss")
+
+    def set_mode(self, mode: str):
+        if mode not in self.profiles:
+            raise ValueError(f"Unknown thread profile: {mode}")
+        with self._lock:
+            self.mode = mode
+            # Executors are recreated at their new size; the old ones finish their queued work
+            for name, executor in list(self._executors.items()):
+                if executor._max_workers != self.get(name):
+                    executor.shutdown(wait=False)
+                    del self._executors[name]
+        self.apply()
+
+    def pin(self, **counts: int):
+        """Hold this process to fixed counts (e.g. an embedding pool worker's threads), whatever profile it started with.
+
+        The counts go into a "pinned" profile over the current one, so later
+        apply() calls, such as the one after a model loads, keep them.
+        """
+        with self._lock:
+            self.profiles["pinned"] = {**self.profile, **counts}
+        self.set_mode("pinned")
+
+    def apply(self):
+        """Push the current counts into whichever runtimes are already imported"""
+        if "torch" in sys.modules:
+            sys.modules["torch"].set_num_threads(self.get("torch"))
+        if "faiss" in sys.modules:
+            # OpenMP settings are per thread; searches also set faiss_threads themselves
+            sys.modules["faiss"].omp_set_num_threads(self.faiss_threads)
+
+    def executor(self, name: str) -> ThreadPoolExecutor:
+        """Thread pool sized by the current profile, created on first use"""
+        with self._lock:
+            if name not in self._executors:
+                self._executors[name] = ThreadPoolExecutor(max_workers=self.get(name), thread_name_prefix=name)
+            return self._executors[name]
+
+    def status(self) -> Dict:
+        return {"mode": self.mode, "profile": dict(self.profile), "profiles": list(self.profiles), "cores": _CORES}
+
+
+# Process-wide budget shared by the embedding engine, the index and the API
+budget = ThreadBudget()
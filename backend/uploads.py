@@ -0,0 +1,65 @@
+import hashlib
+import os
+from typing import Dict, Optional
+
+from fastapi import HTTPException, UploadFile
+from starlette.concurrency import run_in_threadpool
+
+DEFAULT_CHUNK_SIZE = 1024 * 1024
+
+
+def _write_block(f, hasher, block: bytes):
+    hasher.update(block)
+    f.write(block)
+
+
+def file_sha256(path: str, chunk_size: int = DEFAULT_CHUNK_SIZE) -> str:
+    """SHA-256 of a file on disk, read block by block"""
+    hasher = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(chunk_size), b""):
+            hasher.update(block)
+    return hasher.hexdigest()
+
+
+async def save_upload(
+    file: UploadFile,
+    dest_path: str,
+    max_size: Optional[int] = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE
+) -> Dict:
+    """Stream an upload to disk block by block, computing its SHA-256 on the way.
+
+    Disk writes and hashing run in the threadpool so the event loop is never
+    blocked, and at most one block of the upload is held in memory. The file is
+    written to a temporary name first and only moved into place once complete.
+    """
+    if max_size and file.size is not None and file.size > max_size:
+        raise HTTPException(status_code=413, detail=f"Upload exceeds the maximum size of {max_size} bytes")
+
+    os.makedirs(os.path.dirname(dest_path) or ".", exist_ok=True)
+    tmp_path = dest_path + ".part"
+    hasher = hashlib.sha256()
+    size = 0
+
+    f = await run_in_threadpool(open, tmp_path, "wb")
+    try:
+        while True:
+            block = await file.read(chunk_size)
+            if not block:
+                break
+
+            size += len(block)
+            if max_size and size > max_size:
+                raise HTTPException(status_code=413, detail=f"Upload exceeds the maximum size of {max_size} bytes")
+
+            await run_in_threadpool(_write_block, f, hasher, block)
+    except BaseException:
+        await run_in_threadpool(f.close)
+        os.remove(tmp_path)
+        raise
+
+    await run_in_threadpool(f.close)
+    os.replace(tmp_path, dest_path)
+
+    return {"path": dest_path, "size": size, "sha256": hasher.hexdigest()}
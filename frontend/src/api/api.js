@@ -9,14 +9,45 @@ const api = axios.create({
   },
 });
 
-export const uploadDocument = async (formData) => {
+const sleep = (ms) => new Promise((resolve) => setTimeout(resolve, ms));
+
+export const getIngestStatus = async (jobId) => {
+  const response = await api.get(`/ingest_status/${jobId}`);
+  return response.data;
+};
+
+export const cancelIngest = async (jobId) => {
+  const response = await api.post(`/cancel_ingest/${jobId}`);
+  return response.data;
+};
+
+// Ingestion runs as a background job: poll until it finishes and hand back its result.
+export const uploadDocument = async (formData, onProgress) => {
   try {
     const response = await api.post('/ingest', formData, {
       headers: {
         'Content-Type': 'multipart/form-data',
       },
     });
-    return response.data;
+
+    // Unchanged re-uploads are answered straight away without a job
+    if (!response.data.job_id) {
+      return response.data;
+    }
+
+    while (true) {
+      const job = await getIngestStatus(response.data.job_id);
+      if (onProgress) {
+        onProgress(job);
+      }
+      if (job.status === 'done') {
+        return job.result;
+      }
+      if (job.status === 'failed' || job.status === 'cancelled') {
+        throw new Error(job.error || `Ingestion ${job.status}`);
+      }
+      await sleep(1000);
+    }
   } catch (error) {
     console.error('Error uploading document:', error);
     
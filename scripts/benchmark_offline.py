@@ -0,0 +1,98 @@
+"""Offline benchmark of chunking, embedding, indexing and /query latency.
+
+Runs against a throwaway storage directory with the deterministic "hash"
+embedding backend, so it needs no model download and measures everything
+except the model itself.
+
+    python scripts/benchmark_offline.py --pages 2000 --queries 500
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend")
+
+WORDS = (
+    "pump pressure sensor error code valve warranty install repair revenue growth subscription "
+    "quarter customer support network latency index search vector chunk document page model "
+    "battery voltage firmware update reset password account invoice shipment order"
+).split()
+
+
+def synthetic_pages(n_pages: int, words_per_page: int, seed: int = 0):
+    rng = random.Random(seed)
+    return [
+        (page_num, " ".join(rng.choice(WORDS) for _ in range(words_per_page)) + ".")
+        for page_num in range(1, n_pages + 1)
+    ]
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+def run(n_pages: int, words_per_page: int, n_queries: int, model_name: str, chunking_method: str):
+    os.environ["EMBEDDING_BACKEND"] = "hash"
+    os.environ.setdefault("EMBEDDING_CACHE_PATH", "storage/embedding_cache.sqlite")
+    workdir = tempfile.mkdtemp(prefix="rag-bench-")
+    os.makedirs(os.path.join(workdir, "storage", "docs"))
+    os.chdir(workdir)
+    sys.path.insert(0, BACKEND_DIR)
+
+    from fastapi.testclient import TestClient
+    from ingestion import chunk_pages, chunk_metadata
+    from embeddings import get_embeddings
+    import main
+
+    pages = synthetic_pages(n_pages, words_per_page)
+
+    started = time.perf_counter()
+    chunks = chunk_pages(pages, chunking_method, model_name, backend="hash", chunk_size=500, chunk_overlap=50)
+    chunk_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    embeddings = get_embeddings([chunk["text"] for chunk in chunks], model_name, use_cache=False, backend="hash")
+    embed_seconds = time.perf_counter() - started
+
+    chunk_ids = [f"bench.pdf_p{chunk['page']}_{i}" for i, chunk in enumerate(chunks)]
+    metadatas = [
+        chunk_metadata("bench.pdf", chunk, "bench", "bench", model_name, chunking_method, 500, 50, "hash")
+        for chunk in chunks
+    ]
+    # Entering the client runs the startup hooks, which open the stores
+    with TestClient(main.app) as client:
+        started = time.perf_counter()
+        main._index_chunks(chunk_ids, embeddings, metadatas)
+        index_seconds = time.perf_counter() - started
+
+        rng = random.Random(1)
+        queries = [" ".join(rng.choice(WORDS) for _ in range(rng.randint(2, 6))) for _ in range(n_queries)]
+        latencies = []
+        for query in queries:
+            started = time.perf_counter()
+            response = client.post("/query", json={"query": query, "k": 5})
+            latencies.append(time.perf_counter() - started)
+            response.raise_for_status()
+
+    print(f"corpus:    {n_pages} pages -> {len(chunks)} chunks ({chunking_method}, {model_name}, hash backend)")
+    print(f"chunking:  {chunk_seconds:.3f}s ({len(chunks) / chunk_seconds:.0f} chunks/s)")
+    print(f"embedding: {embed_seconds:.3f}s ({len(chunks) / embed_seconds:.0f} chunks/s)")
+    print(f"indexing:  {index_seconds:.3f}s ({len(chunks) / index_seconds:.0f} chunks/s)")
+    print(f"/query:    {n_queries} queries, p50 {percentile(latencies, 50) * 1000:.2f}ms, "
+          f"p99 {percentile(latencies, 99) * 1000:.2f}ms, {n_queries / sum(latencies):.0f} qps")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline ingestion and query benchmark with the hash embedding backend")
+    parser.add_argument("--pages", type=int, default=1000)
+    parser.add_argument("--words-per-page", type=int, default=400)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--model", default="all-MiniLM-L6-v2", help="sets the embedding dimensions")
+    parser.add_argument("--chunking", default="fixed_size")
+    args = parser.parse_args()
+
+    run(args.pages, args.words_per_page, args.queries, args.model, args.chunking)
@@ -0,0 +1,76 @@
+"""Measure how long importing the backend takes, using python -X importtime.
+
+Fails (exit code 1) if a heavy dependency is imported eagerly or the total
+import time exceeds the budget, so slow cold starts are caught early.
+
+    python scripts/import_time.py
+    python scripts/import_time.py --module main --max-seconds 2 --top 15
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend")
+
+# Must only be imported on first use, never when the backend module loads
+HEAVY_MODULES = ["torch", "sentence_transformers", "transformers", "faiss", "langchain", "PyPDF2", "onnxruntime"]
+
+
+def measure_imports(module: str):
+    """Run `import module` in a fresh interpreter and parse its -X importtime report"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=BACKEND_DIR,
+        capture_output=True,
+        text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr[-2000:]}")
+
+    imports = []
+    for line in result.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        imports.append({
+            "name": name.strip(),
+            "depth": (len(name) - len(name.lstrip()) - 1) // 2,
+            "self_us": int(self_us),
+            "cumulative_us": int(cumulative_us)
+        })
+    return imports
+
+
+def report(module: str, max_seconds: float, top: int) -> bool:
+    imports = measure_imports(module)
+    total_us = sum(entry["self_us"] for entry in imports)
+
+    print(f"import {module}: {total_us / 1e6:.3f}s across {len(imports)} modules\n")
+    print(f"{'cumulative':>12} {'self':>10}  module")
+    for entry in sorted(imports, key=lambda entry: entry["cumulative_us"], reverse=True)[:top]:
+        print(f"{entry['cumulative_us'] / 1000:>10.1f}ms {entry['self_us'] / 1000:>8.1f}ms  "
+              f"{'  ' * entry['depth']}{entry['name']}")
+
+    ok = True
+    eager = sorted({entry["name"].split(".")[0] for entry in imports} & set(HEAVY_MODULES))
+    if eager:
+        print(f"\nFAIL: heavy modules imported eagerly: {', '.join(eager)}")
+        ok = False
+    if total_us / 1e6 > max_seconds:
+        print(f"\nFAIL: import took {total_us / 1e6:.3f}s, budget is {max_seconds}s")
+        ok = False
+    if ok:
+        print(f"\nOK: no heavy modules imported, within the {max_seconds}s budget")
+    return ok
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Import-time report and regression check for the backend")
+    parser.add_argument("--module", default="main", help="backend module to import (default: main)")
+    parser.add_argument("--max-seconds", type=float, default=3.0, help="fail if importing takes longer than this")
+    parser.add_argument("--top", type=int, default=20, help="number of slowest imports to list")
+    args = parser.parse_args()
+
+    sys.exit(0 if report(args.module, args.max_seconds, args.top) else 1)
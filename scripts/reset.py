@@ -5,16 +5,32 @@ import argparse
 STORAGE_DIR = "../storage"
 DOCS_DIR = os.path.join(STORAGE_DIR, "docs")
 INDEX_PATH = os.path.join(STORAGE_DIR, "index.faiss")
-METADATA_PATH = os.path.join(STORAGE_DIR, "metadata.json")
+METADATA_PATH = os.path.join(STORAGE_DIR, "metadata.sqlite")
+TEXT_DIR = os.path.join(STORAGE_DIR, "text_segments")
+
+# The files /reset_index removes: the index with its mappings and commit log,
+# the metadata database with its WAL files, and the pre-SQLite metadata.json
+INDEX_FILES = [
+    INDEX_PATH,
+    INDEX_PATH + ".mapping.json",
+    INDEX_PATH + ".log",
+    METADATA_PATH,
+    METADATA_PATH + "-wal",
+    METADATA_PATH + "-shm",
+    os.path.join(STORAGE_DIR, "metadata.json")
+]
 
 def reset_storage(keep_docs=False):
-    if os.path.exists(INDEX_PATH):
-        os.remove(INDEX_PATH)
-        print("Removed index.faiss")
+    for path in INDEX_FILES:
+        if os.path.exists(path):
+            os.remove(path)
+            print(f"Removed {os.path.basename(path)}")
     
-    if os.path.exists(METADATA_PATH):
-        os.remove(METADATA_PATH)
-        print("Removed metadata.json")
+    # A prepared index commit and the chunk texts
+    for path in (INDEX_PATH + ".pending", TEXT_DIR):
+        if os.path.exists(path):
+            shutil.rmtree(path)
+            print(f"Removed {os.path.basename(path)} directory")
     
     if not keep_docs and os.path.exists(DOCS_DIR):
         shutil.rmtree(DOCS_DIR)
@@ -27,4 +43,4 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Reset storage.")
     parser.add_argument("--keep-docs", action="store_true", help="Keep original PDFs (default: remove all)")
     args = parser.parse_args()
-    reset_storage(args.keep_docs)
\ No newline at end of file
+    reset_storage(args.keep_docs)
@@ -6,6 +6,10 @@ def reset_index():
     index_files = [
         "storage/index.faiss",
         "storage/index.faiss.mapping.json",
+        "storage/index.faiss.log",
+        "storage/metadata.sqlite",
+        "storage/metadata.sqlite-wal",
+        "storage/metadata.sqlite-shm",
         "storage/metadata.json",
         "storage/export.zip"
     ]
@@ -15,6 +19,12 @@ def reset_index():
             os.remove(file_path)
             print(f"Removed {file_path}")
     
+    # Chunk texts and any prepared index commit go too, as with /reset_index
+    for dir_path in ["storage/text_segments", "storage/index.faiss.pending"]:
+        if os.path.exists(dir_path):
+            shutil.rmtree(dir_path)
+            print(f"Removed {dir_path}")
+    
     # Clear the docs directory but keep the folder
     docs_dir = "storage/docs"
     if os.path.exists(docs_dir):
@@ -1,42 +1,46 @@
 # scripts/verify_integrity.py
+"""Check that the index, its mappings and the metadata agree.
+
+Run it with the server stopped: opening the index finishes or discards an
+interrupted commit and replays the commit log, as server startup does.
+"""
 import os
-import json
-import faiss
+import sqlite3
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+from index_manager import IndexManager
 
 def verify_integrity():
     # Check if index exists
     index_path = "storage/index.faiss"
-    mapping_path = index_path + ".mapping.json"
-    metadata_path = "storage/metadata.json"
+    metadata_path = "storage/metadata.sqlite"
     
-    if not os.path.exists(index_path):
+    if not os.path.exists(index_path) and not os.path.exists(index_path + ".log"):
         print("Index file does not exist")
         return False
     
-    if not os.path.exists(mapping_path):
-        print("Mapping file does not exist")
-        return False
-    
     if not os.path.exists(metadata_path):
-        print("Metadata file does not exist")
+        print("Metadata database does not exist")
         return False
     
-    # Load index
-    index = faiss.read_index(index_path)
-    index_size = index.ntotal
-    
-    # Load mappings
-    with open(mapping_path, 'r') as f:
-        mapping_data = json.load(f)
-        id_map = {int(k): v for k, v in mapping_data.get("id_map", {}).items()}
+    # Load chunk IDs and the token of the last commit
+    conn = sqlite3.connect(f"file:{metadata_path}?mode=ro", uri=True)
+    try:
+        chunk_ids = {row[0] for row in conn.execute("SELECT chunk_id FROM chunks")}
+        row = conn.execute("SELECT value FROM state WHERE key = 'index_commit'").fetchone()
+    finally:
+        conn.close()
     
-    # Load metadata
-    with open(metadata_path, 'r') as f:
-        metadata = json.load(f)
+    # Load index and mappings (index position -> chunk ID) as of that commit
+    manager = IndexManager(index_path, commit_token=row[0] if row else None)
+    index_size = manager.index.ntotal if manager.index is not None else 0
+    id_map = manager.id_map
     
     # Check consistency
     mappings_count = len(id_map)
-    metadata_count = len(metadata)
+    metadata_count = len(chunk_ids)
+    mapped_chunks = set(id_map.values())
     
     print(f"Index size: {index_size}")
     print(f"Mappings count: {mappings_count}")
@@ -46,7 +50,7 @@ def verify_integrity():
     valid_mappings = all(0 <= idx < index_size for idx in id_map.keys())
     
     # Check if all chunk IDs in metadata have mappings
-    all_chunks_have_mappings = all(chunk_id in mapping_data.get("reverse_id_map", {}) for chunk_id in metadata.keys())
+    all_chunks_have_mappings = chunk_ids <= mapped_chunks
     
     is_consistent = (index_size == mappings_count == metadata_count and 
                     valid_mappings and all_chunks_have_mappings)
@@ -55,9 +59,13 @@ def verify_integrity():
     
     if not is_consistent:
         # Find missing mappings
-        missing_mappings = [chunk_id for chunk_id in metadata.keys() if chunk_id not in mapping_data.get("reverse_id_map", {})]
+        missing_mappings = chunk_ids - mapped_chunks
         print(f"Missing mappings for {len(missing_mappings)} chunks")
         
+        # Find mappings to chunks the metadata no longer has
+        orphaned = mapped_chunks - chunk_ids
+        print(f"Mappings without metadata: {len(orphaned)}")
+        
         # Find invalid indices
         invalid_indices = [idx for idx in id_map.keys() if idx < 0 or idx >= index_size]
         print(f"Invalid indices in mapping: {invalid_indices}")
@@ -65,4 +73,4 @@ def verify_integrity():
     return is_consistent
 
 if __name__ == "__main__":
-    verify_integrity()
\ No newline at end of file
+    verify_integrity()
@@ -0,0 +1,6 @@
+import os
+import sys
+
+# Backend modules import each other by bare name, as they run from backend/;
+# put that directory on the path for tests that load them as backend.<module>
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
@@ -0,0 +1,114 @@
+import importlib
+import importlib.util
+import os
+import tempfile
+import time
+import unittest
+
+from fastapi.testclient import TestClient
+
+
+def _write_pdf(path, pages):
+    """A minimal PDF with one line of Helvetica text per page"""
+    objects = ["<< /Type /Catalog /Pages 2 0 R >>",
+               f"<< /Type /Pages /Kids [{' '.join(f'{3 + 2 * i} 0 R' for i in range(len(pages)))}] /Count {len(pages)} >>"]
+    font = 3 + 2 * len(pages)
+    for i, text in enumerate(pages):
+        stream = f"BT /F1 10 Tf 20 800 Td ({text}) Tj ET"
+        objects.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 842] /Contents {4 + 2 * i} 0 R "
+                       f"/Resources << /Font << /F1 {font} 0 R >> >> >>")
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream")
+    objects.append("<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+
+    out, offsets = "%PDF-1.4\n", []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += f"{number} 0 obj\n{body}\nendobj\n"
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n" + "".join(f"{offset:010d} 00000 n \n" for offset in offsets)
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF"
+    with open(path, "w") as f:
+        f.write(out)
+
+
+class TestBatchIngest(unittest.TestCase):
+    """/ingest_batch against a server working in a temporary directory, embedding with the hash backend"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.cwd = os.getcwd()
+        cls.temp_dir = tempfile.TemporaryDirectory()
+        # main resolves storage/ against the working directory, when imported and when the stores open
+        os.chdir(cls.temp_dir.name)
+        os.makedirs("storage/docs/batch")
+        try:
+            cls.main = importlib.import_module("backend.main")
+        except ImportError as e:
+            os.chdir(cls.cwd)
+            cls.temp_dir.cleanup()
+            raise unittest.SkipTest(f"backend not importable here: {e}")
+        cls.client = TestClient(cls.main.app)
+        cls.client.__enter__()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.client.__exit__(None, None, None)
+        cls.main.metadata_store.close()
+        os.chdir(cls.cwd)
+        cls.temp_dir.cleanup()
+
+    def _ingest_directory(self, directory):
+        return self.client.post("/ingest_batch", data={"directory": directory, "backend": "hash", "chunk_size": 100})
+
+    def _wait(self, job_id):
+        deadline = time.monotonic() + 60
+        while time.monotonic() < deadline:
+            job = self.client.get(f"/ingest_status/{job_id}").json()
+            if job["status"] in ("done", "failed", "cancelled"):
+                return job
+            time.sleep(0.05)
+        self.fail(f"job {job_id} did not finish")
+
+    def test_directory_outside_the_root_is_rejected(self):
+        for directory in ("..", "batch/../../..", "/etc"):
+            response = self._ingest_directory(directory)
+            self.assertEqual(response.status_code, 400, directory)
+        self.assertEqual(self._ingest_directory("missing").status_code, 404)
+
+    def test_unreadable_file_is_reported_without_failing_the_batch(self):
+        os.makedirs("storage/docs/broken")
+        with open("storage/docs/broken/not_a.pdf", "w") as f:
+            f.write("not a PDF")
+
+        response = self._ingest_directory("broken")
+        self.assertEqual(response.status_code, 200, response.text)
+        job = self._wait(response.json()["job_id"])
+
+        self.assertEqual(job["status"], "done", job["error"])
+        result = job["result"]["results"]["broken/not_a.pdf"]
+        self.assertEqual(result["status"], "failed")
+        self.assertTrue(result["error"])
+
+    @unittest.skipUnless(importlib.util.find_spec("PyPDF2"), "PyPDF2 not installed")
+    def test_directory_is_ingested_and_reingest_is_unchanged(self):
+        _write_pdf("storage/docs/batch/a.pdf", ["alpha beta", "gamma delta"])
+        _write_pdf("storage/docs/batch/b.pdf", ["epsilon zeta"])
+        with open("storage/docs/batch/notes.txt", "w") as f:
+            f.write("not picked up")
+
+        job = self._wait(self._ingest_directory("batch").json()["job_id"])
+
+        self.assertEqual(job["status"], "done", job["error"])
+        results = job["result"]["results"]
+        self.assertEqual(sorted(results), ["batch/a.pdf", "batch/b.pdf"])
+        self.assertEqual(len(results["batch/a.pdf"]["chunk_ids"]), 2)
+        documents = {doc["document"] for doc in self.client.get("/documents").json()["documents"]}
+        self.assertTrue({"batch/a.pdf", "batch/b.pdf"} <= documents)
+
+        again = self._ingest_directory("batch").json()
+        self.assertNotIn("job_id", again)
+        self.assertEqual({result["status"] for result in again["results"].values()}, {"unchanged"})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,56 @@
+import asyncio
+import unittest
+
+import numpy as np
+
+from backend.batcher import EmbeddingBatcher
+
+
+class EmbeddingBatcherTest(unittest.TestCase):
+    def setUp(self):
+        self.calls = []
+
+    def encode(self, texts, model_name):
+        self.calls.append((model_name, list(texts)))
+        return np.array([[len(text), i] for i, text in enumerate(texts)], dtype=np.float32)
+
+    def test_concurrent_requests_share_one_encode(self):
+        batcher = EmbeddingBatcher(self.encode, max_batch_size=8, max_wait_ms=20)
+
+        async def run():
+            return await asyncio.gather(*(batcher.embed("x" * n, "model") for n in range(1, 4)))
+
+        vectors = asyncio.run(run())
+
+        self.assertEqual(len(self.calls), 1)
+        self.assertEqual([vector[0] for vector in vectors], [1, 2, 3])
+        self.assertEqual(batcher.stats()["largest_batch"], 3)
+
+    def test_full_batch_flushes_and_models_are_kept_apart(self):
+        batcher = EmbeddingBatcher(self.encode, max_batch_size=2, max_wait_ms=1000)
+
+        async def run():
+            return await asyncio.wait_for(asyncio.gather(
+                batcher.embed("a", "m1"), batcher.embed("b", "m2"),
+                batcher.embed("c", "m1"), batcher.embed("d", "m2")
+            ), timeout=0.5)
+
+        asyncio.run(run())
+
+        self.assertEqual(sorted(self.calls), [("m1", ["a", "c"]), ("m2", ["b", "d"])])
+
+    def test_encode_errors_reach_every_caller(self):
+        def fail(texts, model_name):
+            raise RuntimeError("model exploded")
+
+        batcher = EmbeddingBatcher(fail, max_batch_size=4, max_wait_ms=1)
+
+        async def run():
+            return await asyncio.gather(batcher.embed("a", "m"), batcher.embed("b", "m"), return_exceptions=True)
+
+        results = asyncio.run(run())
+        self.assertTrue(all(isinstance(result, RuntimeError) for result in results))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,54 @@
+import unittest
+
+from backend.hash_backend import HashTokenizer
+from backend.ingestion import chunk_pages_token_aware
+
+TEXT = ("Pump controller error E-1042 occurs when the pressure exceeds its limits, see manual "
+        "section 4.2.1 for the reset procedure and the v2.3.1 firmware notes.")
+
+
+class TestTokenAwareChunking(unittest.TestCase):
+    def _chunks(self, pages, chunk_size=8, chunk_overlap=3):
+        # The hash backend's regex tokenizer stands in for the model's, so no model is downloaded
+        return chunk_pages_token_aware(pages, "all-MiniLM-L6-v2", chunk_size, chunk_overlap, backend="hash")
+
+    def _spans(self, text):
+        return HashTokenizer()(text, add_special_tokens=False, return_offsets_mapping=True)["offset_mapping"][0]
+
+    def test_chunks_fit_the_window_and_overlap(self):
+        chunks = self._chunks([(1, TEXT)])
+        spans = self._spans(TEXT)
+        starts = [start for start, _ in spans]
+
+        self.assertGreater(len(chunks), 2)
+        previous_end = 0
+        overlaps = 0
+        for chunk in chunks:
+            self.assertEqual(chunk["page"], 1)
+            self.assertEqual(TEXT[chunk["start_index"]:chunk["start_index"] + len(chunk["text"])], chunk["text"])
+            self.assertLessEqual(len(self._spans(chunk["text"])), 8)
+            # Chunks start on a token and skip no text; the overlap only shrinks where it would split a word
+            self.assertIn(chunk["start_index"], starts)
+            self.assertEqual(TEXT[previous_end:chunk["start_index"]].strip(), "")
+            overlaps += chunk["start_index"] < previous_end
+            previous_end = chunk["start_index"] + len(chunk["text"])
+        self.assertEqual(previous_end, len(TEXT))
+        self.assertGreater(overlaps, len(chunks) // 2)
+
+    def test_words_are_not_cut(self):
+        chunks = self._chunks([(1, TEXT)])
+        boundaries = {chunk["start_index"] for chunk in chunks} | {chunk["start_index"] + len(chunk["text"]) for chunk in chunks}
+        # A chunk only starts or ends where a token is separated from its neighbour
+        for identifier in ("E-1042", "4.2.1", "v2.3.1"):
+            start = TEXT.index(identifier)
+            inside = set(range(start + 1, start + len(identifier)))
+            self.assertFalse(boundaries & inside, identifier)
+
+    def test_pages_are_chunked_separately(self):
+        chunks = self._chunks([(1, TEXT), (2, "short page"), (3, "")])
+        self.assertEqual(chunks[-1], {"text": "short page", "page": 2, "start_index": 0})
+        self.assertEqual(self._chunks([]), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
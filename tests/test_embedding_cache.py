@@ -0,0 +1,65 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from backend.embedding_cache import EmbeddingCache
+
+
+class TestEmbeddingCache(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.cache_path = os.path.join(self.temp_dir.name, "cache.sqlite")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_store_and_lookup(self):
+        cache = EmbeddingCache(self.cache_path)
+        hashes = [EmbeddingCache.hash_text(t) for t in ["alpha", "beta"]]
+        vectors = np.random.random((2, 8)).astype(np.float32)
+        cache.store("model-a", hashes, vectors)
+
+        found = cache.lookup("model-a", hashes + [EmbeddingCache.hash_text("gamma")])
+        np.testing.assert_array_equal(found[hashes[0]], vectors[0])
+        np.testing.assert_array_equal(found[hashes[1]], vectors[1])
+        self.assertEqual(len(found), 2)
+        self.assertEqual(cache.stats()["hits"], 2)
+        self.assertEqual(cache.stats()["misses"], 1)
+
+        # Entries are per model
+        self.assertEqual(cache.lookup("model-b", hashes), {})
+        cache.close()
+
+    def test_persists_across_instances(self):
+        cache = EmbeddingCache(self.cache_path)
+        text_hash = EmbeddingCache.hash_text("alpha")
+        cache.store("model-a", [text_hash], np.ones((1, 4), dtype=np.float32))
+        cache.close()
+
+        reopened = EmbeddingCache(self.cache_path)
+        self.assertIn(text_hash, reopened.lookup("model-a", [text_hash]))
+        self.assertEqual(reopened.stats()["bytes"], 16)
+        reopened.close()
+
+    def test_evicts_least_recently_used(self):
+        # Room for three 16-byte vectors
+        cache = EmbeddingCache(self.cache_path, max_bytes=48)
+        hashes = [EmbeddingCache.hash_text(str(i)) for i in range(4)]
+        for text_hash in hashes[:3]:
+            cache.store("model-a", [text_hash], np.ones((1, 4), dtype=np.float32))
+
+        # Touch the oldest entry so the second one becomes least recently used
+        cache.lookup("model-a", [hashes[0]])
+        cache.store("model-a", [hashes[3]], np.ones((1, 4), dtype=np.float32))
+
+        found = cache.lookup("model-a", hashes)
+        self.assertIn(hashes[0], found)
+        self.assertNotIn(hashes[1], found)
+        self.assertIn(hashes[3], found)
+        self.assertLessEqual(cache.stats()["bytes"], 48)
+        cache.close()
+
+if __name__ == "__main__":
+    unittest.main()
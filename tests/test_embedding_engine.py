@@ -0,0 +1,49 @@
+import unittest
+
+import numpy as np
+
+from backend.embeddings import _encode, _length_buckets
+from backend.hash_backend import HashEmbedder
+
+
+class TestLengthBuckets(unittest.TestCase):
+    def test_batches_cover_every_position_once_under_the_token_budget(self):
+        lengths = [3, 50, 7, 7, 120, 2, 64, 9, 128, 5]
+        order = np.argsort(lengths, kind="stable")
+
+        batches = _length_buckets(order, lengths, batch_size=2, max_seq_length=128)
+
+        self.assertEqual(sorted(np.concatenate(batches).tolist()), list(range(len(lengths))))
+        for batch in batches:
+            longest = max(lengths[i] for i in batch)
+            self.assertTrue(len(batch) == 1 or len(batch) * longest <= 2 * 128)
+            self.assertLessEqual(len(batch), 2 * 4)
+
+    def test_short_texts_share_larger_batches(self):
+        lengths = [4] * 20 + [128] * 4
+        order = np.argsort(lengths, kind="stable")
+
+        batches = _length_buckets(order, lengths, batch_size=4, max_seq_length=128)
+
+        # Short texts fill batches up to the 4x cap; the long ones go batch_size at a time
+        self.assertEqual([len(batch) for batch in batches], [16, 4, 4])
+
+    def test_single_text(self):
+        batches = _length_buckets(np.array([0]), [300], batch_size=8, max_seq_length=128)
+        self.assertEqual([batch.tolist() for batch in batches], [[0]])
+
+
+class TestEncodeOrder(unittest.TestCase):
+    def test_embeddings_come_back_in_input_order(self):
+        texts = ["a much longer text about pumps and valves and pressure", "short", "", "medium length text", "short"]
+
+        embeddings = _encode(texts, "all-MiniLM-L6-v2", "hash", batch_size=2)
+
+        expected = HashEmbedder(dimension=384).encode(texts)
+        np.testing.assert_allclose(embeddings, expected, rtol=1e-6)
+        self.assertEqual(embeddings.dtype, np.float32)
+        self.assertEqual(_encode([], "all-MiniLM-L6-v2", "hash").shape, (0, 384))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,30 @@
+import unittest
+
+import numpy as np
+
+from backend.embedding_pool import close_pools, get_pool
+from backend.hash_backend import HashEmbedder, HashTokenizer
+
+
+class TestEmbeddingPool(unittest.TestCase):
+    def tearDown(self):
+        close_pools()
+
+    def test_shared_pool_encodes_in_order_and_counts_tokens(self):
+        texts = [f"chunk {i} " + "word " * (i % 9) for i in range(40)]
+
+        pool = get_pool("all-MiniLM-L6-v2", "hash", processes=2, threads_per_process=1)
+        embeddings, n_tokens = pool.encode(texts)
+
+        np.testing.assert_allclose(embeddings, HashEmbedder(dimension=384).encode(texts), rtol=1e-6)
+        self.assertEqual(n_tokens, sum(len(ids) for ids in HashTokenizer()(texts)["input_ids"]))
+
+        # Later jobs reuse the running workers, and their loaded model, until the sizes change
+        self.assertIs(get_pool("all-MiniLM-L6-v2", "hash", 2, 1), pool)
+        resized = get_pool("all-MiniLM-L6-v2", "hash", 1, 1)
+        self.assertIsNot(resized, pool)
+        self.assertEqual(resized.encode(texts[:3])[0].shape, (3, 384))
+
+
+if __name__ == "__main__":
+    unittest.main()
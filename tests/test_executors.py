@@ -0,0 +1,64 @@
+import asyncio
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from backend.executors import MeteredExecutor
+
+
+class TestMeteredExecutor(unittest.TestCase):
+    def setUp(self):
+        self.pool = ThreadPoolExecutor(max_workers=1)
+        self.executor = MeteredExecutor("search_executor", lambda: self.pool)
+
+    def tearDown(self):
+        self.pool.shutdown(wait=True)
+
+    def test_queue_depth_and_wait_times(self):
+        release = threading.Event()
+        blocked = self.executor.submit(release.wait)
+        queued = [self.executor.submit(time.sleep, 0) for _ in range(3)]
+
+        stats = self.executor.stats()
+        self.assertEqual(stats["workers"], 1)
+        self.assertEqual(stats["queued"], 3)
+        self.assertEqual(stats["running"], 1)
+
+        time.sleep(0.05)
+        release.set()
+        for future in [blocked] + queued:
+            future.result()
+
+        stats = self.executor.stats()
+        self.assertEqual((stats["queued"], stats["running"], stats["completed"]), (0, 0, 4))
+        self.assertGreaterEqual(stats["max_queued"], 3)
+        self.assertGreaterEqual(stats["max_wait_ms"], 40)
+
+    def test_run_keeps_the_event_loop_free(self):
+        async def main():
+            ticks = 0
+
+            async def tick():
+                nonlocal ticks
+                while True:
+                    ticks += 1
+                    await asyncio.sleep(0.005)
+
+            ticker = asyncio.ensure_future(tick())
+            result = await self.executor.run(lambda seconds, value: time.sleep(seconds) or value, 0.1, value=42)
+            ticker.cancel()
+            return result, ticks
+
+        result, ticks = asyncio.run(main())
+        self.assertEqual(result, 42)
+        self.assertGreater(ticks, 5)
+
+    def test_errors_reach_the_caller(self):
+        with self.assertRaises(ZeroDivisionError):
+            self.executor.submit(lambda: 1 / 0).result()
+        self.assertEqual(self.executor.stats()["completed"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
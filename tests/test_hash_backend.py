@@ -0,0 +1,43 @@
+import unittest
+
+import numpy as np
+
+from backend.hash_backend import HashEmbedder
+
+
+class HashEmbedderTest(unittest.TestCase):
+    def test_embeddings_are_deterministic_and_normalised(self):
+        embedder = HashEmbedder(dimension=768)
+        texts = ["Error code E-1042 on pump two", "Quarterly revenue grew", ""]
+
+        first = embedder.encode(texts)
+        second = HashEmbedder(dimension=768).encode(texts)
+
+        self.assertEqual(first.shape, (3, 768))
+        self.assertEqual(first.dtype, np.float32)
+        np.testing.assert_array_equal(first, second)
+        np.testing.assert_allclose(np.linalg.norm(first[:2], axis=1), [1.0, 1.0], rtol=1e-6)
+        np.testing.assert_array_equal(first[2], np.zeros(768))
+
+    def test_shared_words_score_higher(self):
+        embedder = HashEmbedder(dimension=384)
+        query, related, unrelated = embedder.encode([
+            "pump pressure sensor error",
+            "the pump pressure sensor reported an error",
+            "quarterly subscription revenue grew"
+        ])
+
+        self.assertGreater(query @ related, query @ unrelated)
+
+    def test_tokenizer_offsets_and_truncation(self):
+        tokenizer = HashEmbedder(max_seq_length=4).tokenizer
+
+        encoded = tokenizer(["Hello, world again"], add_special_tokens=False, return_offsets_mapping=True)
+        self.assertEqual(encoded["offset_mapping"][0], [(0, 5), (5, 6), (7, 12), (13, 18)])
+
+        truncated = tokenizer(["one two three four five"], truncation=True, max_length=4)
+        self.assertEqual(len(truncated["input_ids"][0]), 4)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,19 @@
+import unittest
+
+from scripts.import_time import HEAVY_MODULES, measure_imports
+
+
+class ImportTimeTest(unittest.TestCase):
+    def test_backend_imports_without_heavy_dependencies(self):
+        try:
+            imports = measure_imports("main")
+        except RuntimeError as e:
+            self.skipTest(f"backend not importable here: {e}")
+
+        loaded = {entry["name"].split(".")[0] for entry in imports}
+        self.assertIn("main", loaded)
+        self.assertFalse(loaded & set(HEAVY_MODULES), f"eagerly imported: {loaded & set(HEAVY_MODULES)}")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,187 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+
+from backend.index_manager import IndexManager
+
+
+def _vectors(n, seed):
+    return np.random.default_rng(seed).normal(size=(n, 8)).astype(np.float32)
+
+
+class TestIndexCommit(unittest.TestCase):
+    """A "crash" is simulated by opening a second manager on the files a first one left behind"""
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, "index.faiss")
+        self.vectors = _vectors(10, seed=0)
+        # The first commit writes a snapshot; later ones stay in the log until it passes 10x the snapshot
+        self.manager = self._open(None)
+        self.manager.add_vectors(self.vectors, [f"c{i}" for i in range(10)])
+        self.manager.save()
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def _open(self, commit_token):
+        return IndexManager(self.path, commit_token=commit_token, snapshot_ratio=10, snapshot_min_bytes=0)
+
+    def _edit(self, manager):
+        """Delete c3 and re-add it with a new vector: an update as /update_chunk makes it"""
+        manager.begin_transaction()
+        manager.update_vector("c3", self.vectors[9] + 0.001)
+        return manager.prepare_commit()
+
+    def _assert_original(self, manager):
+        self.assertEqual(sorted(manager.id_map.values()), sorted(f"c{i}" for i in range(10)))
+        self.assertEqual(manager.search(self.vectors[3], k=1)[0][0], "c3")
+
+    def _assert_edited(self, manager):
+        self.assertEqual(manager.index.ntotal, 10)
+        self.assertEqual(manager.id_map[9], "c3")
+        self.assertNotEqual(manager.search(self.vectors[3], k=1)[0][0], "c3")
+        self.assertEqual({chunk_id for chunk_id, _ in manager.search(self.vectors[9], k=2)}, {"c3", "c9"})
+
+    def test_small_commits_append_to_the_log_and_leave_the_snapshot_alone(self):
+        snapshot = os.stat(self.path)
+        self.assertFalse(os.path.exists(self.manager.log_path))
+
+        self._edit(self.manager)
+        self.manager.finish_commit()
+
+        self.assertEqual(os.stat(self.path).st_mtime_ns, snapshot.st_mtime_ns)
+        self.assertGreater(os.path.getsize(self.manager.log_path), 0)
+        self._assert_edited(self.manager)
+        self._assert_edited(self._open(self.manager.commit_token))
+
+    def test_log_is_folded_into_a_snapshot_once_it_outgrows_it(self):
+        manager = IndexManager(self.path, commit_token=self.manager.commit_token, snapshot_ratio=1, snapshot_min_bytes=0)
+        manager.begin_transaction()
+        manager.add_vectors(_vectors(3, seed=1), ["x0", "x1", "x2"])
+        manager.prepare_commit()
+        manager.finish_commit()
+        self.assertTrue(os.path.exists(manager.log_path))
+
+        # This record would take the log past the snapshot's size
+        manager.begin_transaction()
+        manager.add_vectors(_vectors(20, seed=2), [f"y{i}" for i in range(20)])
+        manager.prepare_commit()
+        manager.finish_commit()
+
+        self.assertFalse(os.path.exists(manager.log_path))
+        reopened = self._open(manager.commit_token)
+        self.assertEqual(reopened.index.ntotal, 33)
+        self.assertEqual(reopened.id_map, manager.id_map)
+
+    def test_log_record_without_a_metadata_commit_is_discarded(self):
+        committed = self.manager.commit_token
+        self._edit(self.manager)
+
+        recovered = self._open(committed)
+
+        self._assert_original(recovered)
+        self.assertEqual(os.path.getsize(recovered.log_path), 0)
+
+    def test_log_record_with_a_metadata_commit_survives(self):
+        token = self._edit(self.manager)
+
+        self._assert_edited(self._open(token))
+
+    def test_record_cut_short_by_a_crash_is_discarded(self):
+        self._edit(self.manager)
+        self.manager.finish_commit()
+        committed = self.manager.commit_token
+        size = os.path.getsize(self.manager.log_path)
+
+        self.manager.begin_transaction()
+        self.manager.add_vectors(_vectors(2, seed=3), ["z0", "z1"])
+        self.manager.prepare_commit()
+        with open(self.manager.log_path, 'r+b') as f:
+            f.truncate(os.path.getsize(self.manager.log_path) - 5)
+
+        recovered = self._open(committed)
+        self._assert_edited(recovered)
+        self.assertEqual(os.path.getsize(recovered.log_path), size)
+
+    def test_zero_filled_tail_is_discarded(self):
+        self._edit(self.manager)
+        self.manager.finish_commit()
+        size = os.path.getsize(self.manager.log_path)
+        with open(self.manager.log_path, 'ab') as f:
+            f.write(bytes(64))
+
+        recovered = self._open(self.manager.commit_token)
+        self._assert_edited(recovered)
+        self.assertEqual(os.path.getsize(recovered.log_path), size)
+
+    def test_append_never_pads_a_shorter_log_with_zeros(self):
+        self._edit(self.manager)
+        self.manager.finish_commit()
+        # The manager believes the log is longer than it is on disk
+        self.manager._log_size += 64
+
+        self.manager.begin_transaction()
+        self.manager.add_vectors(_vectors(1, seed=4), ["z"])
+        token = self.manager.prepare_commit()
+        self.manager.finish_commit()
+
+        recovered = self._open(token)
+        self.assertEqual(recovered.index.ntotal, 11)
+        self.assertEqual(recovered.id_map[10], "z")
+
+    def test_abort_without_changes_keeps_the_loaded_index(self):
+        index = self.manager.index
+        generation = self.manager.generation
+        self.manager.begin_transaction()
+
+        self.manager.abort_commit()
+
+        self.assertIs(self.manager.index, index)
+        self.assertEqual(self.manager.generation, generation)
+
+    def test_abort_truncates_the_prepared_record(self):
+        self._edit(self.manager)
+
+        self.manager.abort_commit()
+
+        self.assertEqual(os.path.getsize(self.manager.log_path), 0)
+        self._assert_original(self.manager)
+        self._assert_original(self._open(self.manager.commit_token))
+
+    def test_prepared_snapshot_is_installed_only_if_its_token_was_committed(self):
+        committed = self.manager.commit_token
+        self.manager.begin_transaction()
+        self.manager.delete_vectors(["c0", "c1"])
+        self.manager._snapshot_due = True
+        self.manager.prepare_commit()
+        self.assertTrue(os.path.isdir(self.manager.pending_path))
+
+        discarded = self._open(committed)
+        self.assertFalse(os.path.exists(discarded.pending_path))
+        self.assertEqual(len(discarded.id_map), 10)
+
+    def test_snapshot_install_interrupted_part_way_is_completed(self):
+        self._edit(self.manager)
+        self.manager.finish_commit()
+        self.manager.begin_transaction()
+        self.manager.delete_vectors(["c0", "c1"])
+        self.manager._snapshot_due = True
+        token = self.manager.prepare_commit()
+        # Crash after the index was moved into place but before the mappings and the log were dealt with
+        os.replace(os.path.join(self.manager.pending_path, "index.faiss"), self.path)
+
+        recovered = self._open(token)
+
+        self.assertFalse(os.path.exists(recovered.pending_path))
+        self.assertFalse(os.path.exists(recovered.log_path))
+        self.assertEqual(recovered.index.ntotal, 8)
+        self.assertEqual(sorted(recovered.id_map.values()), sorted(f"c{i}" for i in range(2, 10)))
+        self.assertEqual(recovered.id_map[7], "c3")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,107 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import faiss
+import numpy as np
+
+from backend.index_manager import IndexManager
+
+
+def _vectors(n, dimension=16, seed=0):
+    rng = np.random.default_rng(seed)
+    # Most of the variance in a few directions, so a small PCA keeps neighbours
+    basis = rng.normal(size=(4, dimension))
+    return (rng.normal(size=(n, 4)) @ basis + 0.01 * rng.normal(size=(n, dimension))).astype(np.float32)
+
+
+class TestIndexReduction(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, "index.faiss")
+        self.manager = IndexManager(self.path)
+        self.vectors = _vectors(200)
+        self.manager.add_vectors(self.vectors, [f"c{i}" for i in range(200)])
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_plan_reports_recall_without_changing_the_index(self):
+        report = self.manager.plan_reduction(4, sample_size=200, k=5, eval_queries=50)
+
+        self.assertEqual((report["from_dimension"], report["to_dimension"]), (16, 4))
+        self.assertEqual((report["trained_on"], report["eval_queries"]), (200, 50))
+        self.assertGreater(report["recall_at_k"], 0.9)
+        self.assertLess(report["vector_bytes_after"], report["vector_bytes_before"])
+        self.assertEqual(self.manager.get_index_stats()["stored_dimension"], 16)
+
+    def test_commit_swaps_in_the_reduced_index_and_the_next_save_snapshots_it(self):
+        self.manager.plan_reduction(4, sample_size=200, k=5, eval_queries=50)
+        generation = self.manager.generation
+
+        self.manager.commit_reduction()
+
+        self.assertGreater(self.manager.generation, generation)
+        stats = self.manager.get_index_stats()
+        self.assertEqual((stats["dimension"], stats["stored_dimension"], stats["index_size"]), (16, 4, 200))
+        self.assertEqual(self.manager.search(self.vectors[7], k=1)[0][0], "c7")
+
+        self.manager.save()
+        self.assertIsInstance(faiss.read_index(self.path), faiss.IndexPreTransform)
+        self.assertFalse(os.path.exists(self.manager.log_path))
+        reopened = IndexManager(self.path, commit_token=self.manager.commit_token)
+        self.assertEqual(reopened.search(self.vectors[7], k=1)[0][0], "c7")
+
+    def test_aborted_commit_keeps_the_full_dimension_index(self):
+        self.manager.save()
+        self.manager.plan_reduction(4, sample_size=200, k=5, eval_queries=50)
+        self.manager.begin_transaction()
+        self.manager.commit_reduction()
+        self.manager.prepare_commit()
+
+        self.manager.abort_commit()
+        self.assertEqual(self.manager.get_index_stats()["stored_dimension"], 16)
+        self.assertFalse(os.path.exists(self.manager.pending_path))
+
+    def test_commit_refuses_a_plan_made_before_the_index_changed(self):
+        self.manager.plan_reduction(4, sample_size=200, k=5, eval_queries=50)
+        self.manager.add_vectors(_vectors(1, seed=1), ["late"])
+
+        with self.assertRaisesRegex(ValueError, "changed"):
+            self.manager.commit_reduction()
+        # The stale plan is dropped rather than retried
+        with self.assertRaisesRegex(ValueError, "No reduction"):
+            self.manager.commit_reduction()
+        self.assertEqual(self.manager.get_index_stats()["stored_dimension"], 16)
+
+    def test_plan_holds_the_lock_only_to_copy_the_vectors(self):
+        manager = self.manager
+        
+        class WriteAfterCopy:
+            """Lets a write in as soon as the vectors have been copied, while the PCA trains"""
+            exits = 0
+            
+            def __enter__(self):
+                pass
+            
+            def __exit__(self, *exc):
+                WriteAfterCopy.exits += 1
+                if WriteAfterCopy.exits == 1:
+                    manager.add_vectors(_vectors(1, seed=1), ["late"])
+        
+        report = manager.plan_reduction(4, sample_size=200, k=5, eval_queries=50, lock=WriteAfterCopy())
+        
+        self.assertEqual(report["trained_on"], 200)
+        with self.assertRaisesRegex(ValueError, "changed"):
+            manager.commit_reduction()
+
+    def test_plan_rejects_bad_dimensions(self):
+        with self.assertRaises(ValueError):
+            self.manager.plan_reduction(16)
+        with self.assertRaises(ValueError):
+            self.manager.plan_reduction(0)
+
+
+if __name__ == "__main__":
+    unittest.main()
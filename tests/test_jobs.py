@@ -0,0 +1,63 @@
+import threading
+import time
+import unittest
+
+from backend.jobs import JobQueue, JobQueueFull
+
+
+def wait_for(job, statuses=("done", "failed", "cancelled"), timeout=5):
+    deadline = time.time() + timeout
+    while job.status not in statuses and time.time() < deadline:
+        time.sleep(0.01)
+    return job.status
+
+
+class TestJobQueue(unittest.TestCase):
+    def test_job_reports_stages_and_result(self):
+        def work(job, pages):
+            job.start_stage("extracting")
+            job.update(pages_done=pages, pages_total=pages)
+            job.start_stage("embedding")
+            return {"pages": pages}
+
+        jobs = JobQueue(num_workers=1)
+        job = jobs.submit(work, 3)
+
+        self.assertEqual(wait_for(job), "done")
+        status = job.to_dict()
+        self.assertEqual(status["result"], {"pages": 3})
+        self.assertEqual(status["pages_done"], 3)
+        self.assertIn("extracting", status["stage_times"])
+        self.assertIn("embedding", status["stage_times"])
+
+    def test_running_job_can_be_cancelled(self):
+        started = threading.Event()
+
+        def work(job):
+            job.start_stage("embedding")
+            started.set()
+            while True:
+                job.check_cancelled()
+                time.sleep(0.01)
+
+        jobs = JobQueue(num_workers=1)
+        job = jobs.submit(work)
+        started.wait(5)
+        jobs.cancel(job.id)
+
+        self.assertEqual(wait_for(job), "cancelled")
+
+    def test_full_queue_rejects_new_jobs(self):
+        release = threading.Event()
+        jobs = JobQueue(num_workers=1, max_queued=1)
+
+        running = jobs.submit(lambda job: release.wait(5))
+        wait_for(running, statuses=("running",))
+        jobs.submit(lambda job: None)
+
+        with self.assertRaises(JobQueueFull):
+            jobs.submit(lambda job: None)
+        release.set()
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,81 @@
+import os
+import tempfile
+import unittest
+
+from backend.lexical_index import match_expression, reciprocal_rank_fusion
+from backend.metadata_store import MetadataStore
+from backend.text_store import TextSegmentStore
+
+
+class TestLexicalIndex(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.temp_dir.name, "metadata.sqlite")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def _store(self, **kwargs) -> MetadataStore:
+        return MetadataStore(
+            self.db_path,
+            text_store=TextSegmentStore(os.path.join(self.temp_dir.name, "segments")),
+            lexical_index=True,
+            **kwargs
+        )
+
+    def test_identifiers_match_exactly_and_index_follows_writes(self):
+        store = self._store()
+        store.add_chunks({
+            "a": {"document": "a.pdf", "text": "Error E-1042 raised by pump controller v2.3.1"},
+            "b": {"document": "b.pdf", "text": "Pump maintenance schedule and controller wiring"},
+            "c": {"document": "b.pdf", "text": "Unrelated chunk about invoices"}
+        })
+
+        self.assertEqual([chunk_id for chunk_id, _ in store.search_text("e-1042")], ["a"])
+        self.assertEqual([chunk_id for chunk_id, _ in store.search_text("v2.3.1 firmware")], ["a"])
+        self.assertEqual(set(chunk_id for chunk_id, _ in store.search_text("pump controller")), {"a", "b"})
+        self.assertEqual([chunk_id for chunk_id, _ in store.search_text("pump", document="b.pdf")], ["b"])
+        self.assertEqual(store.search_text("?!"), [])
+
+        store.update_chunk("a", {"document": "a.pdf", "text": "Error E-2001 after the fix"})
+        store.delete_chunk("b")
+        self.assertEqual(store.search_text("E-1042"), [])
+        self.assertEqual(store.search_text("wiring"), [])
+        self.assertEqual([chunk_id for chunk_id, _ in store.search_text("E-2001")], ["a"])
+
+        # Re-adding a chunk by text ref alone keeps its indexed text
+        store.add_chunk("c", store.find(document="b.pdf")["c"])
+        self.assertEqual([chunk_id for chunk_id, _ in store.search_text("invoices")], ["c"])
+
+    def test_missing_index_is_built_from_stored_chunks(self):
+        store = MetadataStore(self.db_path, text_store=TextSegmentStore(os.path.join(self.temp_dir.name, "segments")))
+        store.add_chunks({"a": {"text": "alpha beta"}, "b": {"text": "gamma"}})
+        store.close()
+
+        reopened = self._store()
+        self.assertEqual([chunk_id for chunk_id, _ in reopened.search_text("gamma")], ["b"])
+
+    def test_index_is_rebuilt_after_writes_made_while_it_was_disabled(self):
+        store = self._store()
+        store.add_chunks({"a": {"text": "alpha beta"}, "b": {"text": "gamma"}})
+        store.close()
+
+        disabled = MetadataStore(self.db_path, text_store=TextSegmentStore(os.path.join(self.temp_dir.name, "segments")))
+        disabled.update_chunk("a", {"text": "delta"})
+        disabled.delete_chunk("b")
+        disabled.add_chunk("c", {"text": "gamma again"})
+        disabled.close()
+
+        reopened = self._store()
+        self.assertEqual(reopened.search_text("alpha"), [])
+        self.assertEqual([chunk_id for chunk_id, _ in reopened.search_text("delta")], ["a"])
+        self.assertEqual([chunk_id for chunk_id, _ in reopened.search_text("gamma")], ["c"])
+
+    def test_match_expression_and_fusion(self):
+        self.assertEqual(match_expression('Pump "E-1042" pump'), '"pump" OR "e-1042"')
+        fused = reciprocal_rank_fusion([["a", "b", "c"], ["c", "a"]])
+        self.assertEqual([chunk_id for chunk_id, _ in fused], ["a", "c", "b"])
+
+
+if __name__ == "__main__":
+    unittest.main()
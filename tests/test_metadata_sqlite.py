@@ -0,0 +1,102 @@
+import json
+import os
+import tempfile
+import unittest
+
+from backend.metadata_store import MetadataStore
+
+
+class TestSqliteMetadataStore(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.temp_dir.name, "metadata.sqlite")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_writes_persist_and_keep_insertion_order(self):
+        store = MetadataStore(self.db_path)
+        store.add_chunks({"b": {"text": "two"}, "a": {"text": "one"}})
+        store.add_chunk("c", {"text": "three"})
+        store.add_chunk("b", {"text": "two, replaced"})
+        store.update_chunk("missing", {"text": "ignored"})
+        store.delete_chunk("c")
+        store.close()
+
+        reopened = MetadataStore(self.db_path)
+        self.assertEqual(len(reopened), 2)
+        self.assertEqual([chunk_id for chunk_id, _ in reopened.items()], ["b", "a"])
+        self.assertEqual(reopened.first_chunk(), {"text": "two, replaced"})
+        self.assertEqual(reopened.get_chunk("c"), {})
+        self.assertEqual(reopened.get_chunks(["a", "c"]), {"a": {"text": "one"}})
+        self.assertNotIn("missing", reopened)
+
+    def test_transaction_commits_together_or_not_at_all(self):
+        store = MetadataStore(self.db_path)
+        store.add_chunks({"a": {"text": "one"}, "b": {"text": "two"}})
+
+        with self.assertRaises(RuntimeError):
+            with store.transaction():
+                store.delete_chunks(["a"])
+                store.update_chunks({"b": {"text": "changed"}})
+                raise RuntimeError("crash before commit")
+        self.assertEqual(store.get_chunks(["a", "b"]), {"a": {"text": "one"}, "b": {"text": "two"}})
+
+        with store.transaction():
+            store.delete_chunks(["a"])
+            with store.transaction():
+                store.update_chunks({"b": {"text": "changed"}, "missing": {}})
+            store.set_state("index_commit", "token-1")
+        store.close()
+
+        reopened = MetadataStore(self.db_path)
+        self.assertEqual(dict(reopened.items()), {"b": {"text": "changed"}})
+        self.assertEqual(reopened.get_state("index_commit"), "token-1")
+
+    def test_secondary_index_lookups(self):
+        store = MetadataStore(self.db_path)
+        store.add_chunks({
+            "a_p1_0": {"document": "a.pdf", "page": 1, "model": "m1", "chunking_method": "fixed_size"},
+            "b_p1_0": {"document": "b.pdf", "page": 1, "model": "m1", "chunking_method": "recursive"},
+            "a_p2_0": {"document": "a.pdf", "page": 2, "model": "m1", "chunking_method": "fixed_size"},
+            "a_p2_1": {"document": "a.pdf", "page": 2, "model": "m1", "chunking_method": "fixed_size"}
+        })
+        store.delete_chunk("a_p2_0")
+
+        self.assertEqual(store.find_ids(document="a.pdf"), ["a_p1_0", "a_p2_1"])
+        self.assertEqual(list(store.find(document="a.pdf", page=2)), ["a_p2_1"])
+        self.assertEqual(store.find_ids(chunking_method="recursive"), ["b_p1_0"])
+        self.assertEqual(store.find_ids(model="m2"), [])
+        self.assertEqual(store.documents(), [
+            {"document": "a.pdf", "chunks": 2, "pages": 2},
+            {"document": "b.pdf", "chunks": 1, "pages": 1}
+        ])
+        with self.assertRaises(ValueError):
+            store.find(text="anything")
+
+    def test_every_filter_is_served_by_an_index(self):
+        store = MetadataStore(self.db_path)
+        for filters in ({"document": "a.pdf"}, {"page": 2}, {"document": "a.pdf", "page": 2},
+                        {"chunking_method": "fixed_size"}, {"model": "m1"}):
+            where, params = store._where(filters)
+            plan = store._conn.execute(f"EXPLAIN QUERY PLAN SELECT chunk_id FROM chunks WHERE {where}", params).fetchall()
+            details = " ".join(row[-1] for row in plan)
+            self.assertRegex(details, r"USING (COVERING )?INDEX", filters)
+
+    def test_legacy_json_is_migrated_once(self):
+        legacy_path = os.path.join(self.temp_dir.name, "metadata.json")
+        with open(legacy_path, "w") as f:
+            json.dump({"x_p1_0": {"document": "x.pdf", "page": 1}}, f, indent=2)
+
+        store = MetadataStore(self.db_path, legacy_path=legacy_path)
+        self.assertEqual(store.get_chunk("x_p1_0")["document"], "x.pdf")
+        self.assertFalse(os.path.exists(legacy_path))
+        self.assertTrue(os.path.exists(legacy_path + ".migrated"))
+
+        export_path = store.export_json(os.path.join(self.temp_dir.name, "export.json"))
+        with open(export_path) as f:
+            self.assertEqual(json.load(f), {"x_p1_0": {"document": "x.pdf", "page": 1}})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,64 @@
+import threading
+import time
+import unittest
+
+from backend.model_cache import ModelCache
+
+
+class ModelCacheTest(unittest.TestCase):
+    def make_cache(self, max_bytes):
+        self.loads = []
+        return ModelCache(max_bytes=max_bytes, footprint_fn=lambda model: model["bytes"])
+
+    def loader(self, name, size=100):
+        def load():
+            self.loads.append(name)
+            return {"name": name, "bytes": size}
+        return load
+
+    def test_evicts_least_recently_used_over_budget(self):
+        cache = self.make_cache(250)
+        cache.get("a", self.loader("a"))
+        cache.get("b", self.loader("b"))
+        cache.get("a", self.loader("a"))
+        cache.get("c", self.loader("c"))
+
+        self.assertIn("a", cache)
+        self.assertNotIn("b", cache)
+        self.assertEqual(cache.stats()["evictions"], 1)
+
+        # An evicted model is reloaded on demand
+        cache.get("b", self.loader("b"))
+        self.assertEqual(self.loads, ["a", "b", "c", "b"])
+
+    def test_models_in_use_are_never_evicted(self):
+        cache = self.make_cache(150)
+
+        with cache.using("a", self.loader("a")):
+            cache.get("b", self.loader("b"))
+            self.assertIn("a", cache)
+            self.assertEqual(cache.stats()["bytes"], 200)
+
+        # Released and over budget: the older idle model goes
+        self.assertNotIn("a", cache)
+        self.assertIn("b", cache)
+
+    def test_concurrent_first_requests_load_once(self):
+        cache = self.make_cache(0)
+
+        def slow_load():
+            time.sleep(0.05)
+            self.loads.append("a")
+            return {"bytes": 1}
+
+        threads = [threading.Thread(target=cache.get, args=("a", slow_load)) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(self.loads, ["a"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,49 @@
+import threading
+import time
+import unittest
+from unittest import mock
+
+from backend import embeddings
+
+
+class ModelPreloadTest(unittest.TestCase):
+    """Uses the hash backend, and a model name per test so the shared model cache starts without it"""
+
+    def test_preload_loads_and_warms_up_into_the_cache(self):
+        embeddings.preload_models(["preload-test@hash"])
+
+        self.assertIn(("preload-test", "hash"), embeddings.model_cache)
+        info = embeddings.model_load_info[("preload-test", "hash")]
+        self.assertGreaterEqual(info["load_seconds"], 0)
+        self.assertIsNotNone(info["warmup_seconds"])
+
+        status = {(model["model"], model["backend"]): model for model in embeddings.get_model_status()["models"]}
+        self.assertEqual(status[("preload-test", "hash")]["in_use"], 0)
+
+    def test_preload_reports_a_bad_spec_and_carries_on(self):
+        embeddings.preload_models(["bad-spec-test@no-such-backend", "after-bad-spec-test@hash"])
+
+        self.assertNotIn(("bad-spec-test", "no-such-backend"), embeddings.model_cache)
+        self.assertIn(("after-bad-spec-test", "hash"), embeddings.model_cache)
+
+    def test_concurrent_first_requests_load_the_model_once(self):
+        loads = []
+        load_model = embeddings._load_model
+
+        def slow_load(model_name, backend):
+            loads.append(model_name)
+            time.sleep(0.05)
+            return load_model(model_name, backend)
+
+        with mock.patch.object(embeddings, "_load_model", slow_load):
+            threads = [threading.Thread(target=embeddings.get_model, args=("concurrent-test", "hash")) for _ in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        self.assertEqual(loads, ["concurrent-test"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,35 @@
+import unittest
+
+import numpy as np
+
+from backend.onnx_backend import OnnxEmbedder, cosine_agreement
+
+
+class OnnxBackendTest(unittest.TestCase):
+    def test_cosine_agreement_is_row_wise(self):
+        reference = np.array([[1.0, 0.0], [0.0, 2.0]])
+        candidate = np.array([[3.0, 0.0], [1.0, 1.0]])
+
+        np.testing.assert_allclose(cosine_agreement(reference, candidate), [1.0, np.sqrt(0.5)], rtol=1e-6)
+
+    def test_mean_pooling_ignores_padding_and_normalises(self):
+        embedder = OnnxEmbedder.__new__(OnnxEmbedder)
+        embedder.pooling = "mean"
+        embedder.normalize = True
+
+        hidden = np.array([[[1.0, 0.0], [3.0, 0.0], [100.0, 100.0]]], dtype=np.float32)
+        mask = np.array([[1, 1, 0]])
+
+        np.testing.assert_allclose(embedder._pool(hidden, mask), [[1.0, 0.0]], rtol=1e-6)
+
+    def test_cls_pooling_takes_first_token(self):
+        embedder = OnnxEmbedder.__new__(OnnxEmbedder)
+        embedder.pooling = "cls"
+        embedder.normalize = False
+
+        hidden = np.array([[[2.0, 5.0], [3.0, 0.0]]], dtype=np.float32)
+        np.testing.assert_allclose(embedder._pool(hidden, np.array([[1, 1]])), [[2.0, 5.0]])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,51 @@
+import unittest
+
+import numpy as np
+
+from backend.query_cache import LRUCache, QueryCache, normalise_query
+
+
+class LRUCacheTest(unittest.TestCase):
+    def test_evicts_least_recently_used(self):
+        cache = LRUCache(maxsize=2)
+        cache.put("a", 1)
+        cache.put("b", 2)
+        cache.get("a")
+        cache.put("c", 3)
+
+        self.assertEqual(cache.get("a"), 1)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("c"), 3)
+        self.assertEqual(cache.stats()["size"], 2)
+
+
+class QueryCacheTest(unittest.TestCase):
+    def test_normalised_queries_share_an_embedding(self):
+        cache = QueryCache()
+        cache.put_embedding("model", "error  code\n", np.ones(4))
+
+        embedding = cache.get_embedding("model", " error code")
+        self.assertIsNotNone(embedding)
+        self.assertEqual(embedding.dtype, np.float32)
+        self.assertFalse(embedding.flags.writeable)
+        self.assertIsNone(cache.get_embedding("other-model", "error code"))
+        self.assertEqual(normalise_query("ｅｒｒｏｒ"), "error")
+
+    def test_half_precision_embeddings_stay_half_precision(self):
+        cache = QueryCache()
+        cache.put_embedding("model", "q", np.ones(4, dtype=np.float16))
+
+        self.assertEqual(cache.get_embedding("model", "q").dtype, np.float16)
+
+    def test_results_are_scoped_to_generation_k_and_filters(self):
+        cache = QueryCache()
+        cache.put_results("model", "q", 5, 1, ["hit"], filters={"document": "a.pdf"})
+
+        self.assertEqual(cache.get_results("model", "q", 5, 1, filters={"document": "a.pdf"}), ["hit"])
+        self.assertIsNone(cache.get_results("model", "q", 5, 2, filters={"document": "a.pdf"}))
+        self.assertIsNone(cache.get_results("model", "q", 3, 1, filters={"document": "a.pdf"}))
+        self.assertIsNone(cache.get_results("model", "q", 5, 1))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,59 @@
+import unittest
+
+from backend.ingestion import plan_document
+
+
+def _plan(texts, existing=None, file_hash="v1", chunk_size=20):
+    return plan_document("a.pdf", file_hash, texts, existing or {}, "all-MiniLM-L6-v2", "fixed_size", chunk_size, 0, "hash")
+
+
+def _stored(plan):
+    """What the store holds after indexing a plan: kept chunks plus the new ones"""
+    return {**plan["kept"], **dict(zip(plan["chunk_ids"], plan["metadatas"]))}
+
+
+class TestPlanDocument(unittest.TestCase):
+    def test_first_ingest_numbers_chunks_within_each_page(self):
+        plan = _plan(["x" * 30, "y" * 10])
+
+        self.assertEqual(plan["chunk_ids"], ["a.pdf_p1_0", "a.pdf_p1_1", "a.pdf_p2_0"])
+        self.assertEqual([m["start_index"] for m in plan["metadatas"]], [0, 20, 0])
+        self.assertEqual((plan["kept"], plan["retired_ids"]), ({}, []))
+        self.assertEqual((plan["pages_reembedded"], plan["pages_unchanged"]), (2, 0))
+
+    def test_only_changed_pages_are_reembedded(self):
+        stored = _stored(_plan(["page one", "page two", "page three"]))
+
+        plan = _plan(["page one", "page two, edited", "page three"], stored, file_hash="v2")
+
+        self.assertEqual(sorted(plan["kept"]), ["a.pdf_p1_0", "a.pdf_p3_0"])
+        self.assertEqual(plan["retired_ids"], ["a.pdf_p2_0"])
+        # The re-chunked page gets the same IDs back, so untouched pages never shift
+        self.assertEqual(plan["chunk_ids"], ["a.pdf_p2_0"])
+        self.assertEqual(plan["metadatas"][0]["text"], "page two, edited")
+        self.assertEqual((plan["pages_reembedded"], plan["pages_unchanged"]), (1, 2))
+        # Kept chunks now belong to the new file version
+        self.assertEqual({chunk["sha256"] for chunk in plan["kept"].values()}, {"v2"})
+
+    def test_removed_pages_and_changed_settings_retire_chunks(self):
+        stored = _stored(_plan(["page one", "page two", "page three"]))
+
+        shorter = _plan(["page one", "page two"], stored, file_hash="v2")
+        self.assertEqual(shorter["retired_ids"], ["a.pdf_p3_0"])
+        self.assertEqual((shorter["chunk_ids"], shorter["pages_unchanged"]), ([], 2))
+
+        resized = _plan(["page one", "page two", "page three"], stored, chunk_size=5)
+        self.assertEqual(resized["kept"], {})
+        self.assertEqual(sorted(resized["retired_ids"]), sorted(stored))
+        self.assertEqual(resized["pages_reembedded"], 3)
+
+    def test_identical_reingest_changes_nothing(self):
+        stored = _stored(_plan(["page one", "page two"]))
+
+        plan = _plan(["page one", "page two"], stored)
+        self.assertEqual((plan["chunk_ids"], plan["retired_ids"]), ([], []))
+        self.assertEqual(sorted(plan["kept"]), sorted(stored))
+
+
+if __name__ == "__main__":
+    unittest.main()
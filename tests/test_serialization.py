@@ -0,0 +1,42 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import numpy as np
+
+from backend import serialization
+
+
+class TestSerialization(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.temp_dir.name, "mapping.json")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_compact_output_with_integer_keys(self):
+        for orjson in (serialization.orjson, None):
+            with mock.patch.object(serialization, "orjson", orjson):
+                serialization.dump({0: "a.pdf_p1_0", 1: "ü"}, self.path)
+                with open(self.path, "rb") as f:
+                    self.assertEqual(f.read(), '{"0":"a.pdf_p1_0","1":"ü"}'.encode("utf-8"))
+                self.assertEqual(serialization.load(self.path), {"0": "a.pdf_p1_0", "1": "ü"})
+        self.assertFalse(os.path.exists(self.path + ".tmp"))
+
+    def test_reads_pretty_printed_files(self):
+        with open(self.path, "w") as f:
+            json.dump({"chunk": {"page": 1, "text": "hello"}}, f, indent=2)
+
+        self.assertEqual(serialization.load(self.path), {"chunk": {"page": 1, "text": "hello"}})
+
+    def test_numpy_values(self):
+        if serialization.orjson is None:
+            self.skipTest("orjson not installed")
+        self.assertEqual(serialization.loads(serialization.dumps({"v": np.arange(3)})), {"v": [0, 1, 2]})
+
+
+if __name__ == "__main__":
+    unittest.main()
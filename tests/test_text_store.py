@@ -0,0 +1,61 @@
+import os
+import tempfile
+import unittest
+
+from backend.metadata_store import MetadataStore
+from backend.text_store import TextSegmentStore
+
+
+class TestTextSegmentStore(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.segments = os.path.join(self.temp_dir.name, "segments")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_round_trip_across_blocks_segments_and_reopen(self):
+        texts = [f"chunk {i} ünïcode " * (i % 7 + 1) for i in range(200)]
+        for codec in ("", "zlib"):
+            directory = os.path.join(self.segments, codec or "raw")
+            store = TextSegmentStore(directory, codec, block_size=256, segment_max_bytes=2048)
+            refs = store.put(texts[:100]) + store.put(texts[100:])
+            self.assertEqual(store.get(refs), texts)
+            self.assertGreater(len(os.listdir(directory)), 1)
+            store.close()
+
+            reopened = TextSegmentStore(directory, codec)
+            self.assertEqual(reopened.get(refs[::-1]), texts[::-1])
+            more = reopened.put(["appended after reopening"])
+            self.assertEqual(reopened.get(more + refs[:1]), ["appended after reopening", texts[0]])
+            reopened.close()
+
+    def test_empty_text_in_an_otherwise_empty_segment(self):
+        store = TextSegmentStore(self.segments)
+        refs = store.put([""])
+        self.assertEqual(os.path.getsize(os.path.join(self.segments, "segment-000001.dat")), 0)
+
+        self.assertEqual(store.get(refs), [""])
+        more = store.put(["after", ""])
+        self.assertEqual(store.get(refs + more), ["", "after", ""])
+        store.close()
+
+    def test_metadata_rows_keep_only_a_text_ref(self):
+        store = MetadataStore(
+            os.path.join(self.temp_dir.name, "metadata.sqlite"),
+            text_store=TextSegmentStore(self.segments, "zlib")
+        )
+        store.add_chunks({"a": {"document": "a.pdf", "text": "first"}, "b": {"document": "a.pdf", "text": "second"}})
+        store.update_chunk("b", {"document": "a.pdf", "text": "second, edited"})
+
+        self.assertNotIn("text", store.find(document="a.pdf")["a"])
+        self.assertIn("text_ref", store.first_chunk())
+        self.assertEqual(store.get_chunk("b"), {"document": "a.pdf", "text": "second, edited"})
+        self.assertEqual(list(store.get_chunks(["b", "a"])), ["b", "a"])
+
+        with self.assertRaises(ValueError):
+            TextSegmentStore(self.segments, "lz4")
+
+
+if __name__ == "__main__":
+    unittest.main()
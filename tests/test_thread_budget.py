@@ -0,0 +1,79 @@
+import importlib
+import multiprocessing
+import os
+import unittest
+from concurrent.futures import ProcessPoolExecutor
+from unittest import mock
+
+from backend.embedding_pool import _init_worker
+from backend.thread_budget import ThreadBudget
+
+
+PROFILES = {
+    "query": {"torch": 2, "faiss": 4, "query_executor": 3},
+    "ingest": {"torch": 6, "faiss": 1, "query_executor": 1}
+}
+
+
+class ThreadBudgetTest(unittest.TestCase):
+    def test_switching_profile_changes_counts_and_resizes_executors(self):
+        budget = ThreadBudget(PROFILES, mode="query")
+        query_executor = budget.executor("query_executor")
+        self.assertEqual(query_executor._max_workers, 3)
+        self.assertEqual(budget.faiss_threads, 4)
+
+        budget.set_mode("ingest")
+
+        self.assertEqual(budget.get("torch"), 6)
+        self.assertEqual(budget.faiss_threads, 1)
+        self.assertIsNot(budget.executor("query_executor"), query_executor)
+        self.assertEqual(budget.executor("query_executor")._max_workers, 1)
+
+    def test_configure_merges_overrides(self):
+        budget = ThreadBudget(PROFILES, mode="query")
+        budget.configure({"ingest": {"extract_workers": 5}}, mode="ingest")
+
+        self.assertEqual(budget.get("extract_workers"), 5)
+        self.assertEqual(budget.get("torch"), 6)
+        self.assertEqual(budget.status()["mode"], "ingest")
+
+    def test_unknown_profile_is_rejected(self):
+        budget = ThreadBudget(PROFILES)
+        with self.assertRaises(ValueError):
+            budget.set_mode("turbo")
+        self.assertEqual(budget.mode, "query")
+
+    def test_pin_survives_reapplying_the_budget(self):
+        budget = ThreadBudget(PROFILES, mode="query")
+        budget.pin(torch=1)
+        budget.apply()
+
+        self.assertEqual(budget.mode, "pinned")
+        self.assertEqual((budget.get("torch"), budget.faiss_threads), (1, 4))
+
+    def test_pool_workers_keep_their_pinned_threads_after_loading_the_model(self):
+        with ProcessPoolExecutor(1, mp_context=multiprocessing.get_context("spawn"), initializer=_init_worker,
+                                 initargs=("all-MiniLM-L6-v2", "hash", 3)) as pool:
+            mode, torch_threads, onnx_threads = pool.submit(_worker_budget).result()
+
+        self.assertEqual((mode, torch_threads, onnx_threads), ("pinned", 3, 3))
+
+    def test_explicit_env_counts_hold_in_every_profile(self):
+        import backend.config as config
+
+        with mock.patch.dict(os.environ, {"EMBEDDING_POOL_PROCESSES": "1", "BATCH_EXTRACT_WORKERS": "3"}):
+            overrides = importlib.reload(config).THREAD_PROFILE_OVERRIDES
+        importlib.reload(config)
+
+        for profile in ("query", "ingest"):
+            self.assertEqual(overrides[profile], {"extract_workers": 3, "embedding_pool_processes": 1})
+
+
+def _worker_budget():
+    # The budget instance the worker's embeddings module applies after loading a model
+    from thread_budget import budget
+    return budget.mode, budget.get("torch"), budget.get("onnx")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,44 @@
+import asyncio
+import hashlib
+import io
+import os
+import tempfile
+import unittest
+
+from fastapi import HTTPException
+from starlette.datastructures import UploadFile
+
+from backend.uploads import save_upload
+
+
+class TestUploads(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.dest_path = os.path.join(self.temp_dir.name, "docs", "upload.pdf")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_save_upload_streams_and_hashes(self):
+        content = os.urandom(10_000)
+        upload = UploadFile(file=io.BytesIO(content), filename="upload.pdf")
+
+        result = asyncio.run(save_upload(upload, self.dest_path, chunk_size=1024))
+
+        self.assertEqual(result["size"], len(content))
+        self.assertEqual(result["sha256"], hashlib.sha256(content).hexdigest())
+        with open(self.dest_path, "rb") as f:
+            self.assertEqual(f.read(), content)
+
+    def test_save_upload_enforces_max_size(self):
+        upload = UploadFile(file=io.BytesIO(b"x" * 5000), filename="upload.pdf")
+
+        with self.assertRaises(HTTPException) as ctx:
+            asyncio.run(save_upload(upload, self.dest_path, max_size=4096, chunk_size=1024))
+
+        self.assertEqual(ctx.exception.status_code, 413)
+        self.assertFalse(os.path.exists(self.dest_path))
+        self.assertFalse(os.path.exists(self.dest_path + ".part"))
+
+if __name__ == "__main__":
+    unittest.main()